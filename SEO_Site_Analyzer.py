@@ -1,16 +1,77 @@
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
 from urllib.parse import urljoin, urlparse
 import time
 import json
+import csv
+import argparse
+import asyncio
+import threading
+import heapq
+from collections import Counter
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from throttle import AdaptiveThrottle, THROTTLE_STATUSES
+from http_cache import HTTPCache
+from incremental import content_hash, load_previous_report, diff_reports, save_diff, DIFF_FIELDS
+from page_parser import parse_page, facts_from_soup
+from frontier import Frontier, VisitedSet, normalize_url
+from sitemap_seeder import RobotsRules, discover_urls, lastmod_priority
+from metrics import Metrics, profiled, progress_from_env
+from crawl_archive import CrawlArchive
+from checkpoint import CrawlCheckpoint
+from page_weight import PageWeightAudit
+import transport
+
+SEO_CHECKPOINT_PATH = '.seo_checkpoint.sqlite'
 
 class AdvancedSEOAnalyzer:
-    def __init__(self, max_pages=50, delay=1.0):
+    def __init__(self, max_pages=50, delay=1.0, max_concurrency=8, per_host_concurrency=2, cache=None,
+                 previous_rows=None, parser_backend='auto', use_bloom=False, use_sitemaps=True,
+                 follow_links=True, metrics=None):
         self.max_pages = max_pages
         self.delay = delay
-        self.session = requests.Session()
-        self.session.headers.update({'User-Agent': 'Mozilla/5.0'})
+        # Ограничения для асинхронного режима: всего запросов и на один хост
+        self.max_concurrency = max_concurrency
+        self.per_host_concurrency = per_host_concurrency
+        self.host_limits = {}
+        self.executor = None
+        self.lock = threading.Lock()
+        # Темп запросов к каждому хосту подстраивается под его ответы; delay - стартовая пауза
+        # Таймеры этапов, счётчики байтов и кэша, гистограммы задержек
+        self.metrics = metrics or Metrics('seo_analyzer')
+        self.throttle = AdaptiveThrottle(initial_interval=delay, max_concurrency=per_host_concurrency,
+                                         metrics=self.metrics)
+        # Необязательный HTTPCache: при 304 страница не загружается и не разбирается заново
+        self.cache = cache
+        # Строки прошлого отчёта (URL -> строка): неизменённые страницы не анализируются заново
+        self.previous_rows = previous_rows or {}
+        self.carried_forward = 0
+        # Бэкенд разбора HTML из page_parser ('auto', 'selectolax', 'lxml', 'stdlib', 'bs4')
+        self.parser_backend = parser_backend
+        # Фильтр Блума вместо множества отпечатков - для сайтов на миллионы URL
+        self.use_bloom = use_bloom
+        # Стартовые адреса из sitemap.xml; при follow_links=False ссылки со страниц не обходятся
+        self.use_sitemaps = use_sitemaps
+        self.follow_links = follow_links
+        # Обработчик готовых строк отчёта (например, StreamingReportWriter.add);
+        # при keep_results=False строки не копятся в памяти
+        self.on_result = None
+        self.keep_results = True
+        # Необязательный CrawlArchive: archive - куда дописывать загруженные страницы,
+        # replay - откуда брать страницы вместо сети (повторный анализ без обхода)
+        self.archive = None
+        self.replay = None
+        # Необязательный LinkGraph (или DomainLinkGraphs): структура внутренних ссылок для PageRank, глубины и сирот
+        self.link_graph = None
+        # Необязательный CrawlCheckpoint (подключается через use_checkpoint)
+        self.checkpoint = None
+        # Необязательный PageWeightAudit: вес, формат и размеры изображений по первым килобайтам.
+        # Работает там, где страницы разбираются в этом процессе (не в пуле процессов разбора)
+        self.page_weight = None
+        # Общий транспорт: пул соединений, сжатие, DNS-кэш и (с SEO_HTTP2=1) HTTP/2
+        self.session = transport.create_session(pool_size=max_concurrency)
+        # Сколько раз загружался каждый URL (повторных загрузок быть не должно)
+        self.fetch_counts = Counter()
 
     def is_valid_url(self, url, domain):
         """Проверяет, является ли URL допустимым для анализа"""
@@ -22,184 +83,700 @@ class AdvancedSEOAnalyzer:
             not url.endswith(('.pdf', '.jpg', '.png', '.zip'))
         )
 
-    def analyze_images(self, soup, base_url):
+    def page_facts(self, page):
+        """Принимает факты page_parser или дерево BeautifulSoup"""
+        return page if isinstance(page, dict) else facts_from_soup(page)
+
+    def analyze_images(self, page, base_url):
         """Анализирует изображения на странице"""
         images = []
-        for img in soup.find_all('img'):
+        for img in self.page_facts(page)['images']:
             img_data = {
-                'src': urljoin(base_url, img.get('src', '')),
-                'alt': img.get('alt', '❌ Отсутствует'),
-                'width': img.get('width', 'Не указано'),
-                'height': img.get('height', 'Не указано'),
-                'loading': img.get('loading', 'Не указано (рекомендуется lazy)')
+                'src': urljoin(base_url, img['src'] or ''),
+                'alt': img['alt'] if img['alt'] is not None else '❌ Отсутствует',
+                'width': img['width'] if img['width'] is not None else 'Не указано',
+                'height': img['height'] if img['height'] is not None else 'Не указано',
+                'loading': img['loading'] if img['loading'] is not None else 'Не указано (рекомендуется lazy)'
             }
             images.append(img_data)
         return images
 
-    def analyze_microdata(self, soup):
+    def analyze_microdata(self, page):
         """Анализирует микроразметку (Schema.org, OpenGraph)"""
-        microdata = {
-            'schema': [],
-            'og': {},
-            'twitter': {}
+        facts = self.page_facts(page)
+        return {
+            'schema': [schema_type or 'Не указан' for schema_type in facts['schema']],
+            'og': dict(facts['og']),
+            'twitter': dict(facts['twitter'])
         }
 
-        # Schema.org
-        for item in soup.find_all(attrs={'itemscope': True}):
-            schema_type = item.get('itemtype', 'Не указан')
-            microdata['schema'].append(schema_type)
+    def fetch(self, url):
+        """Загружает страницу (через кэш, если он задан) с учётом темпа хоста"""
+        with self.lock:
+            self.fetch_counts[url] += 1
+        if self.replay is not None:
+            response = self.replay.get(url)
+            if response is None:
+                raise KeyError(f"страницы нет в архиве {self.replay.path}")
+            self.metrics.count('archive.reads')
+            return response
+        if self.cache:
+            send = lambda: self.cache.get(self.session, url, timeout=10)
+        else:
+            send = lambda: self.session.get(url, timeout=10)
+
+        def request():
+            # Время самого запроса, без ожидания разрешения у throttle
+            start = time.monotonic()
+            response = send()
+            self.metrics.record_response(response, time.monotonic() - start, len(response.content))
+            return response
+        response = self.throttle.call(urlparse(url).netloc, request)
+        if response.status_code in THROTTLE_STATUSES:
+            # Повторы исчерпаны: это не ответ страницы, строка отчёта и ссылки из него не строятся
+            self.metrics.count('rate_limited')
+            raise RuntimeError(f"сервер ограничивает запросы ({response.status_code}), "
+                               f"повторов: {self.throttle.max_retries}")
+        if self.archive is not None:
+            self.archive.write(url, response)
+        return response
+
+    def duplicate_fetches(self):
+        """Возвращает URL, которые были загружены больше одного раза"""
+        return {url: count for url, count in self.fetch_counts.items() if count > 1}
 
-        # OpenGraph
-        for meta in soup.find_all('meta', attrs={'property': True}):
-            if meta['property'].startswith('og:'):
-                microdata['og'][meta['property']] = meta.get('content', '')
+    def parse(self, response):
+        """Один проход по HTML: все факты о странице, включая ссылки"""
+        with self.metrics.timer('parse'):
+            return parse_page(response.text, self.parser_backend)
+
+    def extract_links(self, page, base_url, domain):
+        """Собирает ссылки для обхода из уже разобранной страницы"""
+        links = []
+        for href in self.page_facts(page)['links']:
+            try:
+                full_url = normalize_url(urljoin(base_url, href))
+            except ValueError:
+                # Неразбираемая ссылка (например, http://[::1) пропускается, а не роняет страницу
+                continue
+            if self.is_valid_url(full_url, domain):
+                links.append(full_url)
+        return links
 
-        # Twitter Cards
-        for meta in soup.find_all('meta', attrs={'name': True}):
-            if meta['name'].startswith('twitter:'):
-                microdata['twitter'][meta['name']] = meta.get('content', '')
+    def analyze_document(self, url, domain, response, page):
+        """Считает SEO-метрики по уже загруженной странице"""
+        start = time.monotonic()
+        facts = self.page_facts(page)
 
-        return microdata
+        # Базовые мета-данные
+        title = facts['title'] or "❌ Отсутствует"
+        meta_desc = facts['meta_description'] if facts['meta_description'] is not None else "❌ Отсутствует"
+
+        # Анализ заголовков
+        headings = facts['headings']
+
+        # Анализ изображений
+        images = self.analyze_images(facts, url)
+        img_errors = sum(1 for img in images if img['alt'] == '❌ Отсутствует')
+        if self.page_weight is not None:
+            # Проверка изображений идёт в фоне и не задерживает обход
+            self.page_weight.add_page(url, images)
+
+        # Анализ микроразметки
+        microdata = self.analyze_microdata(facts)
+
+        row = {
+            'URL': url,
+            'Title': title,
+            'Title_Length': len(title),
+            'Meta_Description': meta_desc,
+            'Meta_Length': len(meta_desc),
+            'H1': headings['h1'][0] if headings['h1'] else "❌ Отсутствует",
+            'H1_Count': len(headings['h1']),
+            'H2_Count': len(headings['h2']),
+            'H3_Count': len(headings['h3']),
+            'Images_Total': len(images),
+            'Images_Without_Alt': img_errors,
+            'Schema_Types': ', '.join(microdata['schema']) if microdata['schema'] else '❌ Отсутствует',
+            'OG_Tags': len(microdata['og']),
+            'Twitter_Tags': len(microdata['twitter']),
+            'Status': response.status_code,
+            'Domain': domain,
+            'Content_Hash': content_hash(response.content)
+        }
+        self.metrics.observe('analyze', time.monotonic() - start)
+        return row
 
     def analyze_page(self, url, domain):
         """Полный анализ одной страницы"""
         try:
-            response = self.session.get(url, timeout=10)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Базовые мета-данные
-            title = soup.title.string if soup.title else "❌ Отсутствует"
-            meta_desc = (soup.find('meta', attrs={'name': 'description'})['content'] 
-                        if soup.find('meta', attrs={'name': 'description'}) else "❌ Отсутствует")
-
-            # Анализ заголовков
-            headings = {f'h{i}': [h.get_text(strip=True) for h in soup.find_all(f'h{i}')] for i in range(1, 4)}
-
-            # Анализ изображений
-            images = self.analyze_images(soup, url)
-            img_errors = sum(1 for img in images if img['alt'] == '❌ Отсутствует')
-
-            # Анализ микроразметки
-            microdata = self.analyze_microdata(soup)
-
-            return {
-                'URL': url,
-                'Title': title,
-                'Title_Length': len(title),
-                'Meta_Description': meta_desc,
-                'Meta_Length': len(meta_desc),
-                'H1_Count': len(headings['h1']),
-                'H2_Count': len(headings['h2']),
-                'H3_Count': len(headings['h3']),
-                'Images_Total': len(images),
-                'Images_Without_Alt': img_errors,
-                'Schema_Types': ', '.join(microdata['schema']) if microdata['schema'] else '❌ Отсутствует',
-                'OG_Tags': len(microdata['og']),
-                'Twitter_Tags': len(microdata['twitter']),
-                'Status': response.status_code,
-                'Domain': domain
-            }
+            response = self.fetch(url)
+            return self.analyze_document(url, domain, response, self.parse(response))
         except Exception as e:
             print(f"Ошибка при анализе {url}: {str(e)}")
             return None
 
+    def analyze_response(self, url, domain, response, previous_hash=None):
+        """Разбирает ответ: метрики и ссылки из одного документа.
+        Если содержимое совпадает с previous_hash, метрики не считаются (возвращается None)"""
+        facts = self.parse(response)
+        links = self.extract_links(facts, url, domain)
+        if previous_hash and previous_hash == content_hash(response.content):
+            return None, links
+        return self.analyze_document(url, domain, response, facts), links
+
+    def cached_result(self, url, response):
+        """Метрики и ссылки из кэша, если сервер ответил 304"""
+        if getattr(response, 'not_modified', False):
+            return self.cache.get_derived(url, 'seo')
+        return None
+
+    def finish_page(self, url, domain, response, page_data, links):
+        """Переносит неизменённую строку из прошлого отчёта и сохраняет результат в кэш"""
+        if page_data is None:
+            # Страница не изменилась с прошлого прогона - переносим её строку
+            page_data = dict(self.previous_rows[url], Status=response.status_code, Domain=domain)
+            with self.lock:
+                self.carried_forward += 1
+        if self.cache:
+            self.cache.set_derived(url, 'seo', {'row': page_data, 'links': links})
+        return page_data, links
+
+    def previous_hash(self, url):
+        return self.previous_rows.get(url, {}).get('Content_Hash')
+
+    def process_page(self, url, domain):
+        """Загружает страницу и берёт метрики и ссылки из одного и того же документа"""
+        response = self.fetch(url)
+        cached = self.cached_result(url, response)
+        if cached:
+            return cached['row'], cached['links']
+
+        page_data, links = self.analyze_response(url, domain, response, self.previous_hash(url))
+        return self.finish_page(url, domain, response, page_data, links)
+
+    def site_seeds(self, start_url, domain, sitemaps=True):
+        """Читает robots.txt (Crawl-delay, Disallow, Sitemap) и возвращает
+        (правила, [(url, приоритет)]) - страницы из карт сайта, не больше max_pages"""
+        with self.metrics.timer('robots'):
+            robots = RobotsRules(self.session, start_url)
+        crawl_delay = robots.crawl_delay()
+        if crawl_delay:
+            print(f"Crawl-delay для {domain}: {crawl_delay} с")
+            self.throttle.set_min_interval(domain, float(crawl_delay))
+
+        seeds = []
+        if self.use_sitemaps and sitemaps:
+            start = time.monotonic()
+            seen = VisitedSet()
+            seen.add(start_url)
+
+            def candidates():
+                for url, lastmod in discover_urls(self.session, start_url, robots):
+                    url = normalize_url(url)
+                    if url not in seen and self.is_valid_url(url, domain) and robots.allowed(url):
+                        seen.add(url)
+                        yield url, lastmod_priority(lastmod)
+
+            # Карта сайта читается потоково целиком, но в памяти держатся только max_pages - 1
+            # самых свежих по lastmod адресов (главная страница занимает ещё одно место)
+            seeds = heapq.nsmallest(max(0, self.max_pages - 1), candidates(), key=lambda seed: seed[1])
+            self.metrics.observe('sitemaps', time.monotonic() - start)
+            self.metrics.count('sitemap_urls', len(seeds))
+            print(f"Из карт сайта {domain}: {len(seeds)} адресов")
+        return robots, seeds
+
+    def use_checkpoint(self, checkpoint):
+        """Подключает CrawlCheckpoint: очередь, готовые строки и темп хостов переживают перезапуск"""
+        self.checkpoint = checkpoint
+        self.throttle.restore(checkpoint.load_state('throttle'))
+        checkpoint.track('throttle', self.throttle.snapshot)
+
+    def resume_site(self, domain, results):
+        """Продолжение прерванного обхода: готовые строки берутся из контрольной точки без загрузки.
+        Возвращает (обработанные URL, [(url, глубина, приоритет)] из очереди) или None"""
+        if self.checkpoint is None or not self.checkpoint.has(domain):
+            return None
+        done, pending = self.checkpoint.load(domain)
+        for url, page_data, links in done:
+            self.emit(page_data, results)
+            if self.link_graph is not None:
+                self.link_graph.add_page(url, links)
+        print(f"Продолжаю обход {domain}: готово {len(done)} страниц, в очереди {len(pending)}")
+        return [url for url, _, _ in done], [(url, depth, priority) for url, depth, priority, _ in pending]
+
+    def enqueue(self, frontier, url, domain, depth=0, priority=0):
+        """Ставит URL в очередь обхода и отмечает это в контрольной точке"""
+        if frontier.add(url, depth=depth, priority=priority) and self.checkpoint is not None:
+            self.checkpoint.queued(url, domain, depth, priority)
+
+    def record_page(self, url, domain, page_data, links):
+        """Добавляет обработанную страницу в граф сайта и в контрольную точку"""
+        if self.link_graph is not None:
+            self.link_graph.add_page(url, links)
+        if self.checkpoint is not None:
+            self.checkpoint.done(url, domain, page_data, links)
+
+    def links_to_follow(self, links, robots):
+        """Ссылки страницы, которые разрешено обходить"""
+        if not self.follow_links:
+            return []
+        return [url for url in links if robots.allowed(url)]
+
+    def seed_frontier(self, start_url, domain, results):
+        """Очередь обхода со стартовой страницей и адресами из карт сайта
+        (или из контрольной точки, если обход продолжается)"""
+        frontier = Frontier(use_bloom=self.use_bloom)
+        if self.link_graph is not None:
+            self.link_graph.add_root(start_url)
+        resumed = self.resume_site(domain, results)
+        robots, seeds = self.site_seeds(start_url, domain, sitemaps=resumed is None)
+        if resumed:
+            done, pending = resumed
+            for url in done:
+                frontier.mark_seen(url)
+            for url, depth, priority in pending:
+                frontier.add(url, depth=depth, priority=priority)
+            return frontier, robots
+
+        # Главная страница - первой, затем недавно изменённые по lastmod
+        self.enqueue(frontier, start_url, domain, priority=float('-inf'))
+        for url, priority in seeds:
+            self.enqueue(frontier, url, domain, priority=priority)
+        return frontier, robots
+
+    def emit(self, page_data, results):
+        """Передаёт готовую строку отчёта обработчику и, если нужно, сохраняет её в results"""
+        self.metrics.count('pages')
+        if self.on_result:
+            self.on_result(page_data)
+        if self.keep_results:
+            results.append(page_data)
+
     def crawl_site(self, start_url):
-        """Рекурсивный обход сайта"""
+        """Рекурсивный обход сайта в ширину: каждая страница загружается и разбирается один раз"""
+        start_url = normalize_url(start_url)
         domain = urlparse(start_url).netloc
-        visited = set()
         results = []
         
-        to_visit = {start_url}
-        while to_visit and len(visited) < self.max_pages:
-            url = to_visit.pop()
-            
-            if url in visited:
-                continue
-                
+        frontier, robots = self.seed_frontier(start_url, domain, results)
+        while frontier:
+            url, depth = frontier.pop()
             print(f"Анализирую: {url}")
-            page_data = self.analyze_page(url, domain)
-            if page_data:
-                results.append(page_data)
-            visited.add(url)
-            time.sleep(self.delay)
-            
             try:
-                response = self.session.get(url, timeout=10)
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                for link in soup.find_all('a', href=True):
-                    href = link['href']
-                    full_url = urljoin(url, href)
-                    
-                    if (self.is_valid_url(full_url, domain) 
-                        and full_url not in visited 
-                        and len(visited) < self.max_pages):
-                        to_visit.add(full_url)
-                        
+                page_data, links = self.process_page(url, domain)
             except Exception as e:
-                print(f"Ошибка при обработке ссылок на {url}: {str(e)}")
+                print(f"Ошибка при анализе {url}: {str(e)}")
+                self.metrics.count('errors')
+                continue
+
+            self.emit(page_data, results)
+            for full_url in self.links_to_follow(links, robots):
+                if frontier.seen_count() >= self.max_pages:
+                    break
+                self.enqueue(frontier, full_url, domain, depth + 1, depth + 1)
+            # Страница отмечается готовой после своих ссылок - при сбое они не потеряются
+            self.record_page(url, domain, page_data, links)
         
         return results
 
-def main():
+    def replay_archive(self, archive, parse_workers=1):
+        """Повторный анализ всех страниц архива без сети: записи читаются подряд из mmap,
+        при parse_workers > 1 разбор идёт в пуле процессов"""
+        results = []
+        pages = ((page.url, urlparse(page.url).netloc, page) for page in archive)
+        if parse_workers > 1:
+            with ProcessPoolExecutor(max_workers=parse_workers, initializer=init_parse_worker,
+                                     initargs=(self.parser_backend,)) as parsers:
+                # В пуле держится не больше нескольких страниц на процесс - архив не читается в память целиком
+                pending = set()
+                for url, domain, page in pages:
+                    pending.add(parsers.submit(analyze_in_worker, url, domain, page.status_code,
+                                               page.content, page.encoding, None))
+                    if len(pending) >= parse_workers * 4:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        self.emit_analyzed(done, results)
+                self.emit_analyzed(wait(pending).done, results)
+        else:
+            for url, domain, page in pages:
+                try:
+                    self.emit(self.analyze_document(url, domain, page, self.parse(page)), results)
+                except Exception as e:
+                    print(f"Ошибка при анализе {url}: {str(e)}")
+                    self.metrics.count('errors')
+        return results
+
+    def emit_analyzed(self, futures, results):
+        """Передаёт строки отчёта из завершённых задач пула разбора"""
+        for future in futures:
+            try:
+                page_data, _ = future.result()
+            except Exception as e:
+                print(f"Ошибка при анализе: {str(e)}")
+                self.metrics.count('errors')
+                continue
+            self.emit(page_data, results)
+
+    def get_host_limit(self, host):
+        """Возвращает семафор, ограничивающий число одновременных запросов к хосту"""
+        if host not in self.host_limits:
+            self.host_limits[host] = asyncio.Semaphore(self.per_host_concurrency)
+        return self.host_limits[host]
+
+    def crawl_site_pipeline(self, start_url, parse_workers=None, queue_size=None):
+        """Обход в два этапа: загрузка в потоках, разбор в пуле процессов.
+        Очередь на разбор ограничена queue_size - пока она полна, новые загрузки не начинаются"""
+        start_url = normalize_url(start_url)
+        domain = urlparse(start_url).netloc
+        parse_workers = parse_workers or os.cpu_count() or 1
+        queue_size = queue_size or parse_workers * 2
+        results = []
+        frontier, robots = self.seed_frontier(start_url, domain, results)
+        depths = {}  # url -> глубина для страниц в обработке
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as fetchers, \
+                ProcessPoolExecutor(max_workers=parse_workers, initializer=init_parse_worker,
+                                    initargs=(self.parser_backend,)) as parsers:
+            fetching = {}  # future -> url
+            parsing = {}   # future -> (url, response)
+
+            while frontier or fetching or parsing:
+                while frontier and len(fetching) < self.max_concurrency and len(fetching) + len(parsing) < queue_size:
+                    url, depths[url] = frontier.pop()
+                    print(f"Анализирую: {url}")
+                    fetching[fetchers.submit(self.fetch, url)] = url
+
+                done, _ = wait(list(fetching) + list(parsing), return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in fetching:
+                        url = fetching.pop(future)
+                        try:
+                            response = future.result()
+                        except Exception as e:
+                            print(f"Ошибка при анализе {url}: {str(e)}")
+                            self.metrics.count('errors')
+                            depths.pop(url)
+                            continue
+                        cached = self.cached_result(url, response)
+                        if cached:
+                            page_data, links = cached['row'], cached['links']
+                        else:
+                            # В процесс уходит только тело страницы, обратно - строка отчёта и ссылки
+                            parsing[parsers.submit(
+                                analyze_in_worker, url, domain, response.status_code,
+                                response.content, response.encoding,
+                                self.previous_hash(url))] = (url, response, time.monotonic())
+                            continue
+                    else:
+                        url, response, submitted = parsing.pop(future)
+                        # Время в очереди и разборе в процессе пула
+                        self.metrics.observe('parse_worker', time.monotonic() - submitted)
+                        try:
+                            page_data, links = self.finish_page(url, domain, response, *future.result())
+                        except Exception as e:
+                            print(f"Ошибка при анализе {url}: {str(e)}")
+                            self.metrics.count('errors')
+                            depths.pop(url)
+                            continue
+
+                    self.emit(page_data, results)
+                    depth = depths.pop(url)
+                    for full_url in self.links_to_follow(links, robots):
+                        if frontier.seen_count() >= self.max_pages:
+                            break
+                        self.enqueue(frontier, full_url, domain, depth + 1, depth + 1)
+                    self.record_page(url, domain, page_data, links)
+
+        return results
+
+    async def crawl_page_async(self, url, domain, global_limit):
+        """Обрабатывает одну страницу с учётом общего и похостового лимитов.
+        Сначала занимается слот хоста: иначе очередь одного сайта заняла бы все общие слоты"""
+        async with self.get_host_limit(urlparse(url).netloc), global_limit:
+            # Темп запросов к хосту соблюдает self.throttle внутри fetch
+            print(f"Анализирую: {url}")
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, self.process_page, url, domain)
+
+    async def crawl_site_async(self, start_url, global_limit):
+        """Асинхронный обход одного сайта: страницы загружаются параллельно"""
+        start_url = normalize_url(start_url)
+        domain = urlparse(start_url).netloc
+        results = []
+        if self.link_graph is not None:
+            self.link_graph.add_root(start_url)
+        resumed = self.resume_site(domain, results)
+        loop = asyncio.get_running_loop()
+        robots, seeds = await loop.run_in_executor(self.executor, self.site_seeds, start_url, domain,
+                                                   resumed is None)
+        visited = VisitedSet()
+        tasks = {}
+
+        def schedule(url, priority=0):
+            visited.add(url)
+            if self.checkpoint is not None:
+                self.checkpoint.queued(url, domain, 0, priority)
+            tasks[asyncio.ensure_future(self.crawl_page_async(url, domain, global_limit))] = url
+
+        if resumed:
+            done, pending = resumed
+            for url in done:
+                visited.add(url)
+            queue = sorted(((priority, url) for url, _, priority in pending), key=lambda item: item[0])
+        else:
+            queue = [(float('-inf'), start_url)] + sorted(((priority, url) for url, priority in seeds),
+                                                          key=lambda item: item[0])
+        for priority, url in queue:
+            schedule(url, priority)
+        while tasks:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                url = tasks.pop(task)
+                try:
+                    page_data, links = task.result()
+                except Exception as e:
+                    print(f"Ошибка при анализе {url}: {str(e)}")
+                    self.metrics.count('errors')
+                    continue
+
+                self.emit(page_data, results)
+                for full_url in self.links_to_follow(links, robots):
+                    if full_url not in visited and len(visited) < self.max_pages:
+                        schedule(full_url)
+                self.record_page(url, domain, page_data, links)
+
+        return results
+
+    async def crawl_sites_async(self, start_urls):
+        """Обходит несколько сайтов одновременно и возвращает все строки отчёта"""
+        self.host_limits = {}
+        global_limit = asyncio.Semaphore(self.max_concurrency)
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            self.executor = executor
+            try:
+                site_results = await asyncio.gather(
+                    *(self.crawl_site_async(url, global_limit) for url in start_urls))
+            finally:
+                self.executor = None
+        return [row for rows in site_results for row in rows]
+
+    def crawl_sites(self, start_urls):
+        """Синхронная обёртка над асинхронным обходом"""
+        return asyncio.run(self.crawl_sites_async(start_urls))
+
+class FetchedPage:
+    """Тело загруженной страницы для разбора в другом процессе"""
+
+    def __init__(self, url, status_code, content, encoding):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.encoding = encoding
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+
+worker_analyzer = None
+
+
+def init_parse_worker(parser_backend):
+    """Создаёт анализатор один раз на процесс пула"""
+    global worker_analyzer
+    worker_analyzer = AdvancedSEOAnalyzer(parser_backend=parser_backend)
+
+
+def analyze_in_worker(url, domain, status_code, content, encoding, previous_hash):
+    """Разбор страницы в процессе пула: возвращает только компактную строку отчёта и ссылки"""
+    page = FetchedPage(url, status_code, content, encoding)
+    return worker_analyzer.analyze_response(url, domain, page, previous_hash)
+
+def save_rows(rows, filename):
+    """Сохраняет список словарей в CSV"""
+    with open(filename, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+def read_list(path):
+    """Строки файла без пустых и комментариев (#); '-' - стандартный ввод"""
+    with (sys.stdin if path == '-' else open(path, encoding='utf-8')) as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+def add_arguments(parser):
+    parser.add_argument('urls', nargs='*', help='URL сайтов (без аргументов всё спрашивается интерактивно)')
+    parser.add_argument('--urls-file', help='Файл со списком сайтов, по одному в строке (- для stdin)')
+    parser.add_argument('--previous', default='', help='Прошлый отчет для инкрементального анализа')
+    parser.add_argument('--archive', default='',
+                        help='Архив страниц .warc.gz (существующий файл - анализ без обхода)')
+    parser.add_argument('--max-pages', type=int, default=50, help='Страниц на сайт')
+    parser.add_argument('--delay', type=float, default=1.0, help='Стартовая пауза между запросами к хосту, с')
+    parser.add_argument('--parse-workers', type=int, default=0,
+                        help='Разбирать страницы в пуле из N процессов, пока потоки загружают следующие '
+                             '(для больших сайтов; 0 - загрузка и разбор в одном процессе)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Продолжить прерванный обход с контрольной точки, не загружая готовые страницы')
+    parser.add_argument('--page-weight', action='store_true',
+                        help='Проверить вес, формат и размеры изображений (читаются только первые килобайты)')
+    parser.add_argument('--max-image-kb', type=int, default=200,
+                        help='Изображение тяжелее этого веса считается слишком тяжёлым')
+
+def report_timestamp():
+    """Метка времени для имён файлов отчёта; прогоны, начатые в ту же секунду, получают суффикс"""
+    base = timestamp = time.strftime('%Y%m%d_%H%M%S')
+    n = 1
+    while (os.path.exists(f"advanced_seo_report_{timestamp}.csv")
+           or os.path.exists(f"advanced_seo_report_{timestamp}.parquet")):
+        n += 1
+        timestamp = f"{base}_{n}"
+    return timestamp
+
+def run(args):
+    """Анализ сайтов по разобранным аргументам командной строки"""
+    # pandas и numpy нужны только для отчетов - импортируются здесь, а не при запуске программы
+    from report_writer import StreamingReportWriter
+    from link_graph import DomainLinkGraphs
+    from duplicates import DomainDuplicateFinder
+    
     print("=== Продвинутый SEO-анализатор ===")
-    print("Введите URL сайтов через запятую (например: site1.ru, site2.com)")
-    user_input = input("URL сайтов: ").strip()
+    urls = [url for value in args.urls for url in value.split(',')]
+    if args.urls_file:
+        urls += read_list(args.urls_file)
+    previous_report, archive_path = args.previous, args.archive
+    if not urls and not archive_path:
+        print("Введите URL сайтов через запятую (например: site1.ru, site2.com)")
+        user_input = input("URL сайтов: ").strip()
+        urls = user_input.split(',')
+        previous_report = input("Прошлый отчет для инкрементального анализа (Enter - полный анализ): ").strip()
+        archive_path = input("Архив страниц .warc.gz (Enter - без архива, существующий файл - анализ без обхода): ").strip()
     
-    urls = [url.strip() for url in user_input.split(',') if url.strip()]
+    urls = [url.strip() for url in urls if url.strip()]
+    previous_rows = load_previous_report(previous_report) if previous_report else {}
+    replay = bool(archive_path) and os.path.exists(archive_path)
+    archive = CrawlArchive(archive_path, mode='r' if replay else 'a') if archive_path else None
     
-    analyzer = AdvancedSEOAnalyzer(max_pages=50, delay=1.0)
-    all_results = []
+    cache = HTTPCache()
+    # SEO_PROGRESS=1 - строка прогресса, SEO_PROFILE=cprofile|pyinstrument - профиль прогона
+    metrics = Metrics('seo_analyzer', progress=progress_from_env())
+    analyzer = AdvancedSEOAnalyzer(max_pages=args.max_pages, delay=args.delay, max_concurrency=8, per_host_concurrency=2, cache=cache,
+                                   previous_rows=previous_rows, metrics=metrics)
+    if archive is not None and not replay:
+        analyzer.archive = archive
+    # Состояние обхода периодически сохраняется - после сбоя его можно продолжить с --resume
+    checkpoint = CrawlCheckpoint(SEO_CHECKPOINT_PATH, resume=args.resume)
+    analyzer.use_checkpoint(checkpoint)
+    page_weight = None
+    if args.page_weight:
+        page_weight = PageWeightAudit(analyzer.session, analyzer.throttle, max_image_kb=args.max_image_kb,
+                                      metrics=metrics)
+        analyzer.page_weight = page_weight
+    urls = [url if url.startswith(('http://', 'https://')) else 'https://' + url for url in urls]
     
-    for url in urls:
-        if not url.startswith(('http://', 'https://')):
-            url = 'https://' + url
-        
-        print(f"\n🔍 Начинаю анализ сайта: {url}")
-        site_results = analyzer.crawl_site(url)
-        all_results.extend(site_results)
+    # Строки пишутся в отчет пакетами по мере обхода - сбой не теряет уже собранные данные
+    timestamp = report_timestamp()
+    filename = f"advanced_seo_report_{timestamp}.csv"
+    writer = StreamingReportWriter(filename, parquet_path=f"advanced_seo_report_{timestamp}.parquet")
+    current_rows = {}  # Для сравнения с прошлым прогоном хранятся только сравниваемые поля
     
-    if all_results:
-        df = pd.DataFrame(all_results)
-        
-        # Добавляем рекомендации
-        df['Title_Recommendation'] = df['Title_Length'].apply(
-            lambda x: "✅ OK" if 50 <= x <= 60 else "⚠️ Слишком короткий" if x < 50 else "⚠️ Слишком длинный")
-        
-        df['Meta_Recommendation'] = df['Meta_Length'].apply(
-            lambda x: "✅ OK" if 120 <= x <= 160 else "⚠️ Слишком короткое" if x < 120 else "⚠️ Слишком длинное")
-        
-        df['Images_Recommendation'] = df.apply(
-            lambda x: "✅ OK" if x['Images_Without_Alt'] == 0 
-            else f"⚠️ {x['Images_Without_Alt']} без alt", axis=1)
-        
-        timestamp = pd.Timestamp.now().strftime('%Y%m%d_%H%M')
-        filename = f"advanced_seo_report_{timestamp}.csv"
-        df.to_csv(filename, index=False, encoding='utf-8-sig')
+    # Граф ссылок и повторы title/description/H1 считаются после обхода отдельно по каждому сайту
+    link_graph = DomainLinkGraphs()
+    duplicate_finder = DomainDuplicateFinder()
+    analyzer.link_graph = link_graph
+    
+    def on_result(row):
+        writer.add(row)
+        duplicate_finder.add(row['URL'], row)
+        if previous_rows:
+            current_rows[row['URL']] = {field: row.get(field) for field in DIFF_FIELDS}
+    
+    analyzer.on_result = on_result
+    analyzer.keep_results = False
+    
+    # Разные сайты обходятся параллельно, нагрузка на каждый хост ограничена
+    try:
+        with profiled(output=f"profile_{timestamp}"):
+            if replay:
+                # Новые проверки по уже скачанным страницам: сеть не нужна
+                print(f"\n🔍 Анализ страниц из архива {archive_path} ({len(archive)} страниц)")
+                # Проверка изображений ведётся из этого процесса, поэтому разбор тогда без пула
+                analyzer.replay_archive(archive, parse_workers=1 if page_weight else os.cpu_count() or 1)
+            elif args.parse_workers and not page_weight:
+                # Конвейер: загрузка в потоках, разбор в пуле процессов; сайты обходятся по очереди
+                print(f"\n🔍 Начинаю анализ сайтов: {', '.join(urls)} (процессов разбора: {args.parse_workers})")
+                for url in urls:
+                    analyzer.crawl_site_pipeline(url, parse_workers=args.parse_workers)
+            else:
+                if args.parse_workers:
+                    print("Проверка изображений ведётся из этого процесса - --parse-workers не используется")
+                print(f"\n🔍 Начинаю анализ сайтов: {', '.join(urls)}")
+                analyzer.crawl_sites(urls)
+    finally:
+        writer.close()
+        metrics.save(f"metrics_{timestamp}.json")
+        print(checkpoint.report())
+        checkpoint.close()
+        if page_weight is not None:
+            page_weight.close()
+        if archive is not None:
+            print(archive.report())
+            archive.close()
+    
+    duplicates = analyzer.duplicate_fetches()
+    print(f"\nЗагружено страниц: {sum(analyzer.fetch_counts.values())}, повторных загрузок: {len(duplicates)}")
+    print(cache.report())
+    print(analyzer.throttle.report())
+    print(transport.report())
+    print(metrics.report())
+    print(f"Метрики сохранены в metrics_{timestamp}.json")
+    cache.close()
+    if previous_rows:
+        print(f"Без изменений (перенесено из прошлого отчета): {analyzer.carried_forward}")
+    
+    if writer.rows_written:
+        print(f"\n📊 Отчет сохранен в файл: {filename} (строк: {writer.rows_written})")
         
-        print(f"\n📊 Отчет сохранен в файл: {filename}")
+        if previous_rows:
+            diff_filename = f"seo_diff_{timestamp}.csv"
+            changes = diff_reports(previous_rows, current_rows)
+            save_diff(changes, diff_filename)
+            print(f"Изменений с прошлого прогона: {len(changes)}, подробности в {diff_filename}")
         print("\nСводная статистика по сайтам:")
-        print(df.groupby('Domain').agg({
-            'H1_Count': 'mean',
-            'Images_Without_Alt': 'sum',
-            'OG_Tags': 'mean',
-            'Schema_Types': lambda x: (x != '❌ Отсутствует').mean()
-        }).round(2))
+        print(writer.summary())
         
         # Сохраняем примеры микроразметки
-        sample_microdata = {}
-        for _, row in df[df['OG_Tags'] > 0].head(2).iterrows():
-            sample_microdata[row['URL']] = {
-                'OG': json.loads(row.to_json())['OG_Tags'],
-                'Schema': row['Schema_Types']
-            }
-        
         with open(f"microdata_samples_{timestamp}.json", 'w') as f:
-            json.dump(sample_microdata, f, indent=2)
+            json.dump(writer.microdata_samples, f, indent=2)
         print(f"\nПримеры микроразметки сохранены в microdata_samples_{timestamp}.json")
         
+        graph_rows = link_graph.rows()
+        if graph_rows:
+            save_rows(graph_rows, f"link_graph_{timestamp}.csv")
+            orphans = sum(1 for row in graph_rows if row['Orphan'])
+            print(f"Граф ссылок: {len(link_graph)} адресов, страниц-сирот {orphans}, "
+                  f"подробности в link_graph_{timestamp}.csv")
+        duplicate_rows = duplicate_finder.rows()
+        if duplicate_rows:
+            save_rows(duplicate_rows, f"duplicates_{timestamp}.csv")
+            print(f"Повторяющихся title/description/H1: {len(duplicate_rows)} групп, "
+                  f"подробности в duplicates_{timestamp}.csv")
+        if page_weight is not None and page_weight.probes:
+            weight_rows = page_weight.rows()
+            save_rows(weight_rows, f"page_weight_{timestamp}.csv")
+            save_rows(page_weight.image_rows(), f"page_weight_images_{timestamp}.csv")
+            flagged = sum(1 for row in weight_rows
+                          if row['Heavy'] or row['Oversized'] or row['Legacy_Format'] or row['Not_Lazy_Heavy'])
+            print(page_weight.report())
+            print(f"Страниц с замечаниями по изображениям: {flagged} из {len(weight_rows)}, "
+                  f"подробности в page_weight_{timestamp}.csv")
+        
     else:
         print("❌ Не удалось получить данные для анализа")
 
+def main():
+    parser = argparse.ArgumentParser(description='Продвинутый SEO-анализатор')
+    add_arguments(parser)
+    run(parser.parse_args())
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,96 @@
+"""Сравнение бэкендов page_parser по скорости на наборе сохранённых HTML-страниц.
+
+Запуск:
+    python benchmarks/bench_parsers.py папка_с_html [--repeat 3] [--processes 8]
+
+С --processes дополнительно измеряется масштабирование разбора по ядрам
+(ProcessPoolExecutor, как в AdvancedSEOAnalyzer.crawl_site_pipeline).
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from page_parser import BACKENDS, available_backends, parse_page
+
+
+def summary(facts):
+    """Краткая сводка фактов для сверки бэкендов между собой"""
+    return (len(facts['headings']['h1']), len(facts['headings']['h2']), len(facts['headings']['h3']),
+            len(facts['images']), len(facts['schema']), len(facts['og']), len(facts['links']))
+
+
+def load_corpus(folder):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(folder, '**', '*.htm*'), recursive=True)):
+        with open(path, encoding='utf-8', errors='replace') as f:
+            pages.append((path, f.read()))
+    return pages
+
+
+def bench(backend, pages, repeat):
+    parse = BACKENDS[backend]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for _, html in pages:
+            parse(html)
+    elapsed = time.perf_counter() - start
+    return len(pages) * repeat / elapsed if elapsed else float('inf')
+
+
+def parse_summary(html):
+    """Задача для пула: наружу возвращается только компактная сводка"""
+    return summary(parse_page(html))
+
+
+def bench_processes(pages, repeat, workers):
+    htmls = [html for _, html in pages] * repeat
+    chunksize = max(1, len(htmls) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(parse_summary, htmls[:workers], chunksize=1))  # прогрев процессов
+        start = time.perf_counter()
+        list(pool.map(parse_summary, htmls, chunksize=chunksize))
+        elapsed = time.perf_counter() - start
+    return len(htmls) / elapsed if elapsed else float('inf')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Скорость бэкендов разбора HTML (страниц в секунду)')
+    parser.add_argument('corpus', help='Папка с сохранёнными HTML-страницами')
+    parser.add_argument('--repeat', type=int, default=3, help='Сколько раз прогонять корпус')
+    parser.add_argument('--processes', type=int, default=0, help='Максимум процессов для замера масштабирования')
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus)
+    if not pages:
+        print("В папке нет HTML-файлов")
+        return
+    total_mb = sum(len(html.encode('utf-8')) for _, html in pages) / 1024 / 1024
+    print(f"Страниц в корпусе: {len(pages)} ({total_mb:.1f} MB)\n")
+
+    reference = {path: summary(BACKENDS['bs4'](html)) for path, html in pages}
+    speeds = {'bs4': bench('bs4', pages, args.repeat)}
+    for backend in available_backends():
+        if backend not in speeds:
+            speeds[backend] = bench(backend, pages, args.repeat)
+        mismatches = sum(1 for path, html in pages if summary(BACKENDS[backend](html)) != reference[path])
+        print(f"{backend:>10}: {speeds[backend]:8.1f} стр/с, "
+              f"{speeds[backend] / speeds['bs4']:.1f}x, расхождений с bs4: {mismatches}")
+
+    if args.processes:
+        print(f"\nМасштабирование по процессам (бэкенд {available_backends()[0]}):")
+        single = None
+        workers = 1
+        while workers <= args.processes:
+            pages_per_second = bench_processes(pages, args.repeat, workers)
+            single = single or pages_per_second
+            print(f"{workers:>3} проц.: {pages_per_second:8.1f} стр/с ({pages_per_second / single:.1f}x)")
+            workers *= 2
+
+
+if __name__ == '__main__':
+    main()
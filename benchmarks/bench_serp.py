@@ -0,0 +1,129 @@
+"""Офлайн-проверка и замер SERPChecker на сохранённых страницах выдачи.
+
+Страницы из fixtures/serp отдаёт локальный сервер-заглушка вместо Google и Яндекса.
+Скрипт сверяет найденные позиции с ожидаемыми, измеряет скорость разбора
+и сравнивает последовательный run_check с пакетным run_batch.
+
+Запуск:
+    python benchmarks/bench_serp.py [--keywords 20] [--latency 0.05] [--workers 8]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from serp_checker import SERPChecker, SERPCache, PARSERS
+
+FIXTURES = os.path.join(ROOT, 'fixtures', 'serp')
+SITE = 'vitoslavica.ru'
+# Позиции сайта в сохранённых страницах выдачи
+EXPECTED = {'google': [4], 'yandex': [7]}
+
+
+def load_fixture(engine):
+    with open(os.path.join(FIXTURES, f'{engine}.html'), encoding='utf-8') as f:
+        return f.read()
+
+
+def make_handler(pages, latency):
+    class SERPHandler(BaseHTTPRequestHandler):
+        """Первая страница выдачи - из fixtures, остальные пустые"""
+
+        def do_GET(self):
+            time.sleep(latency)
+            parsed = urlparse(self.path)
+            engine = parsed.path.strip('/')
+            query = parse_qs(parsed.query)
+            first_page = query.get('start', query.get('p', ['0']))[0] == '0'
+            body = pages.get(engine, '') if first_page else '<html><body></body></html>'
+            data = body.encode('utf-8')
+            self.send_response(200 if engine in pages else 404)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return SERPHandler
+
+
+def check_parsers():
+    ok = True
+    for engine, parse in PARSERS.items():
+        links = parse(load_fixture(engine))
+        positions = [i for i, link in enumerate(links, start=1) if link and SITE in link]
+        status = 'OK' if positions == EXPECTED[engine] else 'ОШИБКА'
+        ok = ok and positions == EXPECTED[engine]
+        print(f"{engine:>7}: позиции {positions}, ожидалось {EXPECTED[engine]} - {status}")
+    return ok
+
+
+def bench_parsers(repeat):
+    for engine, parse in PARSERS.items():
+        html = load_fixture(engine)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            parse(html)
+        elapsed = time.perf_counter() - start
+        print(f"{engine:>7}: {repeat / elapsed:8.1f} стр/с")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Офлайн-проверка и замер SERPChecker')
+    parser.add_argument('--keywords', type=int, default=20, help='Число ключевых слов')
+    parser.add_argument('--latency', type=float, default=0.05, help='Задержка ответа сервера-заглушки, с')
+    parser.add_argument('--workers', type=int, default=8, help='Потоков в run_batch')
+    parser.add_argument('--repeat', type=int, default=200, help='Повторов для замера разбора')
+    args = parser.parse_args()
+
+    print("Проверка разбора сохранённой выдачи:")
+    parsers_ok = check_parsers()
+    print("\nСкорость разбора:")
+    bench_parsers(args.repeat)
+
+    pages = {engine: load_fixture(engine) for engine in PARSERS}
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(pages, args.latency))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    engine_urls = {
+        'google': base + "/google?q={query}&start={start}",
+        'yandex': base + "/yandex?text={query}&p={page}"
+    }
+    keywords = [f"ключевое слово {i}" for i in range(args.keywords)]
+
+    print(f"\nПроверка {len(keywords)} ключевых слов через локальный сервер (задержка {args.latency} с):")
+    checker = SERPChecker(SITE, engine_urls=engine_urls, min_interval=0)
+    start = time.perf_counter()
+    sequential = checker.run_check(keywords)
+    sequential_time = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        checker = SERPChecker(SITE, engine_urls=engine_urls, cache=SERPCache(cache_dir), min_interval=0)
+        start = time.perf_counter()
+        batch = checker.run_batch(keywords, workers=args.workers)
+        batch_time = time.perf_counter() - start
+        start = time.perf_counter()
+        checker.run_batch(keywords, workers=args.workers)
+        cached_time = time.perf_counter() - start
+    server.shutdown()
+
+    same = sequential == batch
+    print(f"\nrun_check:               {sequential_time:6.2f} с")
+    print(f"run_batch:               {batch_time:6.2f} с ({sequential_time / batch_time:.1f}x)")
+    print(f"run_batch (из кэша):     {cached_time:6.2f} с")
+    print(f"Результаты совпадают: {'да' if same else 'НЕТ'}")
+    if not (parsers_ok and same):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
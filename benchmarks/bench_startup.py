@@ -0,0 +1,87 @@
+"""Время запуска инструментов: от старта процесса до начала работы.
+
+Для каждой подкоманды seo_cli замеряется запуск `seo_cli.py <команда> --help`
+(импорт только нужного модуля и разбор аргументов) и импорт модуля инструмента.
+С --ref те же модули импортируются из указанной ревизии git - так видно, сколько
+стоили прежние скрипты, которые сразу импортировали pandas и BeautifulSoup и
+потом ждали input(). Берётся лучший из --repeat запусков.
+
+Запуск:
+    python benchmarks/bench_startup.py [--ref baseline] [--repeat 5] [--importtime]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from seo_cli import COMMANDS
+
+
+def best_time(command, cwd, repeat):
+    """Лучшее время выполнения команды в отдельном процессе, с"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def checkout(ref, folder):
+    """Файлы ревизии ref во временной папке (git archive, без изменения рабочей копии)"""
+    archive = subprocess.run(['git', 'archive', ref], cwd=ROOT, capture_output=True, check=True).stdout
+    path = os.path.join(folder, 'tree.tar')
+    with open(path, 'wb') as f:
+        f.write(archive)
+    with tarfile.open(path) as tar:
+        tar.extractall(folder)
+    return folder
+
+
+def slowest_imports(module, cwd, limit=5):
+    """Самые дорогие импорты модуля по python -X importtime: [(мс, имя)]"""
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                             cwd=cwd, capture_output=True, text=True)
+    rows = []
+    for line in process.stderr.splitlines():
+        parts = line.split('|')
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]) / 1000, parts[2].strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Время запуска инструментов')
+    parser.add_argument('--ref', help='Ревизия git со старыми скриптами для сравнения')
+    parser.add_argument('--repeat', type=int, default=5, help='Запусков каждой команды')
+    parser.add_argument('--importtime', action='store_true', help='Показать самые дорогие импорты')
+    args = parser.parse_args()
+
+    empty = best_time([sys.executable, '-c', 'pass'], ROOT, args.repeat)
+    print(f"Пустой интерпретатор: {empty * 1000:.0f} мс\n")
+    with tempfile.TemporaryDirectory() as folder:
+        old_root = checkout(args.ref, folder) if args.ref else None
+        header = f"{'команда':>8} {'seo_cli --help':>15} {'import':>8}"
+        print(header + (f" {'import в ' + args.ref:>20}" if old_root else ''))
+        for name, (module, _) in COMMANDS.items():
+            cli = best_time([sys.executable, 'seo_cli.py', name, '--help'], ROOT, args.repeat)
+            new = best_time([sys.executable, '-c', f'import {module}'], ROOT, args.repeat)
+            line = f"{name:>8} {cli * 1000:12.0f} мс {new * 1000:5.0f} мс"
+            if old_root:
+                old = best_time([sys.executable, '-c', f'import {module}'], old_root, args.repeat)
+                line += f" {old * 1000:17.0f} мс (быстрее на {(1 - new / old) * 100:.0f}%)"
+            print(line)
+            if args.importtime:
+                for ms, imported in slowest_imports(module, ROOT):
+                    print(f"{'':>10}{ms:7.0f} мс  {imported}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+"""Офлайн-замер всех инструментов на синтетическом сайте (benchmarks/synthetic_site.py).
+
+Каждый инструмент запускается в отдельном процессе, чтобы пиковая память и время CPU
+относились только к нему. Для каждого записываются единицы работы в секунду
+(страницы, ссылки, изображения, запросы выдачи), MB/s по отданным сервером байтам,
+пиковый RSS и время CPU. Результаты сохраняются в JSON; с --compare выводится
+разница с прошлым прогоном.
+
+Запуск:
+    python benchmarks/bench_tools.py [--pages 200] [--latency 0.01] [--error-rate 0.02]
+        [--throttle-rate 0.01] [--tools analyzer,links,images] [--compare прошлый.json]
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_site import SiteConfig, SyntheticSite, SERP_SITE
+
+TOOLS = ('analyzer', 'pipeline', 'links', 'images', 'largest', 'serp')
+WORKERS = 8
+
+
+def run_analyzer(base_url, options):
+    from SEO_Site_Analyzer import AdvancedSEOAnalyzer
+    analyzer = AdvancedSEOAnalyzer(max_pages=options['pages'], delay=0, max_concurrency=WORKERS,
+                                   per_host_concurrency=WORKERS)
+    return len(analyzer.crawl_sites([base_url + '/']))
+
+
+def run_pipeline(base_url, options):
+    from SEO_Site_Analyzer import AdvancedSEOAnalyzer
+    analyzer = AdvancedSEOAnalyzer(max_pages=options['pages'], delay=0, max_concurrency=WORKERS,
+                                   per_host_concurrency=WORKERS)
+    return len(analyzer.crawl_site_pipeline(base_url + '/'))
+
+
+def run_links(base_url, options):
+    from check_broken_links import check_links
+    from throttle import AdaptiveThrottle
+    throttle = AdaptiveThrottle(initial_interval=0, max_concurrency=WORKERS)
+    return len(check_links(base_url + '/', max_pages=options['pages'], workers=WORKERS, throttle=throttle))
+
+
+def count_images(folder):
+    return sum(1 for name in os.listdir(folder) if name.endswith('.jpg'))
+
+
+def run_images(base_url, options):
+    import image_downloader
+    with tempfile.TemporaryDirectory() as folder:
+        image_downloader.download_images(base_url + '/gallery.html', folder, workers=WORKERS)
+        return count_images(folder)
+
+
+def run_largest(base_url, options):
+    import largest_image_downloader
+    with tempfile.TemporaryDirectory() as folder:
+        largest_image_downloader.download_images(base_url + '/gallery.html', folder)
+        return count_images(folder)
+
+
+def run_serp(base_url, options):
+    from serp_checker import SERPChecker
+    engine_urls = {
+        'google': base_url + "/google?q={query}&start={start}",
+        'yandex': base_url + "/yandex?text={query}&p={page}"
+    }
+    checker = SERPChecker(SERP_SITE, engine_urls=engine_urls, min_interval=0)
+    keywords = [f"ключевое слово {i}" for i in range(options['keywords'])]
+    results = checker.run_batch(keywords, workers=WORKERS)
+    return len(results) * 2
+
+
+RUNNERS = {
+    'analyzer': run_analyzer,
+    'pipeline': run_pipeline,
+    'links': run_links,
+    'images': run_images,
+    'largest': run_largest,
+    'serp': run_serp,
+}
+
+
+def child_main(tool, base_url, options):
+    """Выполняется в дочернем процессе: запускает инструмент и печатает замеры в JSON"""
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        units = RUNNERS[tool](base_url, options)
+    wall = time.perf_counter() - start
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    print(json.dumps({
+        'units': units,
+        'wall_s': wall,
+        'cpu_s': own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime,
+        # ru_maxrss в Linux - в килобайтах; для пула процессов берётся самый большой из них
+        'peak_rss_mb': max(own.ru_maxrss, children.ru_maxrss) / 1024
+    }))
+
+
+def run_tool(site, tool, options):
+    site.reset_stats()
+    process = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', tool, site.base_url, json.dumps(options)],
+        capture_output=True, text=True)
+    if process.returncode != 0:
+        print(process.stderr, file=sys.stderr)
+        return {'error': process.stderr.strip().splitlines()[-1] if process.stderr.strip() else 'ошибка'}
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    wall = result['wall_s']
+    result.update({
+        'units_per_s': result['units'] / wall if wall else 0.0,
+        'mb_per_s': site.stats['bytes'] / 1024 / 1024 / wall if wall else 0.0,
+        'requests': site.stats['requests'],
+        'statuses': dict(site.stats['statuses'])
+    })
+    return result
+
+
+def compare(previous_path, results):
+    with open(previous_path, encoding='utf-8') as f:
+        previous = json.load(f)['results']
+    print(f"\nСравнение с {previous_path}:")
+    for tool, result in results.items():
+        before = previous.get(tool)
+        if not before or 'error' in before or 'error' in result:
+            continue
+        change = (result['units_per_s'] / before['units_per_s'] - 1) * 100 if before['units_per_s'] else 0.0
+        print(f"{tool:>9}: {before['units_per_s']:8.1f} -> {result['units_per_s']:8.1f} ед/с ({change:+.0f}%), "
+              f"RSS {before['peak_rss_mb']:.0f} -> {result['peak_rss_mb']:.0f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Офлайн-замер инструментов на синтетическом сайте')
+    parser.add_argument('--pages', type=int, default=200, help='Страниц на сайте (и лимит обхода)')
+    parser.add_argument('--fanout', type=int, default=8, help='Ссылок на странице')
+    parser.add_argument('--images', type=int, default=4, help='Изображений на странице')
+    parser.add_argument('--gallery-images', type=int, default=40, help='Изображений в галерее')
+    parser.add_argument('--image-kb', type=int, default=50, help='Размер изображения, KB')
+    parser.add_argument('--latency', type=float, default=0.01, help='Задержка ответа, с')
+    parser.add_argument('--error-rate', type=float, default=0.02, help='Доля страниц с 404')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Доля запросов с 429')
+    parser.add_argument('--sitemap', action='store_true', help='Отдавать sitemap.xml')
+    parser.add_argument('--keywords', type=int, default=20, help='Ключевых слов для SERPChecker')
+    parser.add_argument('--tools', default=','.join(TOOLS), help='Инструменты через запятую')
+    parser.add_argument('--output', help='Файл результатов (по умолчанию bench_results_<время>.json)')
+    parser.add_argument('--compare', help='Прошлый файл результатов для сравнения')
+    parser.add_argument('--child', nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        tool, base_url, options = args.child
+        child_main(tool, base_url, json.loads(options))
+        return
+
+    config = SiteConfig(pages=args.pages, fanout=args.fanout, images=args.images, image_kb=args.image_kb,
+                        gallery_images=args.gallery_images, latency=args.latency, error_rate=args.error_rate,
+                        throttle_rate=args.throttle_rate, sitemap=args.sitemap)
+    options = {'pages': args.pages, 'keywords': args.keywords}
+    tools = [tool.strip() for tool in args.tools.split(',') if tool.strip()]
+    unknown = [tool for tool in tools if tool not in RUNNERS]
+    if unknown:
+        parser.error(f"неизвестные инструменты: {', '.join(unknown)}")
+
+    site = SyntheticSite(config)
+    site.start()
+    print(f"Синтетический сайт: {site.base_url} ({args.pages} страниц, задержка {args.latency} с, "
+          f"404 {args.error_rate:.0%}, 429 {args.throttle_rate:.0%})")
+    results = {}
+    try:
+        for tool in tools:
+            result = results[tool] = run_tool(site, tool, options)
+            if 'error' in result:
+                print(f"{tool:>9}: ОШИБКА - {result['error']}")
+                continue
+            print(f"{tool:>9}: {result['units']:5d} ед за {result['wall_s']:6.2f} с = {result['units_per_s']:7.1f} ед/с, "
+                  f"{result['mb_per_s']:6.2f} MB/s, RSS {result['peak_rss_mb']:6.1f} MB, CPU {result['cpu_s']:6.2f} с")
+    finally:
+        site.stop()
+
+    output = args.output or f"bench_results_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+            'site': config.to_dict(),
+            'options': options,
+            'results': results
+        }, f, ensure_ascii=False, indent=2)
+    print(f"\nРезультаты сохранены в {output}")
+    if args.compare:
+        compare(args.compare, results)
+    if any('error' in result for result in results.values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+"""Синтетический сайт на локальном HTTP-сервере для офлайн-замеров.
+
+Страницы, ссылки, изображения и выдача поисковиков генерируются детерминированно
+из номера страницы, поэтому прогоны на одинаковых настройках сравнимы между собой.
+Задержка ответа, доля 404 и доля 429 задаются параметрами.
+
+Запуск отдельно (сервер работает до Ctrl+C):
+    python benchmarks/synthetic_site.py [--pages 200] [--latency 0.01] [--port 8000]
+"""
+import argparse
+import hashlib
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+SERP_SITE = 'bench.local'
+
+
+class SiteConfig:
+    """Параметры синтетического сайта"""
+
+    def __init__(self, pages=200, fanout=8, images=4, image_kb=50, gallery_images=40, latency=0.0,
+                 error_rate=0.0, throttle_rate=0.0, sitemap=False, seed=1):
+        self.pages = pages
+        self.fanout = fanout                # ссылок на другие страницы с каждой страницы
+        self.images = images                # изображений на странице
+        self.image_kb = image_kb            # размер полного изображения, KB
+        self.gallery_images = gallery_images
+        self.latency = latency              # задержка перед каждым ответом, с
+        self.error_rate = error_rate        # доля страниц, отвечающих 404
+        self.throttle_rate = throttle_rate  # доля запросов, получающих 429
+        self.sitemap = sitemap              # отдавать ли sitemap.xml со всеми страницами
+        self.seed = seed
+
+    def to_dict(self):
+        return dict(vars(self))
+
+
+def share(key, seed):
+    """Детерминированное число в [0, 1) для строки key"""
+    digest = hashlib.md5(f"{seed}:{key}".encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') / 2 ** 64
+
+
+def page_html(config, n):
+    links = ''.join(f'<li><a href="/page/{(n * config.fanout + i + 1) % config.pages}.html">Ссылка {i}</a></li>'
+                    for i in range(config.fanout))
+    images = ''
+    for i in range(config.images):
+        # Каждое третье изображение - без alt
+        alt = '' if i % 3 == 2 else f' alt="Изображение {i}"'
+        images += f'<img src="/img/{n}-{i}.jpg" srcset="/img/{n}-{i}-480w.jpg 480w, /img/{n}-{i}.jpg 1200w"{alt}>'
+    paragraph = '<p>' + 'Текст синтетической страницы для замера скорости обхода. ' * 20 + '</p>'
+    return f'''<!DOCTYPE html>
+<html lang="ru"><head><meta charset="utf-8">
+<title>Страница {n} - синтетический сайт для замеров производительности</title>
+<meta name="description" content="Описание страницы {n}: {'подробное описание содержимого страницы ' * 3}">
+<meta property="og:title" content="Страница {n}"><meta property="og:type" content="article">
+<meta name="twitter:card" content="summary">
+<script type="application/ld+json">{{"@context": "https://schema.org", "@type": "Article"}}</script>
+</head><body>
+<h1>Страница {n}</h1><h2>Раздел 1</h2>{paragraph}<h2>Раздел 2</h2><h3>Подраздел</h3>{paragraph}
+{images}<ul>{links}</ul>
+</body></html>'''
+
+
+def gallery_html(config):
+    images = ''.join(
+        f'<img src="/img/g-{i}.jpg" srcset="/img/g-{i}-480w.jpg 480w, /img/g-{i}.jpg 1200w" alt="{i}">'
+        for i in range(config.gallery_images))
+    return f'<html><head><title>Галерея</title></head><body>{images}</body></html>'
+
+
+def image_bytes(config, path):
+    """Уникальное содержимое для каждого адреса, чтобы изображения не считались дубликатами"""
+    size = config.image_kb * 1024 // (4 if '-480w' in path else 1)
+    header = b'\xff\xd8\xff\xe0' + path.encode('utf-8')
+    return header + b'\0' * max(0, size - len(header))
+
+
+def serp_html(engine, keyword):
+    """Первая страница выдачи: сайт SERP_SITE на позиции, зависящей от запроса"""
+    position = int(share(keyword, engine) * 10) + 1
+    results = []
+    for i in range(1, 11):
+        host = SERP_SITE if i == position else f"other{i}.example"
+        if engine == 'google':
+            results.append(f'<div class="g"><a href="https://{host}/{i}">Результат {i}</a></div>')
+        else:
+            results.append(f'<li class="serp-item"><a class="organic__url" href="https://{host}/{i}">'
+                           f'Результат {i}</a></li>')
+    items = ''.join(results)
+    return f'<html><body>{items if engine == "google" else "<ul>" + items + "</ul>"}</body></html>'
+
+
+class SyntheticSite:
+    """Локальный сервер синтетического сайта со счётчиками запросов и отданных байтов"""
+
+    def __init__(self, config=None, host='127.0.0.1', port=0):
+        self.config = config or SiteConfig()
+        self.random = random.Random(self.config.seed)
+        self.lock = threading.Lock()
+        self.reset_stats()
+        self.server = ThreadingHTTPServer((host, port), self.make_handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def reset_stats(self):
+        with self.lock:
+            self.stats = {'requests': 0, 'bytes': 0, 'statuses': {}}
+
+    def count(self, status, size):
+        with self.lock:
+            self.stats['requests'] += 1
+            self.stats['bytes'] += size
+            self.stats['statuses'][str(status)] = self.stats['statuses'].get(str(status), 0) + 1
+
+    def throttled(self):
+        with self.lock:
+            return self.random.random() < self.config.throttle_rate
+
+    def route(self, path, query):
+        """(статус, Content-Type, тело) для запрошенного адреса"""
+        config = self.config
+        if path == '/robots.txt':
+            sitemap = f"Sitemap: {self.base_url}/sitemap.xml\n" if config.sitemap else ''
+            return 200, 'text/plain', f"User-agent: *\nAllow: /\n{sitemap}".encode('utf-8')
+        if path == '/sitemap.xml' and config.sitemap:
+            urls = ''.join(f'<url><loc>{self.base_url}/page/{n}.html</loc><lastmod>2024-01-{n % 28 + 1:02d}</lastmod></url>'
+                           for n in range(config.pages))
+            return 200, 'application/xml', (
+                f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>').encode('utf-8')
+        if path in ('/google', '/yandex'):
+            engine = path.strip('/')
+            first_page = query.get('start', query.get('p', ['0']))[0] == '0'
+            keyword = query.get('q', query.get('text', ['']))[0]
+            body = serp_html(engine, keyword) if first_page else '<html><body></body></html>'
+            return 200, 'text/html; charset=utf-8', body.encode('utf-8')
+        if path == '/gallery.html':
+            return 200, 'text/html; charset=utf-8', gallery_html(config).encode('utf-8')
+        if path.startswith('/img/') and path.endswith('.jpg'):
+            return 200, 'image/jpeg', image_bytes(config, path)
+
+        if path in ('/', '/index.html'):
+            n = 0
+        elif path.startswith('/page/') and path.endswith('.html') and path[6:-5].isdigit():
+            n = int(path[6:-5])
+            # Главная страница всегда доступна, остальные - с заданной долей 404
+            if n >= config.pages or (n and share(path, config.seed) < config.error_rate):
+                return 404, 'text/html', b'<html><body>Not found</body></html>'
+        else:
+            return 404, 'text/html', b'<html><body>Not found</body></html>'
+        return 200, 'text/html; charset=utf-8', page_html(config, n).encode('utf-8')
+
+    def make_handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Заголовки и тело уходят разными записями: без этого тело ждёт задержанного ACK
+            disable_nagle_algorithm = True
+
+            def respond(self, send_body):
+                if site.config.latency:
+                    time.sleep(site.config.latency)
+                parsed = urlparse(self.path)
+                if parsed.path != '/robots.txt' and site.throttled():
+                    status, content_type, body = 429, 'text/plain', b'Too Many Requests'
+                else:
+                    status, content_type, body = site.route(parsed.path, parse_qs(parsed.query))
+                self.send_response(status)
+                if status == 429:
+                    self.send_header('Retry-After', '0')
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if send_body:
+                    self.wfile.write(body)
+                site.count(status, len(body) if send_body else 0)
+
+            def do_GET(self):
+                self.respond(True)
+
+            def do_HEAD(self):
+                self.respond(False)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Локальный синтетический сайт для замеров')
+    parser.add_argument('--pages', type=int, default=200, help='Число страниц')
+    parser.add_argument('--fanout', type=int, default=8, help='Ссылок на странице')
+    parser.add_argument('--images', type=int, default=4, help='Изображений на странице')
+    parser.add_argument('--image-kb', type=int, default=50, help='Размер изображения, KB')
+    parser.add_argument('--latency', type=float, default=0.0, help='Задержка ответа, с')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Доля страниц с 404')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Доля запросов с 429')
+    parser.add_argument('--sitemap', action='store_true', help='Отдавать sitemap.xml')
+    parser.add_argument('--port', type=int, default=8000, help='Порт сервера')
+    args = parser.parse_args()
+
+    config = SiteConfig(pages=args.pages, fanout=args.fanout, images=args.images, image_kb=args.image_kb,
+                        latency=args.latency, error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+                        sitemap=args.sitemap)
+    site = SyntheticSite(config, port=args.port)
+    print(f"Синтетический сайт: {site.base_url}/ (Ctrl+C - остановить)")
+    try:
+        site.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        site.server.server_close()
+
+
+if __name__ == '__main__':
+    main()
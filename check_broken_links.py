@@ -1,61 +1,242 @@
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
+import argparse
+import numbers
 import time
-from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urljoin, urlparse
+from throttle import AdaptiveThrottle
+from http_cache import HTTPCache
+from frontier import normalize_url
+from metrics import Metrics, profiled, progress_from_env
+from checkpoint import CrawlCheckpoint
+import transport
 
-def check_broken_links(start_url, max_pages=50):
-    """Проверяет сайт на битые ссылки."""
-    domain = urlparse(start_url).netloc  # Извлекаем домен
-    visited = set()
-    broken_links = []
-    to_visit = {start_url}
+USER_AGENT = 'Mozilla/5.0'
+LINKS_CHECKPOINT_PATH = '.links_checkpoint.sqlite'
+# Расширения, которые точно не являются HTML-страницами
+NON_HTML_EXTENSIONS = ('.pdf', '.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg',
+                       '.zip', '.rar', '.mp3', '.mp4', '.avi', '.doc', '.docx',
+                       '.xls', '.xlsx', '.css', '.js', '.ico')
 
-    while to_visit and len(visited) < max_pages:
-        url = to_visit.pop()
-        if url in visited:
-            continue
+def create_session(pool_size=10):
+    """Создаёт сессию с пулом соединений, переиспользуемых для каждого хоста.
+    Внешние ссылки ведут на много разных хостов - их пулы тоже держатся открытыми"""
+    return transport.create_session(pool_size=pool_size, pool_hosts=max(32, pool_size * 4), user_agent=USER_AGENT)
+
+def probe_url(session, url):
+    """Проверяет ссылку без загрузки тела: HEAD, а при отказе - GET первого байта"""
+    response = session.head(url, timeout=10, allow_redirects=True)
+    if response.status_code in (403, 405, 501):
+        # Сервер не поддерживает HEAD - запрашиваем только первый байт
+        response = session.get(url, timeout=10, stream=True, allow_redirects=True,
+                               headers={'Range': 'bytes=0-0'})
+        response.close()
+    return response
+
+def is_html_response(response):
+    """Успешный ответ с HTML-страницей, которую нужно разобрать"""
+    return response.status_code < 400 and 'html' in response.headers.get('Content-Type', '')
+
+def fetch_page(session, url, domain, cache=None, metrics=None):
+    """Загружает внутреннюю страницу и возвращает ответ и найденные ссылки"""
+    if cache:
+        response = cache.get(session, url, timeout=10)
+        if response.not_modified:
+            links = cache.get_derived(url, 'links')
+            if links is not None:
+                return response, links
+    else:
+        response = session.get(url, timeout=10, stream=True)
+    if not is_html_response(response):
+        response.close()
+        return response, []
 
+    # bs4 импортируется при первой разобранной странице, а не при запуске программы
+    from bs4 import BeautifulSoup
+    start = time.monotonic()
+    soup = BeautifulSoup(response.text, 'html.parser')
+    links = []
+    for link in soup.find_all('a', href=True):
         try:
-            response = requests.get(url, timeout=10)
-            visited.add(url)
-            print(f"Проверено: {url} ({len(visited)}/{max_pages})")
+            full_url = urljoin(url, link['href'])
+        except ValueError:
+            # Неразбираемая ссылка (например, http://[::1) пропускается, а не роняет страницу
+            continue
+        if urlparse(full_url).scheme in ('http', 'https'):
+            links.append(normalize_url(full_url))
+    if metrics:
+        metrics.observe('parse', time.monotonic() - start)
+    if cache:
+        cache.set_derived(url, 'links', links)
+    return response, links
+
+def is_page(url, domain):
+    """Внутренняя ссылка, которую нужно скачать и разобрать"""
+    parsed = urlparse(url)
+    return parsed.netloc == domain and not parsed.path.lower().endswith(NON_HTML_EXTENSIONS)
+
+def check_links(start_url, max_pages=50, workers=10, cache=None, throttle=None, metrics=None, checkpoint=None):
+    """Параллельно проверяет все ссылки сайта и возвращает статус каждой из них.
+    С checkpoint (CrawlCheckpoint) продолжает прерванную проверку, не запрашивая проверенные ссылки."""
+    start_url = normalize_url(start_url)
+    domain = urlparse(start_url).netloc  # Извлекаем домен
+    session = create_session(pool_size=workers)
+    # Темп для каждого хоста подстраивается под его ответы (429/503, Retry-After, время ответа)
+    metrics = metrics or Metrics('broken_links')
+    throttle = throttle or AdaptiveThrottle(initial_interval=0.5, max_concurrency=workers, metrics=metrics)
+    statuses = {}  # URL -> {'URL', 'Status', 'Source'}
+    pages_fetched = 0
+    if checkpoint:
+        throttle.restore(checkpoint.load_state('throttle'))
+        checkpoint.track('throttle', throttle.snapshot)
 
-            if response.status_code == 404:
-                broken_links.append(url)
+    def task(url, as_page):
+        links = []
+
+        def request():
+            nonlocal links
+            start = time.monotonic()
+            if as_page:
+                response, links = fetch_page(session, url, domain, cache, metrics)
+                size = len(response.content) if is_html_response(response) else None
+                metrics.record_response(response, time.monotonic() - start, size)
             else:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                for link in soup.find_all('a', href=True):
-                    href = link['href']
-                    if href.startswith('http') and domain in href:
-                        to_visit.add(href)
-            
-            time.sleep(0.5)  # Защита от блокировки
+                response = probe_url(session, url)
+                metrics.record_response(response, time.monotonic() - start, 0, prefix='probe')
+            return response
 
-        except Exception as e:
-            print(f"Ошибка при проверке {url}: {str(e)}")
-            broken_links.append(url)
+        # Защита от блокировки: запрос выполняется в темпе, допустимом для хоста
+        response = throttle.call(urlparse(url).netloc, request)
+        if as_page:
+            metrics.count('pages')
+        if is_rate_limited(response.status_code):
+            metrics.count('rate_limited')
+        return response.status_code, links
 
-    return broken_links
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {}
 
-def main():
+        def schedule(url, source, as_page=None):
+            nonlocal pages_fetched
+            statuses[url] = {'URL': url, 'Status': None, 'Source': source}
+            if as_page is None:
+                as_page = is_page(url, domain) and pages_fetched < max_pages
+                if checkpoint:
+                    checkpoint.queued(url, domain, data={'Source': source, 'Page': as_page})
+            if as_page:
+                pages_fetched += 1
+            pending[executor.submit(task, url, as_page)] = (url, as_page)
+
+        if checkpoint and checkpoint.has(domain):
+            # Продолжение: проверенные ссылки берутся из контрольной точки, очередь запускается заново
+            done, queued = checkpoint.load(domain)
+            for url, data, _ in done:
+                statuses[url] = {'URL': url, 'Status': data['Status'], 'Source': data['Source']}
+                pages_fetched += bool(data['Page'])
+            print(f"Продолжаю проверку: готово {len(done)} ссылок, в очереди {len(queued)}")
+            for url, _, _, data in queued:
+                schedule(url, data['Source'], data['Page'])
+        else:
+            schedule(start_url, '')
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                url, as_page = pending.pop(future)
+                try:
+                    status, links = future.result()
+                except Exception as e:
+                    print(f"Ошибка при проверке {url}: {str(e)}")
+                    statuses[url]['Status'] = 'Ошибка'
+                    metrics.count('errors')
+                    continue
+
+                statuses[url]['Status'] = status
+                note = ', ограничение запросов' if is_rate_limited(status) else ''
+                print(f"Проверено: {url} [{status}{note}] ({pages_fetched}/{max_pages} страниц)")
+                for link in links:
+                    if link not in statuses:
+                        schedule(link, url)
+                if checkpoint and not is_rate_limited(status):
+                    # Ссылка отмечается проверенной после того, как найденные на странице ссылки в очереди
+                    checkpoint.done(url, domain, {'Status': status, 'Source': statuses[url]['Source'],
+                                                  'Page': as_page}, links)
+
+    session.close()
+    return list(statuses.values())
+
+def is_rate_limited(status):
+    """Сервер так и не ответил ничем, кроме 429: ссылка не проверена, а не битая"""
+    return status == 429
+
+def is_broken(status):
+    """Ссылка считается битой при ошибке запроса или коде 4xx/5xx (кроме 429)"""
+    return not isinstance(status, numbers.Integral) or (status >= 400 and not is_rate_limited(status))
+
+def check_broken_links(start_url, max_pages=50):
+    """Проверяет сайт на битые ссылки."""
+    return [row['URL'] for row in check_links(start_url, max_pages) if is_broken(row['Status'])]
+
+def add_arguments(parser):
+    parser.add_argument('url', nargs='?', help='URL сайта (без аргумента спрашивается интерактивно)')
+    parser.add_argument('--max-pages', type=int, default=2000, help='Сколько внутренних страниц разобрать')
+    parser.add_argument('--workers', type=int, default=10, help='Одновременных запросов')
+    parser.add_argument('--output', help='Файл отчета (по умолчанию broken_links_<домен>.csv)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Продолжить прерванную проверку с контрольной точки')
+
+def run(args):
+    """Проверка сайта по разобранным аргументам командной строки"""
     print("=== Проверка битых ссылок на сайте ===")
-    site_url = input("Введите URL сайта (например, https://vitoslavica.ru): ").strip()
-    
+    site_url = args.url or input("Введите URL сайта (например, https://vitoslavica.ru): ").strip()
+
     if not site_url.startswith(('http://', 'https://')):
         site_url = 'https://' + site_url  # Добавляем схему по умолчанию
 
     print(f"\n🔍 Начинаю проверку: {site_url}")
-    broken_links = check_broken_links(site_url, max_pages=2000)  # Уменьшено для теста
+    cache = HTTPCache()
+    # SEO_PROGRESS=1 - строка прогресса, SEO_PROFILE=cprofile|pyinstrument - профиль прогона
+    metrics = Metrics('broken_links', progress=progress_from_env())
+    throttle = AdaptiveThrottle(initial_interval=0.5, metrics=metrics)
+    # Состояние проверки периодически сохраняется - после сбоя её можно продолжить с --resume
+    checkpoint = CrawlCheckpoint(LINKS_CHECKPOINT_PATH, resume=args.resume)
+    try:
+        with profiled(output='profile_broken_links'):
+            link_statuses = check_links(site_url, max_pages=args.max_pages, workers=args.workers, cache=cache,
+                                        throttle=throttle, metrics=metrics, checkpoint=checkpoint)
+    finally:
+        print(checkpoint.report())
+        checkpoint.close()
+    broken_links = [row for row in link_statuses if is_broken(row['Status'])]
 
     # Генерируем имя файла на основе домена
     domain = urlparse(site_url).netloc.replace('.', '_')
-    report_filename = f"broken_links_{domain}.csv"
-    
-    # Сохраняем отчет
-    pd.DataFrame(broken_links, columns=["Битые ссылки"]).to_csv(report_filename, index=False)
+    report_filename = args.output or f"broken_links_{domain}.csv"
+
+    # Сохраняем отчет по всем ссылкам, битые - первыми
+    # (pandas нужен только здесь, поэтому не замедляет запуск программы)
+    import pandas as pd
+    df = pd.DataFrame(link_statuses, columns=['URL', 'Status', 'Source'])
+    df.columns = ["Ссылка", "Статус", "Найдена на странице"]
+    df.insert(2, "Битая", df["Статус"].map(is_broken))
+    df.insert(3, "Ограничение запросов", df["Статус"].map(is_rate_limited))
+    df.sort_values("Битая", ascending=False, kind='stable').to_csv(report_filename, index=False)
     print(f"\n✅ Отчет сохранен в файл: {report_filename}")
+    print(f"Проверено ссылок: {len(link_statuses)}")
     print(f"Найдено битых ссылок: {len(broken_links)}")
+    rate_limited = sum(1 for row in link_statuses if is_rate_limited(row['Status']))
+    if rate_limited:
+        print(f"⚠️ Не проверено из-за ограничения запросов (429): {rate_limited} - "
+              f"повторите позже с --resume")
+    print(cache.report())
+    print(throttle.report())
+    print(transport.report())
+    print(metrics.report())
+    print(f"Метрики сохранены в {metrics.save(f'metrics_broken_links_{domain}.json')}")
+    cache.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Проверка битых ссылок на сайте')
+    add_arguments(parser)
+    run(parser.parse_args())
 
 if __name__ == "__main__":
     main()
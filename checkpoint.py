@@ -0,0 +1,115 @@
+import json
+import sqlite3
+import threading
+import time
+
+DEFAULT_CHECKPOINT_PATH = '.crawl_checkpoint.sqlite'
+
+
+class CrawlCheckpoint:
+    """Контрольная точка обхода в SQLite (WAL): очередь, обработанные URL с результатами
+    и произвольное состояние (например, темп хостов из AdaptiveThrottle).
+
+    Изменения копятся в памяти и записываются одной транзакцией раз в flush_interval
+    секунд, поэтому запись почти не замедляет обход. При сбое теряется не больше
+    последнего интервала - эти страницы просто загрузятся ещё раз."""
+
+    def __init__(self, path=DEFAULT_CHECKPOINT_PATH, resume=False, flush_interval=2.0, max_pending=1000):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        # В режиме WAL NORMAL не теряет целостность базы, а fsync делается реже
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute('''CREATE TABLE IF NOT EXISTS pages (
+            url TEXT PRIMARY KEY,
+            domain TEXT,
+            depth INTEGER,
+            priority REAL,
+            done INTEGER DEFAULT 0,
+            data TEXT,
+            links TEXT)''')
+        self.db.execute('CREATE INDEX IF NOT EXISTS idx_domain_done ON pages (domain, done)')
+        self.db.execute('CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT)')
+        if not resume:
+            self.db.execute('DELETE FROM pages')
+            self.db.execute('DELETE FROM state')
+        self.db.commit()
+        self.queued_rows = []
+        self.done_rows = []
+        self.providers = {}  # ключ -> функция, возвращающая состояние для сохранения
+        self.last_flush = time.monotonic()
+        self.flush_time = 0.0
+
+    def track(self, key, provider):
+        """Сохранять при каждой записи состояние provider() под ключом key"""
+        self.providers[key] = provider
+
+    def queued(self, url, domain, depth=0, priority=0, data=None):
+        with self.lock:
+            self.queued_rows.append((url, domain, depth, priority, json.dumps(data) if data is not None else None))
+        self.maybe_flush()
+
+    def done(self, url, domain, data=None, links=None):
+        with self.lock:
+            self.done_rows.append((url, domain, json.dumps(data, default=str), json.dumps(links or [])))
+        self.maybe_flush()
+
+    def maybe_flush(self):
+        if time.monotonic() - self.last_flush >= self.flush_interval or \
+                len(self.queued_rows) + len(self.done_rows) >= self.max_pending:
+            self.flush()
+
+    def flush(self):
+        """Записывает накопленные изменения одной транзакцией"""
+        start = time.monotonic()
+        state = [(key, json.dumps(provider())) for key, provider in self.providers.items()]
+        with self.lock:
+            queued, self.queued_rows = self.queued_rows, []
+            done, self.done_rows = self.done_rows, []
+            with self.db:
+                self.db.executemany('INSERT OR IGNORE INTO pages (url, domain, depth, priority, data) '
+                                    'VALUES (?, ?, ?, ?, ?)', queued)
+                self.db.executemany('INSERT INTO pages (url, domain, done, data, links) VALUES (?, ?, 1, ?, ?) '
+                                    'ON CONFLICT(url) DO UPDATE SET done = 1, data = excluded.data, '
+                                    'links = excluded.links', done)
+                self.db.executemany('INSERT OR REPLACE INTO state VALUES (?, ?)', state)
+            self.last_flush = time.monotonic()
+            self.flush_time += self.last_flush - start
+
+    def has(self, domain):
+        with self.lock:
+            return self.db.execute('SELECT 1 FROM pages WHERE domain = ? LIMIT 1', (domain,)).fetchone() is not None
+
+    def load(self, domain):
+        """Состояние сайта: ([(url, data, links)] обработанных, [(url, depth, priority, data)] в очереди)"""
+        with self.lock:
+            rows = self.db.execute('SELECT url, depth, priority, done, data, links FROM pages '
+                                   'WHERE domain = ? ORDER BY rowid', (domain,)).fetchall()
+        done, pending = [], []
+        for url, depth, priority, is_done, data, links in rows:
+            data = json.loads(data) if data else None
+            if is_done:
+                done.append((url, data, json.loads(links) if links else []))
+            else:
+                pending.append((url, depth or 0, priority or 0, data))
+        return done, pending
+
+    def load_state(self, key):
+        with self.lock:
+            row = self.db.execute('SELECT value FROM state WHERE key = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def report(self):
+        self.flush()
+        with self.lock:
+            done, total = self.db.execute('SELECT COALESCE(SUM(done), 0), COUNT(*) FROM pages').fetchone()
+        return (f"Контрольная точка {self.path}: обработано {done} из {total} URL, "
+                f"запись заняла {self.flush_time:.2f} с")
+
+    def close(self):
+        self.flush()
+        with self.lock:
+            self.db.close()
@@ -0,0 +1,162 @@
+import gzip
+import mmap
+import os
+import sqlite3
+import threading
+import uuid
+import zlib
+from datetime import datetime, timezone
+from http.client import responses as HTTP_REASONS
+from requests.structures import CaseInsensitiveDict
+
+# Заголовки, которые теряют смысл после распаковки тела requests
+DROPPED_HEADERS = ('content-encoding', 'transfer-encoding', 'content-length')
+
+
+class ArchivedResponse:
+    """Ответ из архива с тем же интерфейсом, что и requests.Response"""
+
+    def __init__(self, url, status_code, headers, content, encoding):
+        self.url = url
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.content = content
+        self.encoding = encoding
+        self.from_archive = True
+        self.not_modified = False
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+    def raise_for_status(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def build_record(url, status_code, headers, content):
+    """WARC/1.0 запись типа response: заголовки WARC, затем HTTP-ответ с распакованным телом"""
+    http_headers = ''.join(f"{name}: {value}\r\n" for name, value in headers.items()
+                           if name.lower() not in DROPPED_HEADERS)
+    http_block = (f"HTTP/1.1 {status_code} {HTTP_REASONS.get(status_code, '')}\r\n{http_headers}"
+                  f"Content-Length: {len(content)}\r\n\r\n").encode('utf-8') + content
+    warc_headers = (
+        "WARC/1.0\r\n"
+        "WARC-Type: response\r\n"
+        f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>\r\n"
+        f"WARC-Date: {datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}\r\n"
+        f"WARC-Target-URI: {url}\r\n"
+        "Content-Type: application/http;msgtype=response\r\n"
+        f"Content-Length: {len(http_block)}\r\n\r\n")
+    return warc_headers.encode('utf-8') + http_block + b"\r\n\r\n"
+
+
+def parse_record(data):
+    """(статус, заголовки, тело) из распакованной WARC-записи"""
+    _, _, http_block = data.partition(b"\r\n\r\n")
+    head, _, body = http_block.partition(b"\r\n\r\n")
+    lines = head.decode('utf-8', errors='replace').split("\r\n")
+    status = int(lines[0].split(' ', 2)[1])
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        headers[name.strip()] = value.strip()
+    # Тело ограничено Content-Length: дальше идёт разделитель записей
+    length = int(headers.get('Content-Length', len(body)))
+    return status, headers, body[:length]
+
+
+class CrawlArchive:
+    """Архив загруженных страниц в формате WARC (.warc.gz) с индексом по URL.
+
+    Каждая запись сжата отдельным gzip-блоком и только дописывается в конец файла,
+    поэтому архив читается стандартными WARC-инструментами. Индекс URL -> (смещение, длина)
+    хранится в SQLite рядом с архивом; при чтении файл отображается в память (mmap),
+    и любая страница распаковывается без чтения остальных."""
+
+    def __init__(self, path, mode='a', compresslevel=6):
+        self.path = path
+        self.mode = mode
+        self.compresslevel = compresslevel
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path + '.idx.sqlite', check_same_thread=False)
+        self.db.execute('''CREATE TABLE IF NOT EXISTS records (
+            url TEXT PRIMARY KEY,
+            offset INTEGER,
+            length INTEGER,
+            status INTEGER,
+            encoding TEXT)''')
+        self.db.commit()
+        self.written = 0
+        self.file = None
+        self.map = None
+        if mode == 'a':
+            self.file = open(path, 'ab')
+        elif os.path.getsize(path):
+            with open(path, 'rb') as f:
+                self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def write(self, url, response):
+        """Дописывает ответ в архив (тело уже распаковано requests)"""
+        record = gzip.compress(build_record(url, response.status_code, response.headers, response.content),
+                               compresslevel=self.compresslevel)
+        with self.lock:
+            offset = self.file.tell()
+            self.file.write(record)
+            self.db.execute('INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?)',
+                            (url, offset, len(record), response.status_code, response.encoding))
+            self.written += 1
+            # Индекс фиксируется пакетами; при сбое теряется не больше последних 100 записей
+            if self.written % 100 == 0:
+                self.flush()
+
+    def flush(self):
+        self.file.flush()
+        self.db.commit()
+
+    def read(self, url, offset, length, encoding):
+        data = zlib.decompress(self.map[offset:offset + length], wbits=31)
+        status, headers, body = parse_record(data)
+        return ArchivedResponse(url, status, headers, body, encoding)
+
+    def get(self, url):
+        """Ответ для URL из архива или None"""
+        with self.lock:
+            row = self.db.execute('SELECT offset, length, encoding FROM records WHERE url = ?', (url,)).fetchone()
+        if row is None or self.map is None:
+            return None
+        return self.read(url, *row)
+
+    def __contains__(self, url):
+        with self.lock:
+            return self.db.execute('SELECT 1 FROM records WHERE url = ?', (url,)).fetchone() is not None
+
+    def __len__(self):
+        with self.lock:
+            return self.db.execute('SELECT COUNT(*) FROM records').fetchone()[0]
+
+    def __iter__(self):
+        """Все ответы в порядке расположения в файле - последовательное чтение с диска"""
+        if self.map is None:
+            return
+        with self.lock:
+            rows = self.db.execute('SELECT url, offset, length, encoding FROM records ORDER BY offset').fetchall()
+        for url, offset, length, encoding in rows:
+            yield self.read(url, offset, length, encoding)
+
+    def report(self):
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        return f"Архив {self.path}: страниц {len(self)}, {size / 1024 / 1024:.1f} MB"
+
+    def close(self):
+        with self.lock:
+            if self.file:
+                self.file.close()
+                self.file = None
+            if self.map is not None:
+                self.map.close()
+                self.map = None
+            self.db.commit()
+            self.db.close()
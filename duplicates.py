@@ -0,0 +1,143 @@
+import re
+from urllib.parse import urlparse
+import numpy as np
+
+MISSING = '❌ Отсутствует'
+# Поля строки отчёта, в которых ищутся повторы
+DUPLICATE_FIELDS = ('Title', 'Meta_Description', 'H1')
+
+
+def normalize_text(text):
+    """Нижний регистр и схлопнутые пробелы - для сравнения без учёта оформления"""
+    return re.sub(r'\s+', ' ', str(text)).strip().lower()
+
+
+def shingle_hashes(text, size=5):
+    """64-битные хэши символьных n-грамм текста.
+    Встроенный hash() строк стабилен в пределах одного процесса - этого достаточно для сравнения"""
+    if len(text) <= size:
+        shingles = {text}
+    else:
+        shingles = {text[i:i + size] for i in range(len(text) - size + 1)}
+    return np.fromiter(map(hash, shingles), dtype=np.int64, count=len(shingles)).view(np.uint64)
+
+
+class MinHasher:
+    """MinHash-подписи: num_perm хэш-функций вида (a * x + b) mod 2^64, старшие 32 бита"""
+
+    def __init__(self, num_perm=64, seed=1):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+
+    def signatures(self, texts):
+        """Подписи сразу для всех текстов: n-граммы склеиваются в один массив,
+        минимум по каждому тексту берётся через reduceat"""
+        hashes = [shingle_hashes(text) for text in texts]
+        starts = np.zeros(len(hashes), dtype=np.int64)
+        np.cumsum([len(h) for h in hashes[:-1]], out=starts[1:])
+        hashes = np.concatenate(hashes)
+        result = np.empty((len(texts), len(self.a)), dtype=np.uint32)
+        # Переполнение uint64 здесь намеренное - это и есть умножение по модулю 2^64
+        with np.errstate(over='ignore'):
+            for k, (a, b) in enumerate(zip(self.a, self.b)):
+                result[:, k] = np.minimum.reduceat((hashes * a + b) >> np.uint64(32), starts)
+        return result
+
+
+class DuplicateFinder:
+    """Точные и почти точные повторы title, description и H1 по всему сайту.
+
+    Точные повторы группируются по хэшу нормализованного текста. Для почти одинаковых
+    текстов считаются MinHash-подписи (по одной на уникальный текст), а кандидаты
+    находятся через LSH: подпись режется на полосы, тексты с совпавшей полосой попадают
+    в одну корзину. Время растёт почти линейно с числом страниц."""
+
+    def __init__(self, fields=DUPLICATE_FIELDS, threshold=0.8, num_perm=64, bands=16):
+        self.fields = fields
+        self.threshold = threshold
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self.hasher = MinHasher(num_perm)
+        # Поле -> нормализованный текст -> [URL]
+        self.texts = {field: {} for field in fields}
+
+    def add(self, url, row):
+        for field in self.fields:
+            value = row.get(field)
+            if value is None or value == MISSING or (isinstance(value, float) and np.isnan(value)):
+                continue
+            text = normalize_text(value)
+            if text:
+                self.texts[field].setdefault(text, []).append(url)
+
+    def exact_groups(self, field):
+        return [(text, urls) for text, urls in self.texts[field].items() if len(urls) > 1]
+
+    def near_groups(self, field):
+        """Группы разных, но похожих текстов (оценка сходства Жаккара >= threshold)"""
+        texts = list(self.texts[field])
+        if len(texts) < 2:
+            return []
+        signatures = self.hasher.signatures(texts)
+
+        parent = list(range(len(texts)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for band in range(self.bands):
+            columns = np.ascontiguousarray(signatures[:, band * self.rows_per_band:(band + 1) * self.rows_per_band])
+            keys = columns.view(np.dtype((np.void, columns.itemsize * self.rows_per_band))).ravel()
+            # Корзины полосы: каждый текст сравнивается с первым текстом своей корзины
+            _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+            firsts = first[inverse.ravel()]
+            others = np.flatnonzero(firsts != np.arange(len(texts)))
+            firsts = firsts[others]
+            # Кандидат подтверждается по всей подписи, чтобы не склеивать случайные совпадения
+            similar = (signatures[firsts] == signatures[others]).mean(axis=1) >= self.threshold
+            for i, j in zip(firsts[similar].tolist(), others[similar].tolist()):
+                root_i, root_j = find(i), find(j)
+                if root_i != root_j:
+                    parent[root_j] = root_i
+
+        groups = {}
+        for i in range(len(texts)):
+            groups.setdefault(find(i), []).append(i)
+        return [[texts[i] for i in members] for members in groups.values() if len(members) > 1]
+
+    def rows(self):
+        """Строки отчёта о повторах: поле, тип, текст, число и список страниц"""
+        rows = []
+        for field in self.fields:
+            for text, urls in self.exact_groups(field):
+                rows.append({'Field': field, 'Kind': 'exact', 'Text': text,
+                             'Pages': len(urls), 'URLs': ' '.join(urls)})
+            for group in self.near_groups(field):
+                urls = [url for text in group for url in self.texts[field][text]]
+                rows.append({'Field': field, 'Kind': 'near', 'Text': ' | '.join(group[:3]),
+                             'Pages': len(urls), 'URLs': ' '.join(urls)})
+        return rows
+
+
+class DomainDuplicateFinder:
+    """Отдельный DuplicateFinder на каждый домен: одинаковые title на разных сайтах
+    прогона повтором не считаются"""
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.finders = {}  # домен -> DuplicateFinder
+
+    def add(self, url, row):
+        domain = row.get('Domain') or urlparse(url).netloc
+        if domain not in self.finders:
+            self.finders[domain] = DuplicateFinder(**self.kwargs)
+        self.finders[domain].add(url, row)
+
+    def rows(self):
+        """Строки отчёта всех сайтов с колонкой Domain"""
+        return [dict(Domain=domain, **row) for domain, finder in sorted(self.finders.items())
+                for row in finder.rows()]
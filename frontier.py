@@ -0,0 +1,138 @@
+import hashlib
+import heapq
+import math
+from urllib.parse import urlsplit, urlunsplit, unquote_plus
+
+# Параметры, которые не меняют содержимое страницы
+TRACKING_PARAMS = ('gclid', 'fbclid', 'yclid', 'msclkid', '_openstat')
+TRACKING_PREFIXES = ('utm_',)
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def is_tracking_param(pair):
+    key = unquote_plus(pair.partition('=')[0]).lower()
+    return key in TRACKING_PARAMS or key.startswith(TRACKING_PREFIXES)
+
+
+def normalize_url(url):
+    """Каноническая форма URL: схема и хост в нижнем регистре, без порта по умолчанию,
+    фрагмента, меток отслеживания и завершающего слэша, с отсортированными параметрами.
+    Параметры остаются в исходной записи (?flag, %20); некорректный URL возвращается как есть"""
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        # Например, http://host:abc/ - такую ссылку нельзя нормализовать, но и терять страницу из-за неё не нужно
+        return url
+    scheme = parts.scheme.lower()
+    # Хост берётся из netloc как есть: скобки IPv6 и пароль в userinfo сохраняются,
+    # в нижний регистр переводится только сам хост
+    userinfo, at, host = parts.netloc.rpartition('@')
+    if host.rfind(':') > host.rfind(']'):
+        host = host[:host.rfind(':')]
+    host = host.lower()
+    if port is not None and port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{port}"
+    if at:
+        host = f"{userinfo}@{host}"
+
+    path = parts.path or '/'
+    if len(path) > 1 and path.endswith('/'):
+        path = path.rstrip('/') or '/'
+
+    query = sorted(pair for pair in parts.query.split('&') if pair and not is_tracking_param(pair))
+    return urlunsplit((scheme, host, path, '&'.join(query), ''))
+
+
+def fingerprint(url):
+    """64-битный отпечаток URL"""
+    return int.from_bytes(hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class VisitedSet:
+    """Множество посещённых URL: хранит 64-битные отпечатки вместо строк"""
+
+    def __init__(self):
+        self.fingerprints = set()
+
+    def add(self, url):
+        self.fingerprints.add(fingerprint(url))
+
+    def __contains__(self, url):
+        return fingerprint(url) in self.fingerprints
+
+    def __len__(self):
+        return len(self.fingerprints)
+
+
+class BloomFilter:
+    """Вероятностное множество фиксированного размера (возможны редкие ложные срабатывания)"""
+
+    def __init__(self, expected_items=1000000, false_positive_rate=0.001):
+        self.size = max(8, int(-expected_items * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / expected_items * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def positions(self, url):
+        digest = hashlib.blake2b(url.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:], 'big') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, url):
+        new = False
+        for position in self.positions(url):
+            byte, bit = divmod(position, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= 1 << bit
+                new = True
+        if new:
+            self.count += 1
+
+    def __contains__(self, url):
+        return all(self.bits[position // 8] & (1 << (position % 8)) for position in self.positions(url))
+
+    def __len__(self):
+        return self.count
+
+
+class Frontier:
+    """Очередь обхода: нормализация URL, порядок по приоритету и глубине (BFS),
+    компактное хранение уже встреченных адресов"""
+
+    def __init__(self, max_depth=None, use_bloom=False, expected_urls=1000000):
+        self.max_depth = max_depth
+        self.seen = BloomFilter(expected_urls) if use_bloom else VisitedSet()
+        self.heap = []
+        self.counter = 0  # сохраняет порядок добавления при равных приоритетах
+
+    def add(self, url, depth=0, priority=0):
+        """Добавляет URL, если он ещё не встречался. Меньший priority обрабатывается раньше"""
+        url = normalize_url(url)
+        if url in self.seen or (self.max_depth is not None and depth > self.max_depth):
+            return False
+        self.seen.add(url)
+        heapq.heappush(self.heap, (priority, depth, self.counter, url))
+        self.counter += 1
+        return True
+
+    def mark_seen(self, url):
+        """Отмечает URL как встреченный, не ставя его в очередь (например, уже обработанный)"""
+        self.seen.add(normalize_url(url))
+
+    def pop(self):
+        """Возвращает (url, depth) следующей страницы"""
+        _, depth, _, url = heapq.heappop(self.heap)
+        return url, depth
+
+    def __contains__(self, url):
+        return normalize_url(url) in self.seen
+
+    def __len__(self):
+        return len(self.heap)
+
+    def seen_count(self):
+        """Сколько URL встречено всего (в очереди и уже обработано)"""
+        return len(self.seen)
@@ -0,0 +1,172 @@
+import json
+import sqlite3
+import threading
+import time
+from requests.structures import CaseInsensitiveDict
+
+DEFAULT_CACHE_PATH = '.http_cache.sqlite'
+
+
+class CachedResponse:
+    """Ответ из кэша с тем же интерфейсом, что и requests.Response"""
+
+    def __init__(self, url, status_code, headers, content, encoding):
+        self.url = url
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.content = content
+        self.encoding = encoding
+        self.from_cache = True
+        # Сервер ответил 304: тело и производные данные можно брать из кэша
+        self.not_modified = True
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+    def raise_for_status(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class HTTPCache:
+    """Постоянный кэш ответов на диске с условной перепроверкой (ETag / Last-Modified)"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=500 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('''CREATE TABLE IF NOT EXISTS responses (
+            url TEXT PRIMARY KEY,
+            status INTEGER,
+            headers TEXT,
+            encoding TEXT,
+            etag TEXT,
+            last_modified TEXT,
+            body BLOB,
+            size INTEGER,
+            derived TEXT,
+            last_access REAL)''')
+        self.db.execute('CREATE INDEX IF NOT EXISTS idx_last_access ON responses (last_access)')
+        self.db.commit()
+        # Размер кэша считается один раз при открытии, дальше - по каждой записи и удалению
+        self.total_bytes = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        self.stats = {'requests': 0, 'hits': 0, 'misses': 0, 'stored': 0,
+                      'evicted': 0, 'bytes_saved': 0, 'bytes_downloaded': 0}
+
+    def lookup(self, url):
+        """Возвращает запись кэша для URL или None"""
+        with self.lock:
+            return self.db.execute(
+                'SELECT status, headers, encoding, etag, last_modified, body FROM responses WHERE url = ?',
+                (url,)).fetchone()
+
+    def get(self, session, url, **kwargs):
+        """GET с перепроверкой: при 304 тело берётся из кэша без повторной загрузки"""
+        entry = self.lookup(url)
+        headers = dict(kwargs.pop('headers', None) or {})
+        if entry:
+            etag, last_modified = entry[3], entry[4]
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+
+        response = session.get(url, headers=headers, **kwargs)
+
+        if response.status_code == 304 and entry:
+            status, stored_headers, encoding, _, _, body = entry
+            self.count(requests=1, hits=1, bytes_saved=len(body))
+            self.touch(url)
+            return CachedResponse(url, status, json.loads(stored_headers), body, encoding)
+
+        self.count(requests=1, misses=1, bytes_downloaded=len(response.content))
+        response.from_cache = False
+        response.not_modified = False
+        if response.status_code == 200:
+            self.store(url, response)
+        return response
+
+    def store(self, url, response):
+        """Сохраняет ответ, если его можно перепроверить условным запросом"""
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+        body = response.content
+        with self.lock:
+            old = self.db.execute('SELECT size FROM responses WHERE url = ?', (url,)).fetchone()
+            self.total_bytes += len(body) - ((old[0] or 0) if old else 0)
+            self.db.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, NULL, ?)',
+                (url, response.status_code, json.dumps(dict(response.headers)), response.encoding,
+                 etag, last_modified, body, len(body), time.time()))
+            self.db.commit()
+        self.count(stored=1)
+        self.evict()
+
+    def count(self, **increments):
+        with self.lock:
+            for key, value in increments.items():
+                self.stats[key] += value
+
+    def touch(self, url):
+        with self.lock:
+            self.db.execute('UPDATE responses SET last_access = ? WHERE url = ?', (time.time(), url))
+            self.db.commit()
+
+    def get_derived(self, url, key):
+        """Возвращает данные, вычисленные из тела ответа (например, метрики или ссылки)"""
+        with self.lock:
+            row = self.db.execute('SELECT derived FROM responses WHERE url = ?', (url,)).fetchone()
+        if not row or not row[0]:
+            return None
+        return json.loads(row[0]).get(key)
+
+    def set_derived(self, url, key, value):
+        """Запоминает результат разбора тела, чтобы при 304 не разбирать его заново"""
+        with self.lock:
+            row = self.db.execute('SELECT derived FROM responses WHERE url = ?', (url,)).fetchone()
+            if row is None:
+                return
+            derived = json.loads(row[0]) if row[0] else {}
+            derived[key] = value
+            self.db.execute('UPDATE responses SET derived = ? WHERE url = ?', (json.dumps(derived), url))
+            self.db.commit()
+
+    def evict(self, batch=100):
+        """Удаляет давно не использованные записи, пока кэш больше max_bytes (LRU).
+        Таблица пересчитывается только при превышении лимита - файл мог изменить другой процесс"""
+        with self.lock:
+            if self.total_bytes <= self.max_bytes:
+                return
+            self.total_bytes = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+            while self.total_bytes > self.max_bytes:
+                oldest = self.db.execute('SELECT url, size FROM responses ORDER BY last_access LIMIT ?',
+                                         (batch,)).fetchall()
+                if not oldest:
+                    break
+                for url, size in oldest:
+                    self.db.execute('DELETE FROM responses WHERE url = ?', (url,))
+                    self.stats['evicted'] += 1
+                    self.total_bytes -= size or 0
+                    if self.total_bytes <= self.max_bytes:
+                        break
+            self.db.commit()
+
+    def hit_ratio(self):
+        return self.stats['hits'] / self.stats['requests'] if self.stats['requests'] else 0.0
+
+    def report(self):
+        """Краткая статистика кэша за текущий запуск"""
+        return (f"Кэш: запросов {self.stats['requests']}, попаданий (304) {self.stats['hits']} "
+                f"({self.hit_ratio():.0%}), сэкономлено {self.stats['bytes_saved'] / 1024:.1f} KB, "
+                f"загружено {self.stats['bytes_downloaded'] / 1024:.1f} KB, вытеснено {self.stats['evicted']}")
+
+    def close(self):
+        with self.lock:
+            self.db.close()
@@ -1,23 +1,84 @@
 import os
-import requests
-from bs4 import BeautifulSoup
+import hashlib
 from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from http_cache import HTTPCache
+from image_store import ImageStore, file_digest
+import transport
 import argparse  # Для обработки аргументов командной строки
+import sys
 
-def download_images(url, save_folder='images'):
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+CHUNK_SIZE = 64 * 1024
+
+def create_session(pool_size=8):
+    """Сессия с пулом соединений: изображения с одного хоста идут по уже открытым соединениям"""
+    return transport.create_session(pool_size=pool_size, user_agent=HEADERS['User-Agent'])
+
+def download_file(session, file_url, filepath, store=None):
+    """Потоково скачивает файл во временный .part и атомарно переносит его на место.
+    Если .part остался от прошлого запуска, докачивает его через Range.
+    С ImageStore содержимое хэшируется на лету, а дубликаты не сохраняются повторно.
+    Возвращает (итоговый путь, является_ли_дубликатом)"""
+    # У разных URL с одинаковым именем файла свои временные файлы
+    part_path = f"{filepath}.{hashlib.md5(file_url.encode('utf-8')).hexdigest()[:8]}.part"
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    # Изображения и так сжаты; без Content-Encoding смещение в .part и Range считают одни и те же байты
+    request_headers = {'Accept-Encoding': 'identity'}
+    if offset:
+        request_headers['Range'] = f'bytes={offset}-'
+
+    with session.get(file_url, headers=request_headers, stream=True, timeout=30) as response:
+        if response.status_code == 416 and offset:
+            # Частичный файл уже докачан полностью
+            return finish_download(file_url, part_path, filepath, store, file_digest(part_path))
+        response.raise_for_status()
+        if offset and response.status_code == 206 and \
+                response.headers.get('Content-Encoding', 'identity').lower() != 'identity':
+            # Сервер сжал диапазон вопреки identity: его байты не стыкуются с распакованным .part
+            response.close()
+            os.remove(part_path)
+            return download_file(session, file_url, filepath, store)
+        # 206 - сервер продолжил с нужного места, 200 - отдал файл целиком
+        resume = offset and response.status_code == 206
+        hasher = hashlib.sha256()
+        if resume:
+            with open(part_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                    hasher.update(chunk)
+        with open(part_path, 'ab' if resume else 'wb') as f:
+            for chunk in response.iter_content(CHUNK_SIZE):
+                hasher.update(chunk)
+                f.write(chunk)
+
+    return finish_download(file_url, part_path, filepath, store, hasher.hexdigest())
+
+def finish_download(file_url, part_path, filepath, store, digest):
+    """Переносит докачанный .part на место (через хранилище, если оно задано)"""
+    if store:
+        return store.commit(file_url, part_path, filepath, digest)
+    os.replace(part_path, filepath)
+    return filepath, False
+
+def download_images(url, save_folder='images', cache=None, workers=8, store=None):
     # Создаем папку для сохранения, если её нет
     if not os.path.exists(save_folder):
         os.makedirs(save_folder)
     
-    # Заголовки, чтобы сайты не блокировали запрос
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
+    session = create_session(pool_size=workers)
     
     try:
         # Получаем HTML-код страницы
-        response = requests.get(url, headers=headers)
+        # Страница берётся из кэша, если не изменилась с прошлого запуска
+        if cache:
+            response = cache.get(session, url, timeout=10)
+        else:
+            response = session.get(url, timeout=10)
         response.raise_for_status()  # Проверяем, не вернулась ли ошибка HTTP
+        # bs4 импортируется только когда страница уже загружена - запуск программы быстрее
+        from bs4 import BeautifulSoup
         soup = BeautifulSoup(response.text, 'html.parser')
         
         # Находим все теги img, а также изображения внутри data-src (ленивая загрузка)
@@ -25,6 +86,9 @@ def download_images(url, save_folder='images'):
         
         print(f"Найдено изображений: {len(img_tags)}")
         
+        # Сначала решаем, что качать: существующие файлы отсеиваются до любых запросов
+        tasks = {}  # URL -> (номер, путь)
+        planned_paths = set()
         for i, img in enumerate(img_tags, 1):
             # Получаем URL изображения (проверяем src, data-src и другие атрибуты)
             img_url = img.get('src') or img.get('data-src') or img.get('data-lazy')
@@ -34,44 +98,89 @@ def download_images(url, save_folder='images'):
             # Собираем абсолютный URL, если он относительный
             img_url = urljoin(url, img_url)
             
-            try:
-                # Получаем содержимое изображения
-                img_data = requests.get(img_url, headers=headers, stream=True).content
-                
-                # Извлекаем имя файла из URL
-                filename = os.path.basename(img_url).split('?')[0]  # Удаляем параметры запроса
-                if not filename:
-                    filename = f"image_{i}.jpg"  # Если имя не извлечено, создаем свое
-                
-                # Сохраняем в папку
-                filepath = os.path.join(save_folder, filename)
-                
-                # Проверяем, не существует ли файл
-                if os.path.exists(filepath):
-                    print(f"Файл уже существует: {filename}")
-                    continue
-                
-                # Записываем изображение
-                with open(filepath, 'wb') as f:
-                    f.write(img_data)
-                
-                print(f"[{i}] Сохранено: {filename}")
+            # Извлекаем имя файла из URL
+            filename = os.path.basename(img_url).split('?')[0]  # Удаляем параметры запроса
+            if not filename:
+                filename = f"image_{i}.jpg"  # Если имя не извлечено, создаем свое
+            
+            filepath = os.path.join(save_folder, filename)
             
-            except Exception as e:
-                print(f"Ошибка при загрузке {img_url}: {e}")
+            # Проверяем, не скачан ли уже этот URL или файл с таким именем
+            # (с хранилищем одинаковые имена разрешены - конфликт решается по содержимому)
+            if store:
+                known_path = store.path_for_url(img_url)
+                if known_path or img_url in tasks:
+                    print(f"Файл уже существует: {os.path.basename(known_path or filepath)}")
+                    continue
+            elif os.path.exists(filepath) or filepath in planned_paths:
+                print(f"Файл уже существует: {filename}")
+                continue
+            tasks[img_url] = (i, filepath)
+            planned_paths.add(filepath)
+        
+        # Загружаем параллельно ограниченным числом потоков
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(download_file, session, img_url, filepath, store): (i, img_url)
+                       for img_url, (i, filepath) in tasks.items()}
+            for future in as_completed(futures):
+                i, img_url = futures[future]
+                try:
+                    saved_path, duplicate = future.result()
+                    if duplicate:
+                        print(f"[{i}] Дубликат по содержимому: {os.path.basename(saved_path)}")
+                    else:
+                        print(f"[{i}] Сохранено: {os.path.basename(saved_path)}")
+                except Exception as e:
+                    print(f"Ошибка при загрузке {img_url}: {e}")
     
     except Exception as e:
         print(f"Ошибка при обработке страницы: {e}")
+    finally:
+        session.close()
 
-if __name__ == "__main__":
-    # Настраиваем аргументы командной строки
-    parser = argparse.ArgumentParser(description='Скачивает все изображения с веб-страницы')
-    parser.add_argument('url', help='URL страницы для парсинга изображений')
+def read_urls(path):
+    """URL страниц из файла, по одному в строке ('-' - стандартный ввод)"""
+    with (sys.stdin if path == '-' else open(path, encoding='utf-8')) as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+def add_arguments(parser):
+    parser.add_argument('urls', nargs='*', help='URL страниц для парсинга изображений')
+    parser.add_argument('--urls-file', help='Файл со списком страниц, по одной в строке (- для stdin)')
     parser.add_argument('--folder', default='images', help='Папка для сохранения (по умолчанию: images)')
+    parser.add_argument('--workers', type=int, default=8, help='Число параллельных загрузок (по умолчанию: 8)')
+    parser.add_argument('--link-duplicates', action='store_true',
+                        help='Создавать жёсткие ссылки на дубликаты вместо пропуска')
+    parser.add_argument('--largest', action='store_true',
+                        help='Скачивать самый крупный вариант из srcset и <picture> (largest_image_downloader)')
+
+def run(args):
+    """Загрузка изображений по разобранным аргументам командной строки"""
+    urls = list(args.urls) + (read_urls(args.urls_file) if args.urls_file else [])
+    if not urls:
+        print("Не указано ни одной страницы. Выход.")
+        return
     
-    args = parser.parse_args()
-    
-    print(f"\nЗагрузка изображений с: {args.url}")
-    print(f"Сохранение в папку: {args.folder}\n")
-    
-    download_images(args.url, args.folder)
+    cache = HTTPCache()
+    store = ImageStore(args.folder, link_duplicates=args.link_duplicates)
+    for url in urls:
+        print(f"\nЗагрузка изображений с: {url}")
+        print(f"Сохранение в папку: {args.folder}\n")
+        if args.largest:
+            import largest_image_downloader
+            largest_image_downloader.download_images(url, args.folder, cache=cache, store=store)
+        else:
+            download_images(url, args.folder, cache=cache, workers=args.workers, store=store)
+    print(cache.report())
+    print(store.report())
+    print(transport.report())
+    cache.close()
+    store.close()
+
+def main():
+    # Настраиваем аргументы командной строки
+    parser = argparse.ArgumentParser(description='Скачивает все изображения с веб-страницы')
+    add_arguments(parser)
+    run(parser.parse_args())
+
+if __name__ == "__main__":
+    main()
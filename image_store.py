@@ -0,0 +1,99 @@
+import hashlib
+import os
+import sqlite3
+import threading
+
+INDEX_FILENAME = '.image_index.sqlite'
+
+
+def file_digest(path, chunk_size=64 * 1024):
+    """SHA-256 уже сохранённого файла"""
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class ImageStore:
+    """Хранилище изображений с адресацией по содержимому.
+
+    Постоянный индекс URL -> хэш -> файл позволяет не скачивать известные URL повторно,
+    а одинаковые картинки под разными адресами хранить один раз (дубликаты пропускаются
+    или превращаются в жёсткие ссылки на уже сохранённый файл)."""
+
+    def __init__(self, folder, link_duplicates=False):
+        self.folder = folder
+        self.link_duplicates = link_duplicates
+        self.lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(folder, INDEX_FILENAME), check_same_thread=False)
+        self.db.execute('CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY, digest TEXT)')
+        self.db.execute('CREATE TABLE IF NOT EXISTS blobs (digest TEXT PRIMARY KEY, path TEXT, size INTEGER)')
+        self.db.commit()
+        self.stats = {'saved': 0, 'duplicates': 0, 'bytes_saved': 0}
+
+    def path_for_url(self, url):
+        """Путь к уже сохранённому изображению для URL (без сетевых запросов)"""
+        with self.lock:
+            row = self.db.execute(
+                'SELECT blobs.path FROM urls JOIN blobs ON urls.digest = blobs.digest WHERE urls.url = ?',
+                (url,)).fetchone()
+        if row and os.path.exists(row[0]):
+            return row[0]
+        return None
+
+    def known_blob(self, digest):
+        row = self.db.execute('SELECT path, size FROM blobs WHERE digest = ?', (digest,)).fetchone()
+        if row and os.path.exists(row[0]):
+            return row
+        return None
+
+    def index_existing(self, path):
+        """Добавляет в индекс файл, скачанный до появления хранилища"""
+        digest = file_digest(path)
+        if not self.known_blob(digest):
+            self.db.execute('INSERT OR REPLACE INTO blobs VALUES (?, ?, ?)',
+                            (digest, path, os.path.getsize(path)))
+        return digest
+
+    def commit(self, url, temp_path, filepath, digest):
+        """Помещает скачанный временный файл в хранилище.
+        Возвращает (путь, является_ли_дубликатом)"""
+        with self.lock:
+            known = self.known_blob(digest)
+            if not known and os.path.exists(filepath):
+                # Файл с таким именем уже есть: если это та же картинка - это дубликат
+                if self.index_existing(filepath) == digest:
+                    known = (filepath, os.path.getsize(filepath))
+
+            if known:
+                existing_path, size = known
+                os.remove(temp_path)
+                if self.link_duplicates and filepath != existing_path and not os.path.exists(filepath):
+                    os.link(existing_path, filepath)
+                self.db.execute('INSERT OR REPLACE INTO urls VALUES (?, ?)', (url, digest))
+                self.db.commit()
+                self.stats['duplicates'] += 1
+                self.stats['bytes_saved'] += size
+                return existing_path, True
+
+            if os.path.exists(filepath):
+                # Другая картинка с тем же именем - добавляем к имени начало хэша
+                name, ext = os.path.splitext(filepath)
+                filepath = f"{name}-{digest[:8]}{ext}"
+            os.replace(temp_path, filepath)
+            self.db.execute('INSERT OR REPLACE INTO blobs VALUES (?, ?, ?)',
+                            (digest, filepath, os.path.getsize(filepath)))
+            self.db.execute('INSERT OR REPLACE INTO urls VALUES (?, ?)', (url, digest))
+            self.db.commit()
+            self.stats['saved'] += 1
+            return filepath, False
+
+    def report(self):
+        return (f"Сохранено новых файлов: {self.stats['saved']}, дубликатов: {self.stats['duplicates']}, "
+                f"сэкономлено {self.stats['bytes_saved'] / 1024:.1f} KB")
+
+    def close(self):
+        with self.lock:
+            self.db.close()
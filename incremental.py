@@ -0,0 +1,49 @@
+import csv
+import hashlib
+
+# Поля, изменения которых попадают в отчёт о различиях
+DIFF_FIELDS = ('Title', 'Meta_Description', 'H1_Count', 'Images_Without_Alt')
+# Числовые колонки отчёта SEO_Site_Analyzer (в CSV они читаются как строки)
+INT_FIELDS = ('Title_Length', 'Meta_Length', 'H1_Count', 'H2_Count', 'H3_Count',
+              'Images_Total', 'Images_Without_Alt', 'OG_Tags', 'Twitter_Tags', 'Status')
+
+
+def content_hash(body):
+    """Отпечаток содержимого страницы"""
+    return hashlib.sha256(body).hexdigest()
+
+
+def load_previous_report(path):
+    """Загружает прошлый отчёт в словарь URL -> строка отчёта"""
+    rows = {}
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        for row in csv.DictReader(f):
+            for field in INT_FIELDS:
+                if row.get(field, '').lstrip('-').isdigit():
+                    row[field] = int(row[field])
+            rows[row['URL']] = row
+    return rows
+
+
+def diff_reports(previous, current, fields=DIFF_FIELDS):
+    """Сравнивает два прогона и возвращает список изменений по страницам"""
+    changes = []
+    for url, row in current.items():
+        old = previous.get(url)
+        if old is None:
+            changes.append({'URL': url, 'Field': '', 'Old': '', 'New': '', 'Change': 'Новая страница'})
+            continue
+        for field in fields:
+            if str(old.get(field, '')) != str(row.get(field, '')):
+                changes.append({'URL': url, 'Field': field, 'Old': old.get(field, ''),
+                                'New': row.get(field, ''), 'Change': 'Изменено'})
+    for url in previous.keys() - current.keys():
+        changes.append({'URL': url, 'Field': '', 'Old': '', 'New': '', 'Change': 'Не найдена'})
+    return changes
+
+
+def save_diff(changes, filename):
+    with open(filename, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.DictWriter(f, fieldnames=['URL', 'Change', 'Field', 'Old', 'New'])
+        writer.writeheader()
+        writer.writerows(changes)
@@ -1,29 +1,193 @@
 import os
 import re
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlparse
+from concurrent.futures import ThreadPoolExecutor
+from http_cache import HTTPCache
+from image_store import ImageStore
+from image_downloader import create_session, download_file
+import transport
 from urllib.parse import unquote
 
+SIZE_SUFFIX = re.compile(r'-\d+x\d+(?=\.\w+$)')
+# Атрибуты <img> с одиночным URL и со списком вариантов
+URL_ATTRS = ('src', 'data-src', 'data-large', 'data-full-url')
+SRCSET_ATTRS = ('srcset', 'data-srcset')
+
 def get_largest_image_url(img_url, base_url):
     """Находит URL изображения в максимальном разрешении."""
     # Удаляем параметры размера (например, -300x200.jpg)
-    clean_url = re.sub(r'-\d+x\d+(?=\.\w+$)', '', img_url)
+    clean_url = SIZE_SUFFIX.sub('', img_url)
     if clean_url != img_url:
         return clean_url
     return img_url
 
-def download_images(url, save_folder='images'):
+def srcset_entries(value):
+    """Токенизатор srcset по спецификации HTML: URL читается до пробела (запятые внутри
+    него допустимы, например w_300,h_200 у Cloudinary), запятая разделяет варианты только
+    после дескрипторов. Возвращает [(url, [дескрипторы])]"""
+    entries = []
+    pos, length = 0, len(value)
+    while pos < length:
+        while pos < length and (value[pos].isspace() or value[pos] == ','):
+            pos += 1
+        start = pos
+        while pos < length and not value[pos].isspace():
+            pos += 1
+        url = value[start:pos]
+        if not url:
+            break
+        descriptors = []
+        if url.endswith(','):
+            # Запятая сразу после URL: у варианта нет дескрипторов
+            url = url.rstrip(',')
+        else:
+            start, depth = pos, 0
+            while pos < length and (value[pos] != ',' or depth):
+                if value[pos] == '(':
+                    depth += 1
+                elif value[pos] == ')':
+                    depth = max(0, depth - 1)
+                pos += 1
+            descriptors = value[start:pos].split()
+        if url:
+            entries.append((url, descriptors))
+    return entries
+
+def parse_srcset(value, base_url):
+    """Разбирает srcset: возвращает [(url, ширина или None, плотность или None)]"""
+    candidates = []
+    for raw_url, descriptors in srcset_entries(value):
+        if raw_url.startswith('data:'):
+            continue
+        url = urljoin(base_url, unquote(raw_url))
+        width = density = None
+        if descriptors:
+            descriptor = descriptors[0].lower()
+            try:
+                if descriptor.endswith('w'):
+                    width = int(descriptor[:-1])
+                elif descriptor.endswith('x'):
+                    density = float(descriptor[:-1])
+            except ValueError:
+                pass
+        candidates.append((url, width, density))
+    return candidates
+
+def probe_image(session, url):
+    """Узнаёт, существует ли изображение и его размер, не скачивая тело"""
+    response = session.head(url, timeout=10, allow_redirects=True)
+    if response.status_code in (403, 405, 501):
+        # HEAD не поддерживается - запрашиваем первый байт, размер берём из Content-Range
+        response = session.get(url, timeout=10, stream=True, headers={'Range': 'bytes=0-0'})
+        response.close()
+        total = response.headers.get('Content-Range', '').rpartition('/')[2]
+        if total.isdigit():
+            return response.status_code < 400, int(total)
+    size = response.headers.get('Content-Length', '')
+    return response.status_code < 400, int(size) if size.isdigit() else 0
+
+class LargestImageResolver:
+    """Выбирает самый крупный вариант изображения из src, srcset, data-srcset и <picture>,
+    подтверждая победителя HEAD/Range-запросом. Проигравшие варианты не скачиваются"""
+
+    def __init__(self, session, max_probes=4):
+        self.session = session
+        self.max_probes = max_probes
+        self.executor = ThreadPoolExecutor(max_workers=max_probes)
+        self.probes = {}         # URL -> (существует, размер)
+        self.suffix_patterns = {}  # (хост, папка) -> работает ли удаление суффикса -WxH
+
+    def candidates(self, img, base_url):
+        """Все варианты изображения: [(url, ширина, плотность)]"""
+        found = []
+        for attr in URL_ATTRS:
+            if img.get(attr) and not img[attr].startswith('data:'):
+                found.append((urljoin(base_url, unquote(img[attr])), None, None))
+        sources = [img]
+        if img.parent is not None and img.parent.name == 'picture':
+            sources += img.parent.find_all('source')
+        for tag in sources:
+            for attr in SRCSET_ATTRS:
+                if tag.get(attr):
+                    found += parse_srcset(tag[attr], base_url)
+        return found
+
+    def own_src(self, img, base_url):
+        """URL, на который ссылается сама страница (src или его data-* замена)"""
+        for attr in URL_ATTRS:
+            if img.get(attr) and not img[attr].startswith('data:'):
+                return urljoin(base_url, unquote(img[attr]))
+        return None
+
+    def pattern_key(self, url):
+        parsed = urlparse(url)
+        return parsed.netloc, os.path.dirname(parsed.path)
+
+    def ranked(self, img, base_url):
+        """Кандидаты от самого крупного к меньшему: сначала URL без суффикса -WxH,
+        затем по заявленной ширине и плотности"""
+        scored = {}
+        for url, width, density in self.candidates(img, base_url):
+            score = (width or 0, density or 1)
+            if url not in scored or scored[url] < score:
+                scored[url] = score
+            clean_url = SIZE_SUFFIX.sub('', url)
+            if clean_url != url and self.suffix_patterns.get(self.pattern_key(url)) is not False:
+                scored[clean_url] = (float('inf'), float('inf'))
+        return sorted(scored, key=scored.get, reverse=True), scored
+
+    def probe(self, url):
+        if url not in self.probes:
+            try:
+                self.probes[url] = probe_image(self.session, url)
+            except Exception:
+                self.probes[url] = (False, 0)
+        return self.probes[url]
+
+    def resolve(self, img, base_url):
+        """Возвращает URL самого крупного существующего варианта. Если ни один проверенный
+        вариант не найден - собственный src изображения (его указала сама страница), а если
+        и он проверен и не найден или его нет - None. Непроверенные варианты не возвращаются"""
+        urls, scores = self.ranked(img, base_url)
+        if not urls:
+            return None
+        top = urls[:self.max_probes]
+        # Если для этой папки уже известно, что удаление суффикса работает, проверка не нужна
+        if scores[top[0]][0] == float('inf') and self.suffix_patterns.get(self.pattern_key(top[0])):
+            return top[0]
+
+        results = dict(zip(top, self.executor.map(self.probe, top)))
+        for url in top:
+            if scores[url][0] == float('inf'):
+                self.suffix_patterns[self.pattern_key(url)] = results[url][0]
+        existing = [url for url in top if results[url][0]]
+        if not existing:
+            src = self.own_src(img, base_url)
+            if src is None or (src in results and not results[src][0]):
+                return None
+            return src
+        # При равной заявленной ширине побеждает больший Content-Length
+        return max(existing, key=lambda url: (scores[url], results[url][1]))
+
+    def close(self):
+        self.executor.shutdown()
+
+def download_images(url, save_folder='images', cache=None, store=None):
     if not os.path.exists(save_folder):
         os.makedirs(save_folder)
     
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
+    session = create_session()
+    resolver = LargestImageResolver(session)
     
     try:
-        response = requests.get(url, headers=headers)
+        # Страница берётся из кэша, если не изменилась с прошлого запуска
+        if cache:
+            response = cache.get(session, url, timeout=10)
+        else:
+            response = session.get(url, timeout=10)
         response.raise_for_status()
+        # bs4 импортируется только когда страница уже загружена
+        from bs4 import BeautifulSoup
         soup = BeautifulSoup(response.text, 'html.parser')
         
         img_tags = soup.find_all('img')
@@ -32,21 +196,12 @@ def download_images(url, save_folder='images'):
         downloaded_urls = set()  # Чтобы избежать дубликатов
         
         for i, img in enumerate(img_tags, 1):
-            # Ищем URL в разных атрибутах
-            img_url = (img.get('src') or 
-                      img.get('data-src') or 
-                      img.get('data-large') or 
-                      img.get('data-full-url'))
+            # Ищем все варианты (src, data-*, srcset, <picture>) и выбираем самый крупный
+            largest_url = resolver.resolve(img, url)
             
-            if not img_url:
+            if not largest_url:
                 continue
             
-            # Преобразуем относительный URL в абсолютный
-            img_url = urljoin(url, unquote(img_url))
-            
-            # Получаем URL изображения в максимальном разрешении
-            largest_url = get_largest_image_url(img_url, url)
-            
             if largest_url in downloaded_urls:
                 print(f"[{i}] Пропущено (дубликат): {os.path.basename(largest_url)}")
                 continue
@@ -59,26 +214,29 @@ def download_images(url, save_folder='images'):
                 
                 filepath = os.path.join(save_folder, filename)
                 
-                if os.path.exists(filepath):
-                    print(f"[{i}] Файл уже существует: {filename}")
+                known_path = store.path_for_url(largest_url) if store else None
+                if known_path or (not store and os.path.exists(filepath)):
+                    print(f"[{i}] Файл уже существует: {os.path.basename(known_path or filepath)}")
                     continue
                 
-                # Загружаем изображение
-                img_data = requests.get(largest_url, headers=headers, stream=True)
-                img_data.raise_for_status()
-                
-                with open(filepath, 'wb') as f:
-                    for chunk in img_data.iter_content(1024):
-                        f.write(chunk)
+                # Загружаем изображение (с хранилищем - с проверкой дубликатов по содержимому)
+                saved_path, duplicate = download_file(session, largest_url, filepath, store)
                 
                 downloaded_urls.add(largest_url)
-                print(f"[{i}] Сохранено: {filename} (размер: {os.path.getsize(filepath) // 1024} KB)")
+                if duplicate:
+                    print(f"[{i}] Пропущено (дубликат по содержимому): {os.path.basename(saved_path)}")
+                else:
+                    print(f"[{i}] Сохранено: {os.path.basename(saved_path)} "
+                          f"(размер: {os.path.getsize(saved_path) // 1024} KB)")
             
             except Exception as e:
                 print(f"[{i}] Ошибка загрузки {largest_url}: {e}")
     
     except Exception as e:
         print(f"Ошибка при обработке страницы: {e}")
+    finally:
+        resolver.close()
+        session.close()
 
 if __name__ == "__main__":
     import argparse
@@ -92,4 +250,11 @@ if __name__ == "__main__":
     print(f"\nЗагрузка изображений с: {args.url}")
     print(f"Папка для сохранения: {args.folder}\n")
     
-    download_images(args.url, args.folder)
\ No newline at end of file
+    cache = HTTPCache()
+    store = ImageStore(args.folder)
+    download_images(args.url, args.folder, cache=cache, store=store)
+    print(cache.report())
+    print(store.report())
+    print(transport.report())
+    cache.close()
+    store.close()
\ No newline at end of file
@@ -0,0 +1,160 @@
+from array import array
+from urllib.parse import urlparse
+import numpy as np
+
+
+class LinkGraph:
+    """Граф внутренних ссылок сайта: целочисленные номера вершин и рёбра в массивах.
+
+    Во время обхода рёбра копятся в компактных array('I'); для расчётов граф
+    собирается в CSR (indptr, indices) без повторов и петель, так что PageRank,
+    входящие ссылки и глубина считаются векторно и на сотнях тысяч страниц."""
+
+    def __init__(self):
+        self.ids = {}            # URL -> номер вершины
+        self.urls = []           # номер вершины -> URL
+        self.crawled = array('b')
+        self.sources = array('I')
+        self.targets = array('I')
+        self.roots = set()
+        self.csr = None
+
+    def node(self, url):
+        node = self.ids.get(url)
+        if node is None:
+            node = self.ids[url] = len(self.urls)
+            self.urls.append(url)
+            self.crawled.append(0)
+        return node
+
+    def add_root(self, url):
+        """Стартовая страница: от неё считается глубина, сиротой она не бывает"""
+        self.roots.add(self.node(url))
+
+    def add_page(self, url, links):
+        """Обработанная страница и все найденные на ней внутренние ссылки"""
+        source = self.node(url)
+        self.crawled[source] = 1
+        for link in links:
+            self.sources.append(source)
+            self.targets.append(self.node(link))
+        self.csr = None
+
+    def __len__(self):
+        return len(self.urls)
+
+    def build(self):
+        """CSR-представление: исходящие ссылки вершины i - indices[indptr[i]:indptr[i + 1]]"""
+        if self.csr is None:
+            n = len(self.urls)
+            sources = np.frombuffer(self.sources, dtype=np.uint32).astype(np.int64)
+            targets = np.frombuffer(self.targets, dtype=np.uint32).astype(np.int64)
+            keep = sources != targets
+            # Повторные ссылки с одной страницы на другую считаются одним ребром
+            edges = np.unique(sources[keep] * n + targets[keep])
+            sources, targets = edges // n, edges % n
+            indptr = np.zeros(n + 1, dtype=np.int64)
+            np.cumsum(np.bincount(sources, minlength=n), out=indptr[1:])
+            self.csr = (indptr, targets, sources)
+        return self.csr
+
+    def inlinks(self):
+        _, targets, _ = self.build()
+        return np.bincount(targets, minlength=len(self.urls))
+
+    def outlinks(self):
+        indptr, _, _ = self.build()
+        return np.diff(indptr)
+
+    def pagerank(self, damping=0.85, iterations=100, tolerance=1e-8):
+        """Внутренний PageRank степенным методом; вес страниц без ссылок делится поровну"""
+        n = len(self.urls)
+        if not n:
+            return np.zeros(0)
+        _, targets, sources = self.build()
+        out_degree = self.outlinks().astype(float)
+        dangling = out_degree == 0
+        rank = np.full(n, 1.0 / n)
+        for _ in range(iterations):
+            share = np.divide(rank, out_degree, out=np.zeros(n), where=~dangling)
+            new_rank = np.bincount(targets, weights=share[sources], minlength=n)
+            new_rank = damping * (new_rank + rank[dangling].sum() / n) + (1 - damping) / n
+            converged = np.abs(new_rank - rank).sum() < tolerance
+            rank = new_rank
+            if converged:
+                break
+        return rank
+
+    def depths(self):
+        """Глубина в кликах от стартовых страниц (поиск в ширину); -1 - недостижимы"""
+        indptr, targets, _ = self.build()
+        depth = np.full(len(self.urls), -1, dtype=np.int64)
+        frontier = np.array(sorted(self.roots), dtype=np.int64)
+        depth[frontier] = 0
+        level = 0
+        while frontier.size:
+            level += 1
+            # Все исходящие ссылки текущего уровня одним срезом по CSR
+            starts = indptr[frontier]
+            lengths = indptr[frontier + 1] - starts
+            positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+            neighbours = np.unique(targets[positions])
+            frontier = neighbours[depth[neighbours] < 0]
+            depth[frontier] = level
+        return depth
+
+    def orphans(self):
+        """Обработанные страницы, на которые не ссылается ни одна другая (найдены только в sitemap)"""
+        crawled = np.frombuffer(self.crawled, dtype=np.int8).astype(bool)
+        inlinks = self.inlinks()
+        orphan = crawled & (inlinks == 0)
+        for root in self.roots:
+            orphan[root] = False
+        return [self.urls[node] for node in np.flatnonzero(orphan)]
+
+    def rows(self):
+        """Строки отчёта по обработанным страницам: входящие, исходящие, PageRank, глубина"""
+        inlinks, outlinks = self.inlinks(), self.outlinks()
+        rank, depth = self.pagerank(), self.depths()
+        orphans = set(self.orphans())
+        rows = []
+        for node, url in enumerate(self.urls):
+            if not self.crawled[node]:
+                continue
+            rows.append({
+                'URL': url,
+                'Inlinks': int(inlinks[node]),
+                'Outlinks': int(outlinks[node]),
+                'PageRank': round(float(rank[node]) * len(self.urls), 4),
+                'Depth': int(depth[node]),
+                'Orphan': url in orphans
+            })
+        return rows
+
+
+class DomainLinkGraphs:
+    """Отдельный LinkGraph на каждый домен: при анализе нескольких сайтов за один прогон
+    PageRank, глубина и сироты считаются внутри сайта, а не по смеси чужих графов"""
+
+    def __init__(self):
+        self.graphs = {}  # домен -> LinkGraph
+
+    def graph(self, url):
+        domain = urlparse(url).netloc
+        if domain not in self.graphs:
+            self.graphs[domain] = LinkGraph()
+        return self.graphs[domain]
+
+    def add_root(self, url):
+        self.graph(url).add_root(url)
+
+    def add_page(self, url, links):
+        self.graph(url).add_page(url, links)
+
+    def __len__(self):
+        return sum(len(graph) for graph in self.graphs.values())
+
+    def rows(self):
+        """Строки отчёта всех сайтов с колонкой Domain"""
+        return [dict(Domain=domain, **row) for domain, graph in sorted(self.graphs.items())
+                for row in graph.rows()]
@@ -0,0 +1,282 @@
+import bisect
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+# Границы корзин гистограммы задержек, мс
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+# Переменные окружения для включения профилировщика и строки прогресса в интерактивных скриптах
+PROFILE_ENV = 'SEO_PROFILE'
+PROGRESS_ENV = 'SEO_PROGRESS'
+
+
+class Histogram:
+    """Гистограмма задержек с фиксированными корзинами: память не растёт с числом замеров"""
+
+    def __init__(self, bounds=LATENCY_BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        ms = seconds * 1000
+        self.counts[bisect.bisect_left(self.bounds, ms)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, share):
+        """Оценка перцентиля сверху: граница корзины, в которую он попадает, в секундах"""
+        if not self.count:
+            return 0.0
+        target = share * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= target:
+                return min(bound / 1000, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'total_s': round(self.total, 4),
+            'mean_ms': round(self.total / self.count * 1000, 2) if self.count else 0.0,
+            'p50_ms': round(self.percentile(0.5) * 1000, 2),
+            'p95_ms': round(self.percentile(0.95) * 1000, 2),
+            'max_ms': round(self.max * 1000, 2),
+            'buckets_ms': {f"<={bound}": count for bound, count in zip(self.bounds, self.counts) if count},
+            'overflow': self.counts[-1]
+        }
+
+
+class Metrics:
+    """Счётчики, таймеры этапов и гистограммы задержек одного прогона.
+
+    Экземпляр потокобезопасен и передаётся в краулеры так же, как кэш и throttle.
+    Итоги сохраняются в JSON, который можно сравнить с прошлым прогоном (compare_metrics)."""
+
+    def __init__(self, name='run', progress=False, progress_interval=2.0):
+        self.name = name
+        self.started = time.time()
+        self.start = time.monotonic()
+        self.counters = {}
+        self.timers = {}
+        self.lock = threading.Lock()
+        # Необязательная строка прогресса не чаще раза в progress_interval секунд
+        self.progress = progress
+        self.progress_interval = progress_interval
+        self.last_progress = 0.0
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+        if self.progress:
+            self.show_progress()
+
+    def observe(self, name, seconds):
+        """Добавляет замер длительности в гистограмму name"""
+        with self.lock:
+            if name not in self.timers:
+                self.timers[name] = Histogram()
+            self.timers[name].add(seconds)
+
+    @contextlib.contextmanager
+    def timer(self, name):
+        """Замеряет блок кода: with metrics.timer('parse'): ..."""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(name, time.monotonic() - start)
+
+    def record_response(self, response, elapsed, size=None, prefix='http'):
+        """Фазы HTTP-запроса: до заголовков (DNS, соединение, TLS, TTFB) и передача тела"""
+        ttfb = response.elapsed.total_seconds() if getattr(response, 'elapsed', None) else None
+        self.observe(f'{prefix}.total', elapsed)
+        if ttfb is not None:
+            self.observe(f'{prefix}.ttfb', ttfb)
+            self.observe(f'{prefix}.body', max(0.0, elapsed - ttfb))
+        if size is None:
+            size = int(response.headers.get('Content-Length') or 0)
+        self.count(f'{prefix}.requests')
+        self.count(f'{prefix}.bytes', size)
+        self.count(f'{prefix}.status.{response.status_code}')
+        if getattr(response, 'from_cache', False):
+            self.count(f'{prefix}.cache_hits')
+
+    def show_progress(self):
+        now = time.monotonic()
+        if now - self.last_progress < self.progress_interval:
+            return
+        self.last_progress = now
+        print(f"⏱ {self.progress_line()}", file=sys.stderr)
+
+    def progress_line(self):
+        elapsed = time.monotonic() - self.start
+        with self.lock:
+            requests = self.counters.get('http.requests', 0)
+            size = self.counters.get('http.bytes', 0)
+            pages = self.counters.get('pages', 0)
+            errors = self.counters.get('errors', 0)
+            retries = self.counters.get('retries', 0)
+        return (f"{elapsed:.0f} с: страниц {pages}, запросов {requests} ({requests / max(elapsed, 1e-9):.1f}/с), "
+                f"{size / 1024 / 1024:.1f} MB, повторов {retries}, ошибок {errors}")
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                'name': self.name,
+                'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+                'elapsed_s': round(time.monotonic() - self.start, 3),
+                'counters': dict(sorted(self.counters.items())),
+                'timers': {name: histogram.to_dict() for name, histogram in sorted(self.timers.items())}
+            }
+
+    def save(self, path):
+        """Записывает метрики в JSON"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        return path
+
+    def report(self):
+        """Краткая сводка по этапам для вывода в консоль"""
+        data = self.to_dict()
+        lines = [f"Метрики ({data['elapsed_s']:.1f} с):"]
+        for name, timer in data['timers'].items():
+            lines.append(f"  {name}: {timer['count']} раз, всего {timer['total_s']:.2f} с, "
+                         f"p50 {timer['p50_ms']:.0f} мс, p95 {timer['p95_ms']:.0f} мс")
+        for name, value in data['counters'].items():
+            lines.append(f"  {name}: {value}")
+        return '\n'.join(lines)
+
+
+def compare_metrics(old_path, new_path, threshold=0.2):
+    """Этапы, которые стали медленнее более чем на threshold: [(этап, было мс, стало мс)]"""
+    with open(old_path, encoding='utf-8') as f:
+        old = json.load(f)['timers']
+    with open(new_path, encoding='utf-8') as f:
+        new = json.load(f)['timers']
+    regressions = []
+    for name, timer in new.items():
+        before = old.get(name)
+        if before and before['mean_ms'] and timer['mean_ms'] > before['mean_ms'] * (1 + threshold):
+            regressions.append((name, before['mean_ms'], timer['mean_ms']))
+    return regressions
+
+
+@contextlib.contextmanager
+def profile_new_threads(start, stop):
+    """На время блока каждый новый поток (воркеры ThreadPoolExecutor) работает со своим
+    профилировщиком: start() в начале потока, stop(профилировщик) в конце"""
+    original = threading.Thread.run
+
+    def run(thread):
+        profiler = start()
+        try:
+            original(thread)
+        finally:
+            stop(profiler)
+
+    threading.Thread.run = run
+    try:
+        yield
+    finally:
+        threading.Thread.run = original
+
+
+@contextlib.contextmanager
+def profiled(kind=None, output='profile'):
+    """Профилирование блока: kind='cprofile' или 'pyinstrument' (по умолчанию - из SEO_PROFILE).
+    Загрузка и разбор идут в пулах потоков, поэтому профилируются и потоки, запущенные внутри блока"""
+    kind = (kind or os.environ.get(PROFILE_ENV) or '').lower()
+    lock = threading.Lock()
+    finished = []  # профили завершившихся потоков
+    if kind == 'cprofile':
+        import cProfile
+        import pstats
+
+        def start():
+            thread_profiler = cProfile.Profile()
+            thread_profiler.enable()
+            return thread_profiler
+
+        def stop(thread_profiler):
+            thread_profiler.disable()
+            with lock:
+                finished.append(thread_profiler)
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        # С Python 3.12 cProfile сам видит все потоки, а второй профилировщик включить нельзя
+        threads = profile_new_threads(start, stop) if sys.version_info < (3, 12) else contextlib.nullcontext()
+        try:
+            with threads:
+                yield
+        finally:
+            profiler.disable()
+            stats = pstats.Stats(profiler)
+            with lock:
+                for thread_profiler in finished:
+                    stats.add(thread_profiler)
+            stats.dump_stats(f"{output}.prof")
+            stats.sort_stats('cumulative').print_stats(20)
+            print(f"Профиль сохранен в {output}.prof (потоков: {len(finished) + 1})")
+    elif kind == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+            from pyinstrument.renderers import ConsoleRenderer, HTMLRenderer
+            from pyinstrument.session import Session
+        except ImportError:
+            print("pyinstrument не установлен - профилирование отключено")
+            yield
+            return
+
+        def start():
+            thread_profiler = Profiler()
+            thread_profiler.start()
+            return thread_profiler
+
+        def stop(thread_profiler):
+            # pyinstrument останавливается в том же потоке, где запущен
+            session = thread_profiler.stop()
+            with lock:
+                finished.append(session)
+
+        profiler = Profiler()
+        profiler.start()
+        try:
+            with profile_new_threads(start, stop):
+                yield
+        finally:
+            session = profiler.stop()
+            with lock:
+                for thread_session in finished:
+                    session = Session.combine(session, thread_session)
+            with open(f"{output}.html", 'w', encoding='utf-8') as f:
+                f.write(HTMLRenderer().render(session))
+            print(ConsoleRenderer(unicode=True).render(session))
+            print(f"Профиль сохранен в {output}.html (потоков: {len(finished) + 1})")
+    else:
+        yield
+
+
+def progress_from_env():
+    return os.environ.get(PROGRESS_ENV, '').lower() in ('1', 'true', 'yes')
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Использование: python metrics.py старый_metrics.json новый_metrics.json")
+        sys.exit(1)
+    regressions = compare_metrics(sys.argv[1], sys.argv[2])
+    if not regressions:
+        print("✅ Регрессий не найдено")
+    for name, before, after in regressions:
+        print(f"⚠️ {name}: {before:.1f} мс -> {after:.1f} мс")
+    sys.exit(1 if regressions else 0)
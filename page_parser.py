@@ -0,0 +1,181 @@
+from functools import lru_cache
+from html.parser import HTMLParser
+
+# Факты о странице, которые нужны SEO-анализу, собираются за один проход:
+# {
+#     'title': str | None, 'meta_description': str | None,
+#     'headings': {'h1': [...], 'h2': [...], 'h3': [...]},
+#     'images': [{'src', 'alt', 'width', 'height', 'loading'}],  # None, если атрибута нет
+#     'schema': [itemtype | None], 'og': {...}, 'twitter': {...},
+#     'links': [href, ...]
+# }
+
+HEADING_TAGS = ('h1', 'h2', 'h3')
+IMAGE_ATTRS = ('src', 'alt', 'width', 'height', 'loading')
+
+
+def empty_facts():
+    return {
+        'title': None,
+        'meta_description': None,
+        'headings': {tag: [] for tag in HEADING_TAGS},
+        'images': [],
+        'schema': [],
+        'og': {},
+        'twitter': {},
+        'links': []
+    }
+
+
+def add_element(facts, tag, attrs):
+    """Учитывает открывающий тег (общая логика для всех бэкендов)"""
+    if 'itemscope' in attrs:
+        facts['schema'].append(attrs.get('itemtype'))
+
+    if tag == 'meta':
+        name = attrs.get('name')
+        prop = attrs.get('property')
+        if name == 'description' and facts['meta_description'] is None:
+            facts['meta_description'] = attrs.get('content') or ''
+        if name and name.startswith('twitter:'):
+            facts['twitter'][name] = attrs.get('content') or ''
+        if prop and prop.startswith('og:'):
+            facts['og'][prop] = attrs.get('content') or ''
+    elif tag == 'img':
+        facts['images'].append({attr: attrs.get(attr) for attr in IMAGE_ATTRS})
+    elif tag == 'a' and attrs.get('href') is not None:
+        facts['links'].append(attrs['href'])
+
+
+class FactsParser(HTMLParser):
+    """Потоковый разбор на стандартной библиотеке: без построения дерева"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.facts = empty_facts()
+        self.text_stack = []  # [(тег, части текста)] для title и h1-h3
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {name: (value if value is not None else '') for name, value in attrs}
+        add_element(self.facts, tag, attrs)
+        if tag == 'title' or tag in HEADING_TAGS:
+            self.text_stack.append((tag, []))
+
+    def handle_startendtag(self, tag, attrs):
+        attrs = {name: (value if value is not None else '') for name, value in attrs}
+        add_element(self.facts, tag, attrs)
+
+    def handle_data(self, data):
+        for _, parts in self.text_stack:
+            parts.append(data)
+
+    def handle_endtag(self, tag):
+        if not self.text_stack or self.text_stack[-1][0] != tag:
+            return
+        _, parts = self.text_stack.pop()
+        if tag == 'title':
+            if self.facts['title'] is None:
+                self.facts['title'] = ''.join(parts)
+        else:
+            self.facts['headings'][tag].append(''.join(part.strip() for part in parts))
+
+
+def parse_with_stdlib(html):
+    parser = FactsParser()
+    parser.feed(html)
+    parser.close()
+    return parser.facts
+
+
+def parse_with_lxml(html):
+    """Потоковый разбор событий lxml (HTMLPullParser)"""
+    from lxml import etree
+
+    facts = empty_facts()
+    parser = etree.HTMLPullParser(events=('start', 'end'))
+    parser.feed(html)
+    parser.close()
+    for event, element in parser.read_events():
+        tag = element.tag
+        if not isinstance(tag, str):
+            continue
+        if event == 'start':
+            add_element(facts, tag, element.attrib)
+        elif tag == 'title' and facts['title'] is None:
+            facts['title'] = element.text or ''
+        elif tag in HEADING_TAGS:
+            facts['headings'][tag].append(''.join(text.strip() for text in element.itertext()))
+    return facts
+
+
+def parse_with_selectolax(html):
+    """Один обход дерева lexbor (selectolax)"""
+    from selectolax.parser import HTMLParser as SelectolaxParser
+
+    facts = empty_facts()
+    tree = SelectolaxParser(html)
+    if tree.root is None:
+        return facts
+    for node in tree.root.traverse():
+        tag = node.tag
+        if not tag or tag.startswith(('-', '_', '!')):  # текст, комментарии, doctype
+            continue
+        attrs = {name: (value if value is not None else '') for name, value in node.attributes.items()}
+        add_element(facts, tag, attrs)
+        if tag == 'title' and facts['title'] is None:
+            facts['title'] = node.text(deep=True)
+        elif tag in HEADING_TAGS:
+            facts['headings'][tag].append(node.text(deep=True, strip=True))
+    return facts
+
+
+def facts_from_soup(soup):
+    """Те же факты из уже построенного дерева BeautifulSoup"""
+    facts = empty_facts()
+    for element in soup.find_all(True):
+        attrs = {name: (' '.join(value) if isinstance(value, list) else value)
+                 for name, value in element.attrs.items()}
+        add_element(facts, element.name, attrs)
+        if element.name == 'title' and facts['title'] is None:
+            facts['title'] = element.string or ''
+        elif element.name in HEADING_TAGS:
+            facts['headings'][element.name].append(element.get_text(strip=True))
+    return facts
+
+
+def parse_with_bs4(html):
+    from bs4 import BeautifulSoup
+    return facts_from_soup(BeautifulSoup(html, 'html.parser'))
+
+
+BACKENDS = {
+    'selectolax': parse_with_selectolax,
+    'lxml': parse_with_lxml,
+    'stdlib': parse_with_stdlib,
+    'bs4': parse_with_bs4
+}
+
+
+@lru_cache(maxsize=None)
+def available_backends():
+    """Бэкенды, которые можно использовать в текущем окружении (от быстрого к медленному)"""
+    available = []
+    for name, module in (('selectolax', 'selectolax.parser'), ('lxml', 'lxml.etree')):
+        try:
+            __import__(module)
+            available.append(name)
+        except ImportError:
+            pass
+    return tuple(available) + ('stdlib', 'bs4')
+
+
+def parse_page(html, backend='auto'):
+    """Собирает факты о странице выбранным бэкендом; при ошибке - через BeautifulSoup"""
+    if backend == 'auto':
+        backend = available_backends()[0]
+    try:
+        return BACKENDS[backend](html)
+    except Exception:
+        if backend == 'bs4':
+            raise
+        return parse_with_bs4(html)
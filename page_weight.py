@@ -0,0 +1,280 @@
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+# Сколько байт запрашивается сначала и сколько максимум читается ради заголовка изображения
+PROBE_BYTES = 8 * 1024
+MAX_PROBE_BYTES = 64 * 1024
+# Форматы, которые не требуют перекодирования в WebP/AVIF
+MODERN_FORMATS = ('webp', 'avif', 'svg')
+# Маркеры JPEG с размерами кадра (SOF0-SOF15, кроме DHT, JPG и DAC)
+JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# Бренды ftyp: AVIF и прочие изображения в контейнере HEIF
+AVIF_BRANDS = {b'avif', b'avis'}
+HEIF_BRANDS = AVIF_BRANDS | {b'mif1', b'msf1', b'heic', b'heix'}
+
+
+def jpeg_size(data):
+    """(ширина, высота) из маркера SOF или None, если он ещё не прочитан"""
+    i = 2
+    while i + 9 <= len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:
+            # Байты-заполнители между маркерами
+            i += 1
+            continue
+        if marker in JPEG_SOF_MARKERS:
+            height, width = struct.unpack('>HH', data[i + 5:i + 9])
+            return width, height
+        if marker == 0xD8 or 0xD0 <= marker <= 0xD7:
+            i += 2
+            continue
+        i += 2 + struct.unpack('>H', data[i + 2:i + 4])[0]
+    return None
+
+
+def webp_size(data):
+    chunk = data[12:16]
+    if chunk == b'VP8 ' and len(data) >= 30:
+        width, height = struct.unpack('<HH', data[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b'VP8L' and len(data) >= 25:
+        b0, b1, b2, b3 = data[21:25]
+        return 1 + (((b1 & 0x3F) << 8) | b0), 1 + (((b3 & 0x0F) << 10) | (b2 << 2) | ((b1 & 0xC0) >> 6))
+    if chunk == b'VP8X' and len(data) >= 30:
+        return 1 + int.from_bytes(data[24:27], 'little'), 1 + int.from_bytes(data[27:30], 'little')
+    return None
+
+
+def avif_size(data):
+    """Размеры из первого блока ispe (свойства изображения в контейнере HEIF)"""
+    pos = data.find(b'ispe')
+    if pos < 0 or len(data) < pos + 16:
+        return None
+    return struct.unpack('>II', data[pos + 8:pos + 16])
+
+
+def ftyp_brands(data):
+    """Основной и совместимые бренды из блока ftyp контейнера ISO BMFF (AVIF, HEIF)"""
+    size = struct.unpack('>I', data[:4])[0] if len(data) >= 4 else 0
+    end = min(size, len(data)) if size >= 16 else min(16, len(data))
+    brands = {data[8:12]}
+    brands.update(data[i:i + 4] for i in range(16, end - 3, 4))
+    return brands
+
+
+def image_info(data):
+    """Формат и размеры в пикселях по первым байтам файла.
+    None - формат не распознан; width=None - для размеров нужно прочитать больше байт"""
+    size = None
+    if data.startswith(b'\x89PNG\r\n\x1a\n'):
+        kind = 'png'
+        if len(data) >= 24:
+            size = struct.unpack('>II', data[16:24])
+    elif data.startswith((b'GIF87a', b'GIF89a')):
+        kind = 'gif'
+        if len(data) >= 10:
+            size = struct.unpack('<HH', data[6:10])
+    elif data.startswith(b'\xff\xd8'):
+        kind = 'jpeg'
+        size = jpeg_size(data)
+    elif data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        kind = 'webp'
+        size = webp_size(data)
+    elif data[4:8] == b'ftyp' and ftyp_brands(data) & HEIF_BRANDS:
+        # Многие кодировщики AVIF пишут основным брендом mif1, а avif - только среди совместимых
+        kind = 'avif' if ftyp_brands(data) & AVIF_BRANDS else 'heif'
+        size = avif_size(data)
+    elif b'<svg' in data[:1024].lower():
+        # Векторное изображение: размеры в пикселях ему не важны
+        return {'format': 'svg', 'width': None, 'height': None, 'complete': True}
+    else:
+        return None
+    width, height = size if size else (None, None)
+    return {'format': kind, 'width': width, 'height': height, 'complete': size is not None}
+
+
+def total_size(response):
+    """Полный размер файла: из Content-Range для ответа 206, иначе из Content-Length"""
+    total = response.headers.get('Content-Range', '').rpartition('/')[2]
+    if total.isdigit():
+        return int(total)
+    length = response.headers.get('Content-Length', '')
+    return int(length) if length.isdigit() and response.status_code == 200 else None
+
+
+def probe_image(session, url, probe_bytes=PROBE_BYTES, max_bytes=MAX_PROBE_BYTES):
+    """Формат, размеры и вес изображения по первым килобайтам (Range-запросы).
+    Если заголовок JPEG не уместился, следующий диапазон запрашивается вдвое больше"""
+    data = b''
+    result = {'url': url, 'status': None, 'format': None, 'width': None, 'height': None,
+              'bytes': None, 'read': 0}
+    end = probe_bytes
+    while True:
+        response = session.get(url, timeout=10, stream=True,
+                               headers={'Range': f'bytes={len(data)}-{end - 1}'})
+        try:
+            result['status'] = response.status_code
+            if response.status_code >= 400:
+                return result
+            result['bytes'] = result['bytes'] or total_size(response)
+            ranged = response.status_code == 206
+            if not ranged:
+                # Сервер не поддерживает Range и отдаёт файл целиком - читаем только начало
+                data = b''
+            for chunk in response.iter_content(4096):
+                data += chunk
+                if not ranged and (len(data) >= end or (image_info(data) or {}).get('complete')):
+                    break
+        finally:
+            response.close()
+        result['read'] = len(data)
+        info = image_info(data)
+        if info:
+            result.update(format=info['format'], width=info['width'], height=info['height'])
+        finished = info is None or info['complete'] or not ranged
+        if finished or end >= max_bytes or (result['bytes'] is not None and len(data) >= result['bytes']):
+            return result
+        end = min(end * 2, max_bytes)
+
+
+def as_int(value):
+    try:
+        return int(str(value).strip().rstrip('px'))
+    except (TypeError, ValueError):
+        return None
+
+
+class PageWeightAudit:
+    """Вес изображений страниц без их загрузки.
+
+    Каждое изображение проверяется один раз на весь сайт: у него читаются только первые
+    килобайты (формат и размеры в пикселях), а полный вес берётся из Content-Range.
+    Проверки идут в отдельном пуле потоков параллельно с обходом и с учётом темпа хоста.
+    Для каждой страницы отмечаются тяжёлые изображения, изображения крупнее, чем
+    указано в width/height, форматы не WebP/AVIF и тяжёлые изображения без loading="lazy"."""
+
+    def __init__(self, session, throttle=None, workers=8, max_image_kb=200, max_scale=2.0, metrics=None):
+        self.session = session
+        self.throttle = throttle
+        self.max_bytes = max_image_kb * 1024
+        # Во сколько раз картинка может быть больше размера, заданного в HTML
+        self.max_scale = max_scale
+        self.metrics = metrics
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.lock = threading.Lock()
+        self.probes = {}  # URL изображения -> Future с результатом probe_image
+        self.pages = {}   # URL страницы -> изображения из analyze_images
+
+    def probe(self, url):
+        host = urlparse(url).netloc
+        if self.throttle is not None:
+            self.throttle.acquire(host)
+        start = time.monotonic()
+        try:
+            result = probe_image(self.session, url)
+        except Exception as e:
+            if self.throttle is not None:
+                self.throttle.release(host, latency=time.monotonic() - start, error=True)
+            result = {'url': url, 'status': None, 'error': str(e)}
+        else:
+            if self.throttle is not None:
+                self.throttle.release(host, result['status'], time.monotonic() - start)
+        if self.metrics is not None:
+            self.metrics.count('images.probed')
+            self.metrics.count('images.probe_bytes', result.get('read') or 0)
+        return result
+
+    def add_page(self, url, images):
+        """Запоминает изображения страницы и ставит в очередь проверку ещё не известных"""
+        images = [img for img in images if img['src'].startswith(('http://', 'https://'))]
+        with self.lock:
+            self.pages[url] = images
+            for img in images:
+                if img['src'] not in self.probes:
+                    self.probes[img['src']] = self.executor.submit(self.probe, img['src'])
+
+    def check_image(self, img, probe):
+        """Замечания по одному изображению страницы"""
+        issues = []
+        size = probe.get('bytes')
+        if size is not None and size > self.max_bytes:
+            issues.append('heavy')
+            if img['loading'] != 'lazy':
+                issues.append('not_lazy')
+        width, height = probe.get('width'), probe.get('height')
+        shown_width, shown_height = as_int(img['width']), as_int(img['height'])
+        if (width and shown_width and width > shown_width * self.max_scale) or \
+                (height and shown_height and height > shown_height * self.max_scale):
+            issues.append('oversized')
+        if probe.get('format') and probe['format'] not in MODERN_FORMATS:
+            issues.append('legacy_format')
+        return issues
+
+    def rows(self):
+        """Строки отчёта по страницам (ждёт завершения всех проверок)"""
+        with self.lock:
+            pages = list(self.pages.items())
+            probes = dict(self.probes)
+        rows = []
+        for url, images in pages:
+            counts = {'heavy': 0, 'oversized': 0, 'legacy_format': 0, 'not_lazy': 0}
+            total, failed, largest = 0, 0, None
+            for img in images:
+                probe = probes[img['src']].result()
+                if probe.get('status') is None or probe['status'] >= 400:
+                    failed += 1
+                    continue
+                size = probe.get('bytes') or 0
+                total += size
+                if largest is None or size > largest[1]:
+                    largest = (img['src'], size)
+                for issue in self.check_image(img, probe):
+                    counts[issue] += 1
+            rows.append({
+                'URL': url,
+                'Images': len(images),
+                'Images_KB': round(total / 1024, 1),
+                'Heavy': counts['heavy'],
+                'Oversized': counts['oversized'],
+                'Legacy_Format': counts['legacy_format'],
+                'Not_Lazy_Heavy': counts['not_lazy'],
+                'Failed': failed,
+                'Largest_Image': largest[0] if largest else ''
+            })
+        return rows
+
+    def image_rows(self):
+        """Строки по каждому проверенному изображению"""
+        with self.lock:
+            probes = list(self.probes.values())
+        rows = []
+        for future in probes:
+            probe = future.result()
+            rows.append({
+                'URL': probe['url'],
+                'Status': probe.get('status'),
+                'Format': probe.get('format') or '',
+                'Width': probe.get('width') or '',
+                'Height': probe.get('height') or '',
+                'KB': round(probe['bytes'] / 1024, 1) if probe.get('bytes') else '',
+                'Probe_Bytes': probe.get('read') or 0,
+                'Error': probe.get('error', '')
+            })
+        return rows
+
+    def report(self):
+        with self.lock:
+            probes = list(self.probes.values())
+        read = sum((future.result().get('read') or 0) for future in probes)
+        total = sum((future.result().get('bytes') or 0) for future in probes)
+        return (f"Проверено изображений: {len(probes)}, прочитано {read / 1024:.1f} KB "
+                f"из {total / 1024 / 1024:.1f} MB их полного веса")
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
@@ -1,22 +1,233 @@
-#SEO-парсер (на базе BeautifulSoup)
-#Волшебный код: узнаём заголовок любого сайта
+#SEO-парсер заголовков: title и первый <h1> для списка сайтов
+#Каждая страница читается только до нужного места - </head> или первого </h1>
+import argparse
+import codecs
+import csv
+import json
+import re
+import sys
+import time
 import requests
-from bs4 import BeautifulSoup
-
-# Сайт для примера (можешь заменить на свой)
-url = "https://vitoslavica.ru"
-
-response = requests.get(url)
-soup = BeautifulSoup(response.text, 'html.parser')
-title = soup.find('h2').text  # Ищем заголовок <h1>
-print("Заголовок страницы:", title)
-print("Статус ответа:", response.status_code)  # 200 = сайт доступен
-links = [a['href'] for a in soup.find_all('a', href=True)]
-print("Первые 5 ссылок:", links[:5])
-with open('title.txt', 'w') as f:
-    f.write(title)
-print("Заголовок сохранён в title.txt!")
-if response.status_code == 200:  
-    print("Сайт доступен!")  
-else:  
-    print("Ошибка!")  
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from html.parser import HTMLParser
+from urllib.parse import urlparse
+from throttle import AdaptiveThrottle
+from metrics import Metrics, progress_from_env
+import transport
+
+USER_AGENT = 'Mozilla/5.0'
+CHUNK_SIZE = 8 * 1024
+# Дальше этого объёма страница не читается, даже если <h1> так и не встретился
+MAX_BYTES = 1024 * 1024
+OUTPUT_FIELDS = ['URL', 'Status', 'Title', 'H1', 'Meta_Description', 'Bytes_Read', 'Content_Length',
+                 'Stopped_Early', 'Error']
+META_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.I)
+
+
+class HeadingParser(HTMLParser):
+    """Потоковый разбор: title, meta description и первый <h1>.
+    done становится True, как только всё нужное найдено - дальше страницу можно не читать"""
+
+    def __init__(self, need_h1=True):
+        super().__init__(convert_charrefs=True)
+        self.need_h1 = need_h1
+        self.title = None
+        self.h1 = None
+        self.description = None
+        self.capture = None  # Тег, текст которого сейчас собирается
+        self.parts = []
+        self.done = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ('title', 'h1') and self.capture is None and getattr(self, tag) is None:
+            self.capture, self.parts = tag, []
+        elif tag == 'meta' and self.description is None:
+            attrs = dict(attrs)
+            if (attrs.get('name') or '').lower() == 'description':
+                self.description = (attrs.get('content') or '').strip()
+        elif tag == 'body' and not self.need_h1:
+            self.done = True
+
+    def handle_data(self, data):
+        if self.capture:
+            self.parts.append(data)
+
+    def handle_endtag(self, tag):
+        if tag == self.capture:
+            text = ' '.join(''.join(self.parts).split())
+            setattr(self, tag, text)
+            self.capture = None
+            if tag == 'h1':
+                self.done = True
+        elif tag == 'head' and not self.need_h1:
+            self.done = True
+
+
+def response_decoder(response, first_chunk):
+    """Инкрементальный декодер: кодировка из заголовка, из <meta charset> или UTF-8"""
+    encoding = requests.utils.get_encoding_from_headers(response.headers)
+    # requests подставляет ISO-8859-1 для text/* без charset - для русских сайтов это неверно
+    if encoding is None or (encoding.lower() == 'iso-8859-1' and 'charset' not in
+                            response.headers.get('Content-Type', '').lower()):
+        match = META_CHARSET.search(first_chunk)
+        encoding = match.group(1).decode('ascii') if match else 'utf-8'
+    try:
+        return codecs.getincrementaldecoder(encoding)(errors='replace')
+    except LookupError:
+        return codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+
+def extract_heading(session, url, need_h1=True, max_bytes=MAX_BYTES):
+    """Загружает страницу потоком и прекращает чтение, как только найдены title и <h1>
+    (или закрыт </head>, если <h1> не нужен). Соединение при этом закрывается"""
+    row = dict.fromkeys(OUTPUT_FIELDS, '')
+    row.update(URL=url, Stopped_Early=False)
+    response = session.get(url, timeout=10, stream=True)
+    try:
+        row['Status'] = response.status_code
+        row['Content_Length'] = response.headers.get('Content-Length', '')
+        if 'html' not in response.headers.get('Content-Type', 'text/html'):
+            row['Error'] = 'не HTML'
+            return row
+        parser = HeadingParser(need_h1)
+        decoder = None
+        read = 0
+        for chunk in response.iter_content(CHUNK_SIZE):
+            read += len(chunk)
+            if decoder is None:
+                decoder = response_decoder(response, chunk)
+            parser.feed(decoder.decode(chunk))
+            if parser.done or read >= max_bytes:
+                # Остаток тела не нужен: соединение закрывается, а не дочитывается
+                row['Stopped_Early'] = True
+                break
+        # Байты из сети (до распаковки gzip) - их можно сравнивать с Content-Length
+        wire = getattr(response.raw, 'tell', lambda: read)()
+        row.update(Title=parser.title or '', H1=parser.h1 or '', Meta_Description=parser.description or '',
+                   Bytes_Read=wire)
+    finally:
+        response.close()
+    return row
+
+
+def create_session(pool_size=16):
+    """Сессия с пулом соединений на каждый хост; в списке обычно много хостов - пулов держится больше"""
+    return transport.create_session(pool_size=pool_size, pool_hosts=max(64, pool_size * 8), user_agent=USER_AGENT)
+
+
+def read_urls(source):
+    """URL по одному в строке; пустые строки и комментарии (#) пропускаются"""
+    for line in source:
+        url = line.strip()
+        if url and not url.startswith('#'):
+            yield url if url.startswith(('http://', 'https://')) else 'https://' + url
+
+
+class ResultWriter:
+    """Пишет строки по мере готовности: JSON Lines или CSV (по расширению файла)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.jsonl = not path.endswith('.csv')
+        self.file = open(path, 'w', newline='', encoding='utf-8-sig' if not self.jsonl else 'utf-8')
+        self.writer = None if self.jsonl else csv.DictWriter(self.file, fieldnames=OUTPUT_FIELDS)
+        if self.writer:
+            self.writer.writeheader()
+        self.rows = 0
+
+    def write(self, row):
+        if self.jsonl:
+            self.file.write(json.dumps(row, ensure_ascii=False) + '\n')
+        else:
+            self.writer.writerow(row)
+        self.rows += 1
+        if self.rows % 100 == 0:
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def extract_all(urls, write, workers=16, need_h1=True, throttle=None, metrics=None):
+    """Параллельная обработка списка URL любой длины: в работе не больше workers * 4 адресов,
+    готовые строки сразу передаются в write"""
+    metrics = metrics or Metrics('titles')
+    throttle = throttle or AdaptiveThrottle(initial_interval=0, max_concurrency=workers, metrics=metrics)
+    session = create_session(workers)
+
+    def task(url):
+        host = urlparse(url).netloc
+        throttle.acquire(host)
+        start = time.monotonic()
+        try:
+            row = extract_heading(session, url, need_h1)
+        except Exception as e:
+            throttle.release(host, latency=time.monotonic() - start, error=True)
+            row = dict.fromkeys(OUTPUT_FIELDS, '')
+            row.update(URL=url, Status='Ошибка', Stopped_Early=False, Error=str(e))
+            metrics.count('errors')
+            return row
+        throttle.release(host, row['Status'], time.monotonic() - start)
+        metrics.observe('http.total', time.monotonic() - start)
+        metrics.count('pages')
+        metrics.count('http.bytes', row['Bytes_Read'] or 0)
+        if str(row['Content_Length']).isdigit():
+            metrics.count('http.content_length', int(row['Content_Length']))
+        if row['Stopped_Early']:
+            metrics.count('stopped_early')
+        return row
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for url in urls:
+            pending.add(executor.submit(task, url))
+            if len(pending) >= workers * 4:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    write(future.result())
+        for future in wait(pending).done:
+            write(future.result())
+    session.close()
+    return metrics
+
+
+def add_arguments(parser):
+    parser.add_argument('input', nargs='?', default='-', help='Файл со списком URL (по умолчанию stdin)')
+    parser.add_argument('-o', '--output', help='Файл результатов .jsonl или .csv (по умолчанию titles_<время>.jsonl)')
+    parser.add_argument('--workers', type=int, default=16, help='Одновременных запросов')
+    parser.add_argument('--no-h1', action='store_true', help='Только title и description: чтение до </head>')
+
+
+def run(args):
+    """Извлечение заголовков по разобранным аргументам командной строки"""
+    output = args.output or f"titles_{time.strftime('%Y%m%d_%H%M%S')}.jsonl"
+    source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+    writer = ResultWriter(output)
+    metrics = Metrics('titles', progress=progress_from_env())
+    print(f"🔍 Читаю заголовки страниц из {'stdin' if args.input == '-' else args.input}")
+    try:
+        extract_all(read_urls(source), writer.write, workers=args.workers, need_h1=not args.no_h1,
+                    metrics=metrics)
+    finally:
+        writer.close()
+        if source is not sys.stdin:
+            source.close()
+
+    counters = metrics.to_dict()['counters']
+    read = counters.get('http.bytes', 0)
+    print(f"\n📄 Обработано страниц: {writer.rows}, ошибок: {counters.get('errors', 0)}, "
+          f"чтение прервано досрочно: {counters.get('stopped_early', 0)}")
+    print(f"Прочитано {read / 1024 / 1024:.1f} MB (заявленный размер страниц с Content-Length: "
+          f"{counters.get('http.content_length', 0) / 1024 / 1024:.1f} MB)")
+    print(transport.report())
+    print(f"Результаты сохранены в {output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Title и H1 для списка страниц без загрузки их целиком')
+    add_arguments(parser)
+    run(parser.parse_args())
+
+
+if __name__ == '__main__':
+    main()
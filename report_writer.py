@@ -0,0 +1,127 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+MISSING = '❌ Отсутствует'
+# Колонки отчёта в фиксированном порядке: у всех пакетов одинаковая схема
+REPORT_COLUMNS = [
+    'URL', 'Title', 'Title_Length', 'Meta_Description', 'Meta_Length',
+    'H1', 'H1_Count', 'H2_Count', 'H3_Count', 'Images_Total', 'Images_Without_Alt',
+    'Schema_Types', 'OG_Tags', 'Twitter_Tags', 'Status', 'Domain', 'Content_Hash',
+    'Title_Recommendation', 'Meta_Recommendation', 'Images_Recommendation'
+]
+INT_COLUMNS = ['Title_Length', 'Meta_Length', 'H1_Count', 'H2_Count', 'H3_Count',
+               'Images_Total', 'Images_Without_Alt', 'OG_Tags', 'Twitter_Tags', 'Status']
+
+
+def add_recommendations(df):
+    """Рекомендации по title, description и alt - векторно, без построчных apply"""
+    title_length = df['Title_Length']
+    df['Title_Recommendation'] = np.select(
+        [title_length < 50, title_length > 60],
+        ["⚠️ Слишком короткий", "⚠️ Слишком длинный"], default="✅ OK")
+
+    df['Meta_Recommendation'] = pd.cut(
+        df['Meta_Length'], bins=[-np.inf, 119, 160, np.inf],
+        labels=["⚠️ Слишком короткое", "✅ OK", "⚠️ Слишком длинное"]).astype(str)
+
+    without_alt = df['Images_Without_Alt']
+    df['Images_Recommendation'] = np.where(
+        without_alt == 0, "✅ OK", "⚠️ " + without_alt.astype(str) + " без alt")
+    return df
+
+
+class StreamingReportWriter:
+    """Пишет строки отчёта пакетами по мере обхода (CSV и, если есть pyarrow, Parquet).
+    Parquet - каталог файлов part-NNNNN.parquet: каждый пакет закрывается сразу,
+    поэтому после сбоя уже записанные пакеты читаются pd.read_parquet(каталог).
+    Сводка по доменам считается по накопленным суммам, а не по всему отчёту в памяти"""
+
+    def __init__(self, csv_path, parquet_path=None, batch_size=100, samples=2):
+        self.csv_path = csv_path
+        self.parquet_path = parquet_path
+        self.batch_size = batch_size
+        self.samples = samples
+        self.batch = []
+        self.rows_written = 0
+        self.parquet_schema = None
+        self.parquet_parts = 0
+        # Домен -> накопленные суммы для сводной статистики
+        self.totals = {}
+        # Примеры страниц с микроразметкой OpenGraph
+        self.microdata_samples = {}
+
+    def add(self, row):
+        self.batch.append(row)
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Дописывает накопленный пакет в файлы отчёта"""
+        if not self.batch:
+            return
+        df = pd.DataFrame(self.batch)
+        self.batch = []
+        for column in INT_COLUMNS:
+            df[column] = pd.to_numeric(df[column], errors='coerce').fillna(0).astype('int64')
+        df = add_recommendations(df).reindex(columns=REPORT_COLUMNS)
+
+        # Первый пакет перезаписывает файл: чужой отчёт с тем же именем не дописывается
+        first = self.rows_written == 0
+        with open(self.csv_path, 'w' if first else 'a', newline='', encoding='utf-8-sig') as f:
+            df.to_csv(f, index=False, header=first)
+        if self.parquet_path:
+            self.write_parquet(df)
+        self.rows_written += len(df)
+        self.update_totals(df)
+
+    def write_parquet(self, df):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            print("pyarrow не установлен - отчет сохраняется только в CSV")
+            self.parquet_path = None
+            return
+        text_columns = [column for column in REPORT_COLUMNS if column not in INT_COLUMNS]
+        df = df.astype({column: str for column in text_columns})
+        table = pa.Table.from_pandas(df, schema=self.parquet_schema, preserve_index=False)
+        if self.parquet_schema is None:
+            self.parquet_schema = table.schema
+            os.makedirs(self.parquet_path, exist_ok=True)
+        # Пакет пишется во временный файл и переименовывается - недописанных частей в каталоге не бывает
+        path = os.path.join(self.parquet_path, f"part-{self.parquet_parts:05d}.parquet")
+        pq.write_table(table, path + '.tmp')
+        os.replace(path + '.tmp', path)
+        self.parquet_parts += 1
+
+    def update_totals(self, df):
+        has_schema = (df['Schema_Types'] != MISSING).astype(int)
+        grouped = df.assign(Has_Schema=has_schema, Pages=1).groupby('Domain')[
+            ['Pages', 'H1_Count', 'Images_Without_Alt', 'OG_Tags', 'Has_Schema']].sum()
+        for domain, sums in grouped.iterrows():
+            totals = self.totals.setdefault(domain, dict.fromkeys(grouped.columns, 0))
+            for column, value in sums.items():
+                totals[column] += int(value)
+
+        remaining = self.samples - len(self.microdata_samples)
+        if remaining > 0:
+            for _, row in df[df['OG_Tags'] > 0].head(remaining).iterrows():
+                self.microdata_samples[row['URL']] = {'OG': int(row['OG_Tags']), 'Schema': row['Schema_Types']}
+
+    def summary(self):
+        """Сводная статистика по сайтам (та же, что раньше давал groupby по всему отчёту)"""
+        rows = {}
+        for domain, totals in self.totals.items():
+            pages = totals['Pages']
+            rows[domain] = {
+                'H1_Count': totals['H1_Count'] / pages,
+                'Images_Without_Alt': totals['Images_Without_Alt'],
+                'OG_Tags': totals['OG_Tags'] / pages,
+                'Schema_Types': totals['Has_Schema'] / pages
+            }
+        return pd.DataFrame.from_dict(rows, orient='index').rename_axis('Domain').round(2)
+
+    def close(self):
+        self.flush()
@@ -0,0 +1,77 @@
+"""Единая точка входа для всех инструментов без интерактивных вопросов.
+
+    python seo_cli.py analyze site1.ru site2.com --max-pages 200
+    python seo_cli.py links https://vitoslavica.ru --max-pages 500
+    python seo_cli.py images https://site.ru/gallery --largest
+    python seo_cli.py serp vitoslavica.ru --keywords-file keywords.txt
+    python seo_cli.py titles urls.txt -o titles.csv
+
+Модуль инструмента импортируется только для выбранной подкоманды, а тяжёлые
+библиотеки (pandas, numpy, BeautifulSoup) - только там, где они нужны, поэтому
+короткие запуски из cron не тратят время на лишние импорты. С --timing выводится,
+сколько заняли импорт модуля, разбор аргументов и сама работа;
+полное время запуска по сравнению со старыми скриптами замеряет benchmarks/bench_startup.py.
+"""
+import argparse
+import importlib
+import sys
+import time
+
+STARTED = time.perf_counter()
+
+# Подкоманда -> (модуль с add_arguments и run, описание)
+COMMANDS = {
+    'analyze': ('SEO_Site_Analyzer', 'SEO-анализ сайтов: title, description, заголовки, изображения, микроразметка'),
+    'links': ('check_broken_links', 'Проверка битых ссылок на сайте'),
+    'images': ('image_downloader', 'Загрузка изображений со страниц'),
+    'serp': ('serp_checker', 'Позиции сайта в выдаче Google и Яндекса'),
+    'titles': ('parser_SEO_title', 'Title и H1 для списка страниц без загрузки их целиком'),
+}
+
+
+def build_parser(command=None):
+    """Парсер со всеми подкомандами; аргументы подключаются только у выбранной"""
+    parser = argparse.ArgumentParser(prog='seo_cli', description='SEO-инструменты в одной команде')
+    parser.add_argument('--timing', action='store_true', help='Показать время запуска и импорта')
+    subparsers = parser.add_subparsers(dest='command', metavar='команда')
+    subparsers.required = True
+    timings = {}
+    for name, (module_name, description) in COMMANDS.items():
+        subparser = subparsers.add_parser(name, help=description, description=description)
+        if name == command:
+            start = time.perf_counter()
+            module = importlib.import_module(module_name)
+            timings['import_s'] = time.perf_counter() - start
+            module.add_arguments(subparser)
+            subparser.set_defaults(run=module.run)
+    return parser, timings
+
+
+def find_command(argv):
+    """Первая подкоманда в аргументах (до неё могут идти общие флаги)"""
+    for arg in argv:
+        if arg in COMMANDS:
+            return arg
+        if not arg.startswith('-'):
+            return None
+    return None
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    parser, timings = build_parser(find_command(argv))
+    args = parser.parse_args(argv)
+    ready = time.perf_counter()
+    if args.timing:
+        print(f"⏱ Импорт {COMMANDS[args.command][0]}: "
+              f"{timings.get('import_s', 0) * 1000:.0f} мс, до начала работы: {(ready - STARTED) * 1000:.0f} мс",
+              file=sys.stderr)
+    try:
+        args.run(args)
+    finally:
+        if args.timing:
+            print(f"⏱ Работа команды {args.command}: {time.perf_counter() - ready:.2f} с", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
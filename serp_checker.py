@@ -1,62 +1,156 @@
-import requests
-from bs4 import BeautifulSoup
+import argparse
+import sys
 import time
 import csv
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from urllib.parse import quote_plus
+from throttle import AdaptiveThrottle
+from serp_store import SERPStore
+from metrics import Metrics, profiled, progress_from_env
+import transport
+
+# Адреса страниц выдачи; для офлайн-проверки их можно заменить на локальный сервер
+ENGINE_URLS = {
+    'google': "https://www.google.com/search?q={query}&start={start}",
+    'yandex': "https://yandex.ru/search/?text={query}&p={page}"
+}
+ENGINE_NAMES = {'google': 'Google', 'yandex': 'Яндекс'}
+
+
+class SERPCheckFailed(Exception):
+    """Сайт не найден, но часть страниц выдачи не получена (капча, 429, ошибка сети):
+    это не «сайт не найден», а неудачная проверка"""
+
+def parse_google(html):
+    """Ссылки органической выдачи Google (блоки div.g)"""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+    links = []
+    for result in soup.find_all('div', class_='g')[:10]:
+        link = result.find('a')
+        links.append(link.get('href') if link else None)
+    return links
+
+def parse_yandex(html):
+    """Ссылки органической выдачи Яндекса (блоки li.serp-item)"""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+    links = []
+    for result in soup.find_all('li', class_='serp-item')[:10]:
+        link = result.find('a', class_='organic__url')
+        links.append(link.get('href') if link else None)
+    return links
+
+PARSERS = {'google': parse_google, 'yandex': parse_yandex}
+
+class SERPCache:
+    """Кэш страниц выдачи на диске по полному URL запроса со сроком жизни.
+    URL включает шаблон системы с регионом и языком - смена параметров не отдаёт старые страницы"""
+
+    def __init__(self, folder='.serp_cache', ttl=24 * 3600):
+        self.folder = folder
+        self.ttl = ttl
+        os.makedirs(folder, exist_ok=True)
+
+    def path(self, url):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.folder, f"{key}.html")
+
+    def get(self, url):
+        path = self.path(url)
+        if os.path.exists(path) and time.time() - os.path.getmtime(path) < self.ttl:
+            with open(path, encoding='utf-8') as f:
+                return f.read()
+        return None
+
+    def set(self, url, html):
+        path = self.path(url)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(html)
+        os.replace(path + '.tmp', path)
 
 class SERPChecker:
-    def __init__(self, site_url):
+    def __init__(self, site_url, engine_urls=None, cache=None, min_interval=2.0, metrics=None):
         self.site_url = site_url
         self.user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        
-    def check_google(self, keyword, pages=3):
+        self.engine_urls = dict(ENGINE_URLS, **(engine_urls or {}))
+        self.cache = cache
+        self.metrics = metrics or Metrics('serp')
+        self.session = transport.create_session(pool_size=4, user_agent=self.user_agent)
+        # Темп запросов к каждой системе: стартовая пауза min_interval, дальше - по ответам
+        # (429/503 и Retry-After замедляют, быстрые ответы без ошибок ускоряют)
+        self.throttle = AdaptiveThrottle(initial_interval=min_interval, min_interval=min_interval / 2,
+                                         max_concurrency=2, metrics=self.metrics)
+
+    def serp_url(self, engine, keyword, page):
+        return self.engine_urls[engine].format(query=quote_plus(keyword), start=page * 10, page=page)
+
+    def fetch_serp(self, engine, keyword, page):
+        """(HTML страницы выдачи, взята ли она из кэша); HTML - None, если страница не получена.
+        В кэш страница попадает только после разбора в check_engine"""
+        url = self.serp_url(engine, keyword, page)
+        if self.cache:
+            html = self.cache.get(url)
+            if html is not None:
+                self.metrics.count('serp.cache_hits')
+                return html, True
+
+        def request():
+            start = time.monotonic()
+            response = self.session.get(url, timeout=10)
+            self.metrics.record_response(response, time.monotonic() - start, len(response.content))
+            self.metrics.observe(f'http.{engine}', time.monotonic() - start)
+            return response
+
+        response = self.throttle.call(engine, request)
+        if response.status_code != 200:
+            return None, False
+        return response.text, False
+
+    def check_engine(self, engine, keyword, pages=3):
+        """Позиции сайта в выдаче; листание прекращается на странице, где сайт найден.
+        None - сайт не найден; если при этом какая-то страница не получена - SERPCheckFailed"""
         positions = []
+        failed = False
         for page in range(pages):
-            start = page * 10
-            url = f"https://www.google.com/search?q={quote_plus(keyword)}&start={start}"
-            
-            headers = {"User-Agent": self.user_agent}
             try:
-                response = requests.get(url, headers=headers, timeout=10)
-                
-                if response.status_code == 200:
-                    soup = BeautifulSoup(response.text, 'html.parser')
-                    results = soup.find_all('div', class_='g')
-                    
-                    for i, result in enumerate(results[:10], start=1):
-                        link = result.find('a')['href'] if result.find('a') else None
-                        if link and self.site_url in link:
-                            positions.append(page * 10 + i)
+                html, cached = self.fetch_serp(engine, keyword, page)
+                links = None
+                if html is not None:
+                    with self.metrics.timer(f'parse.{engine}'):
+                        links = PARSERS[engine](html)
+                if not links:
+                    # Нет ответа 200 или в нём нет ни одного результата (капча, страница согласия):
+                    # это не выдача - в кэш не сохраняется и «не найдено» не означает
+                    failed = True
+                    self.metrics.count('serp.failed_pages')
+                    continue
+                if self.cache and not cached:
+                    self.cache.set(self.serp_url(engine, keyword, page), html)
+                self.metrics.count('pages')
+                for i, link in enumerate(links, start=1):
+                    if link and self.site_url in link:
+                        positions.append(page * 10 + i)
             except Exception as e:
-                print(f"Ошибка при проверке Google: {e}")
-            
-            time.sleep(2)
+                print(f"Ошибка при проверке {ENGINE_NAMES.get(engine, engine)}: {e}")
+                self.metrics.count('errors')
+                failed = True
+            if positions:
+                break
             
-        return positions if positions else None
+        if positions:
+            return positions
+        if failed:
+            raise SERPCheckFailed(f"{ENGINE_NAMES.get(engine, engine)}: выдача по «{keyword}» получена не полностью")
+        return None
+        
+    def check_google(self, keyword, pages=3):
+        return self.check_engine('google', keyword, pages)
     
     def check_yandex(self, keyword, pages=3):
-        positions = []
-        for page in range(pages):
-            url = f"https://yandex.ru/search/?text={quote_plus(keyword)}&p={page}"
-            
-            headers = {"User-Agent": self.user_agent}
-            try:
-                response = requests.get(url, headers=headers, timeout=10)
-                
-                if response.status_code == 200:
-                    soup = BeautifulSoup(response.text, 'html.parser')
-                    results = soup.find_all('li', class_='serp-item')
-                    
-                    for i, result in enumerate(results[:10], start=1):
-                        link = result.find('a', class_='organic__url')['href'] if result.find('a', class_='organic__url') else None
-                        if link and self.site_url in link:
-                            positions.append(page * 10 + i)
-            except Exception as e:
-                print(f"Ошибка при проверке Яндекс: {e}")
-            
-            time.sleep(2)
-            
-        return positions if positions else None
+        return self.check_engine('yandex', keyword, pages)
     
     def run_check(self, keywords):
         results = []
@@ -64,24 +158,55 @@ class SERPChecker:
         for keyword in keywords:
             print(f"Проверяю ключевое слово: {keyword}")
             
-            google_pos = self.check_google(keyword)
-            yandex_pos = self.check_yandex(keyword)
-            
-            results.append({
-                'keyword': keyword,
-                'google': google_pos,
-                'yandex': yandex_pos
-            })
+            result = {'keyword': keyword, 'google': None, 'yandex': None, 'failed': []}
+            for engine in ('google', 'yandex'):
+                try:
+                    result[engine] = self.check_engine(engine, keyword)
+                except SERPCheckFailed:
+                    result['failed'].append(engine)
+            results.append(result)
         
         return results
     
+    def run_batch(self, keywords, workers=4, pages=3):
+        """Пакетная проверка: системы и ключевые слова обрабатываются параллельно,
+        темп запросов к каждой системе задаёт адаптивный ограничитель"""
+        # 'failed' - системы, по которым проверка не удалась; позиция у них остаётся None
+        results = {keyword: {'keyword': keyword, 'google': None, 'yandex': None, 'failed': []} for keyword in keywords}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(self.check_engine, engine, keyword, pages): (keyword, engine)
+                       for keyword in keywords for engine in ('google', 'yandex')}
+            for future in as_completed(futures):
+                keyword, engine = futures[future]
+                try:
+                    results[keyword][engine] = future.result()
+                except SERPCheckFailed:
+                    results[keyword]['failed'].append(engine)
+                print(f"Проверено: {keyword} ({ENGINE_NAMES[engine]})")
+        for result in results.values():
+            result['failed'].sort(key=list(ENGINE_NAMES).index)
+        return [results[keyword] for keyword in keywords]
+    
     def save_to_csv(self, results, filename='serp_results.csv'):
         with open(filename, 'w', newline='', encoding='utf-8') as f:
             writer = csv.DictWriter(f, fieldnames=['keyword', 'google', 'yandex'])
             writer.writeheader()
-            writer.writerows(results)
+            for result in results:
+                # Позиции записываются через запятую, а не как список Python
+                writer.writerow({
+                    'keyword': result['keyword'],
+                    'google': format_positions(result, 'google', ''),
+                    'yandex': format_positions(result, 'yandex', '')
+                })
         print(f"Результаты сохранены в файл: {filename}")
 
+def format_positions(result, engine, not_found='Не найдено'):
+    """Позиции системы через запятую; неудачная проверка отмечается отдельно от «не найдено»"""
+    if engine in result.get('failed', ()):
+        return 'ошибка проверки'
+    positions = result[engine]
+    return ', '.join(map(str, positions)) if positions else not_found
+
 def get_keywords_from_input():
     print("Введите ключевые слова для проверки (каждое с новой строки). Для завершения ввода введите пустую строку:")
     keywords = []
@@ -92,25 +217,67 @@ def get_keywords_from_input():
         keywords.append(keyword)
     return keywords
 
-if __name__ == "__main__":
+def read_keywords(path):
+    """Ключевые слова из файла, по одному в строке ('-' - стандартный ввод)"""
+    with (sys.stdin if path == '-' else open(path, encoding='utf-8')) as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+def add_arguments(parser):
+    parser.add_argument('site', nargs='?', help='Ваш сайт (например, vitoslavica.ru)')
+    parser.add_argument('keywords', nargs='*', help='Ключевые слова (без них спрашиваются интерактивно)')
+    parser.add_argument('--keywords-file', help='Файл с ключевыми словами, по одному в строке (- для stdin)')
+    parser.add_argument('--pages', type=int, default=3, help='Сколько страниц выдачи просматривать')
+    parser.add_argument('--workers', type=int, default=4, help='Параллельных проверок')
+    parser.add_argument('--output', default='serp_results.csv', help='Файл результатов')
+    parser.add_argument('--no-cache', action='store_true', help='Не брать страницы выдачи из кэша')
+
+def run(args):
+    """Проверка позиций по разобранным аргументам командной строки"""
     print("=== SERP Position Checker ===")
-    site_url = input("Введите URL вашего сайта (например, vitoslavica.ru): ").strip()
+    site_url = args.site or input("Введите URL вашего сайта (например, vitoslavica.ru): ").strip()
     
-    # Получаем ключевые слова от пользователя
-    keywords = get_keywords_from_input()
+    keywords = list(args.keywords) + (read_keywords(args.keywords_file) if args.keywords_file else [])
+    if not keywords and not args.site:
+        # Получаем ключевые слова от пользователя
+        keywords = get_keywords_from_input()
     
     if not keywords:
         print("Не введено ни одного ключевого слова. Выход.")
-        exit()
+        return
     
-    checker = SERPChecker(site_url)
-    results = checker.run_check(keywords)
-    checker.save_to_csv(results)
+    # SEO_PROGRESS=1 - строка прогресса, SEO_PROFILE=cprofile|pyinstrument - профиль прогона
+    metrics = Metrics('serp', progress=progress_from_env())
+    checker = SERPChecker(site_url, cache=None if args.no_cache else SERPCache(), metrics=metrics)
+    with profiled(output='profile_serp'):
+        results = checker.run_batch(keywords, workers=args.workers, pages=args.pages)
+    print(transport.report())
+    print(metrics.report())
+    print(f"Метрики сохранены в {metrics.save('metrics_serp.json')}")
+    checker.save_to_csv(results, args.output)
+    
+    # История позиций дописывается в базу, а не перезаписывается
+    store = SERPStore()
+    store.append(site_url, results)
+    for engine, name in ENGINE_NAMES.items():
+        drops = store.biggest_drops(site_url, engine, days=7, limit=5)
+        if drops:
+            print(f"\nНаибольшие падения за неделю в {name}:")
+            for keyword, before, now, fall in drops:
+                print(f"  {keyword}: {before} -> {now} (-{fall})")
+    store.close()
     
     print("\nРезультаты проверки:")
     for result in results:
         print(f"\nКлючевое слово: {result['keyword']}")
-        print(f"Позиции в Google: {result['google'] or 'Не найдено'}")
-        print(f"Позиции в Яндекс: {result['yandex'] or 'Не найдено'}")
+        print(f"Позиции в Google: {format_positions(result, 'google')}")
+        print(f"Позиции в Яндекс: {format_positions(result, 'yandex')}")
     
-    print("\nПроверка завершена!")
\ No newline at end of file
+    print("\nПроверка завершена!")
+
+def main():
+    parser = argparse.ArgumentParser(description='Позиции сайта в выдаче Google и Яндекса')
+    add_arguments(parser)
+    run(parser.parse_args())
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,74 @@
+import datetime
+import sqlite3
+
+DEFAULT_STORE_PATH = 'serp_history.sqlite'
+# Позиция для запросов, по которым сайт не найден (ниже проверяемой глубины выдачи)
+NOT_FOUND_POSITION = 101
+
+
+class SERPStore:
+    """История позиций в SQLite: одна строка на (сайт, ключевое слово, система, дата).
+    Данные только дописываются, запросы идут по индексу и не загружают историю в память"""
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.db = sqlite3.connect(path)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('''CREATE TABLE IF NOT EXISTS positions (
+            site TEXT NOT NULL,
+            keyword TEXT NOT NULL,
+            engine TEXT NOT NULL,
+            date TEXT NOT NULL,
+            position INTEGER,
+            PRIMARY KEY (site, engine, keyword, date))''')
+        self.db.execute('CREATE INDEX IF NOT EXISTS idx_site_engine_date ON positions (site, engine, date)')
+        self.db.commit()
+
+    def append(self, site, results, date=None, engines=('google', 'yandex')):
+        """Сохраняет результаты SERPChecker за дату (по умолчанию - сегодня).
+        Хранится лучшая позиция; повторная проверка в тот же день заменяет запись.
+        Системы из result['failed'] пропускаются, чтобы неудачная проверка не выглядела падением позиции"""
+        date = (date or datetime.date.today()).isoformat()
+        rows = []
+        for result in results:
+            for engine in engines:
+                if engine in result.get('failed', ()):
+                    continue
+                positions = result.get(engine)
+                rows.append((site, result['keyword'], engine, date, min(positions) if positions else None))
+        self.db.executemany('INSERT OR REPLACE INTO positions VALUES (?, ?, ?, ?, ?)', rows)
+        self.db.commit()
+        return len(rows)
+
+    def trend(self, site, keyword, engine, days=90):
+        """Позиции по ключевому слову за последние days дней: [(дата, позиция)]"""
+        since = (datetime.date.today() - datetime.timedelta(days=days)).isoformat()
+        return self.db.execute(
+            'SELECT date, position FROM positions '
+            'WHERE site = ? AND engine = ? AND keyword = ? AND date >= ? ORDER BY date',
+            (site, engine, keyword, since)).fetchall()
+
+    def biggest_drops(self, site, engine, days=7, limit=20):
+        """Ключевые слова с наибольшим падением позиции за days дней:
+        [(ключевое слово, позиция в начале периода, позиция сейчас, падение)]"""
+        since = (datetime.date.today() - datetime.timedelta(days=days)).isoformat()
+        return self.db.execute('''
+            WITH period AS (
+                SELECT keyword, date, COALESCE(position, :missing) AS position
+                FROM positions WHERE site = :site AND engine = :engine AND date >= :since
+            ),
+            bounds AS (
+                SELECT keyword, MIN(date) AS first_date, MAX(date) AS last_date
+                FROM period GROUP BY keyword HAVING first_date < last_date
+            )
+            SELECT bounds.keyword, first.position, last.position, last.position - first.position AS fall
+            FROM bounds
+            JOIN period AS first ON first.keyword = bounds.keyword AND first.date = bounds.first_date
+            JOIN period AS last ON last.keyword = bounds.keyword AND last.date = bounds.last_date
+            WHERE last.position > first.position
+            ORDER BY fall DESC
+            LIMIT :limit''',
+            {'site': site, 'engine': engine, 'since': since, 'limit': limit,
+             'missing': NOT_FOUND_POSITION}).fetchall()
+
+    def close(self):
+        self.db.close()
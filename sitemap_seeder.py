@@ -0,0 +1,142 @@
+import datetime
+import gzip
+import xml.etree.ElementTree as ET
+from urllib import robotparser
+from urllib.parse import urljoin, urlparse
+
+USER_AGENT = '*'
+
+
+class RobotsRules:
+    """Правила robots.txt: Disallow, Crawl-delay и ссылки на карты сайта"""
+
+    def __init__(self, session, start_url, user_agent=USER_AGENT):
+        self.user_agent = user_agent
+        self.parser = robotparser.RobotFileParser()
+        self.found = False
+        robots_url = urljoin(start_url, '/robots.txt')
+        try:
+            response = session.get(robots_url, timeout=10)
+            if response.status_code == 200:
+                self.parser.parse(response.text.splitlines())
+                self.found = True
+            else:
+                # Нет robots.txt - ограничений нет
+                self.parser.parse([])
+        except Exception as e:
+            print(f"Не удалось загрузить {robots_url}: {e}")
+            self.parser.parse([])
+
+    def allowed(self, url):
+        return self.parser.can_fetch(self.user_agent, url)
+
+    def crawl_delay(self):
+        return self.parser.crawl_delay(self.user_agent)
+
+    def sitemaps(self):
+        return self.parser.site_maps() or []
+
+
+def local_name(tag):
+    """Имя тега без пространства имён: {http://...}loc -> loc"""
+    return tag.rsplit('}', 1)[-1]
+
+
+class PeekedStream:
+    """Поток, из которого уже прочитано начало: head отдаётся первым, дальше - raw"""
+
+    def __init__(self, head, raw):
+        self.head = head
+        self.raw = raw
+
+    def read(self, size=-1):
+        if not self.head:
+            return self.raw.read(size) if size is not None and size >= 0 else self.raw.read()
+        if size is None or size < 0:
+            data, self.head = self.head + self.raw.read(), b''
+            return data
+        data, self.head = self.head[:size], self.head[size:]
+        if len(data) < size:
+            data += self.raw.read(size - len(data))
+        return data
+
+
+def iter_sitemap(session, sitemap_url):
+    """Потоково разбирает карту сайта (в том числе .gz).
+    Возвращает ('url', адрес, lastmod) для страниц и ('sitemap', адрес, lastmod) для вложенных карт"""
+    response = session.get(sitemap_url, timeout=30, stream=True)
+    response.raise_for_status()
+    response.raw.decode_content = True
+    # Сжатие передачи (Content-Encoding) urllib3 уже снял; сжат ли сам файл, видно только по
+    # первым байтам - ни расширение .gz, ни Content-Type этого не гарантируют
+    head = response.raw.read(2)
+    stream = PeekedStream(head, response.raw)
+    if head == b'\x1f\x8b':
+        stream = gzip.GzipFile(fileobj=stream)
+
+    try:
+        loc = lastmod = None
+        root = None
+        for event, element in ET.iterparse(stream, events=('start', 'end')):
+            if event == 'start':
+                if root is None:
+                    root = element
+                continue
+            name = local_name(element.tag)
+            if name == 'loc':
+                loc = (element.text or '').strip()
+            elif name == 'lastmod':
+                lastmod = (element.text or '').strip()
+            elif name in ('url', 'sitemap'):
+                if loc:
+                    yield ('url' if name == 'url' else 'sitemap'), loc, lastmod
+                loc = lastmod = None
+                # Освобождаем память: разобранная запись больше не нужна, и корень
+                # не должен держать по пустому элементу на каждый URL
+                element.clear()
+                root.clear()
+    finally:
+        response.close()
+
+
+def parse_lastmod(value):
+    """lastmod (W3C datetime) -> timestamp или None"""
+    if not value:
+        return None
+    try:
+        return datetime.datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        try:
+            return datetime.datetime.strptime(value[:10], '%Y-%m-%d').timestamp()
+        except ValueError:
+            return None
+
+
+def lastmod_priority(lastmod):
+    """Приоритет для Frontier: недавно изменённые страницы идут первыми,
+    страницы без lastmod - после них, но раньше найденных по ссылкам"""
+    timestamp = parse_lastmod(lastmod)
+    return -timestamp if timestamp else 0
+
+
+def discover_urls(session, start_url, robots=None, max_sitemaps=1000):
+    """Страницы из карт сайта, указанных в robots.txt (или /sitemap.xml по умолчанию).
+    Генератор отдаёт (url, lastmod) по мере разбора - большие карты не грузятся в память целиком"""
+    queue = list(robots.sitemaps()) if robots else []
+    if not queue:
+        queue = [urljoin(start_url, '/sitemap.xml')]
+    seen = set(queue)
+    domain = urlparse(start_url).netloc
+
+    while queue and len(seen) <= max_sitemaps:
+        sitemap_url = queue.pop(0)
+        try:
+            for kind, loc, lastmod in iter_sitemap(session, sitemap_url):
+                if kind == 'sitemap':
+                    if loc not in seen and urlparse(loc).netloc == domain:
+                        seen.add(loc)
+                        queue.append(loc)
+                else:
+                    yield loc, lastmod
+        except Exception as e:
+            print(f"Ошибка при разборе карты сайта {sitemap_url}: {e}")
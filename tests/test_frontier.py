@@ -0,0 +1,28 @@
+from frontier import normalize_url
+
+
+def test_ipv6_host_keeps_brackets():
+    assert normalize_url('http://[::1]:8080/a/') == 'http://[::1]:8080/a'
+    assert normalize_url('http://[2001:DB8::1]/') == 'http://[2001:db8::1]/'
+
+
+def test_userinfo_is_kept_with_password():
+    assert normalize_url('https://user:pw@Host.RU/x') == 'https://user:pw@host.ru/x'
+    assert normalize_url('https://User@host.ru/x') == 'https://User@host.ru/x'
+
+
+def test_default_ports_are_dropped():
+    assert normalize_url('https://host.ru:443/') == 'https://host.ru/'
+    assert normalize_url('http://host.ru:80/p') == 'http://host.ru/p'
+    assert normalize_url('http://host.ru:443/p') == 'http://host.ru:443/p'
+    assert normalize_url('http://[::1]:80/') == 'http://[::1]/'
+
+
+def test_query_is_sorted_without_tracking_and_keeps_encoding():
+    url = 'https://host.ru/p?b=2&flag&utm_source=x&a=1%20b&gclid=1#top'
+    assert normalize_url(url) == 'https://host.ru/p?a=1%20b&b=2&flag'
+    assert normalize_url('https://host.ru/?b=1&a=2') == normalize_url('https://host.ru/?a=2&b=1')
+
+
+def test_malformed_url_is_returned_as_is():
+    assert normalize_url(' http://host:abc/ ') == 'http://host:abc/'
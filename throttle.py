@@ -0,0 +1,208 @@
+import asyncio
+import email.utils
+import random
+import threading
+import time
+
+# Ответы, означающие «сервер перегружен, притормозите»
+THROTTLE_STATUSES = (429, 503)
+
+
+def parse_retry_after(headers):
+    """Секунды ожидания из заголовка Retry-After (число или HTTP-дата) или None"""
+    value = (headers or {}).get('Retry-After')
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class HostState:
+    """Состояние одного хоста: задержка между запросами, лимит параллельности, статистика"""
+
+    def __init__(self, interval, concurrency):
+        self.interval = interval
+        self.min_interval = 0.0   # нижняя граница паузы (например, Crawl-delay из robots.txt)
+        self.limit = float(concurrency)
+        self.in_flight = 0
+        self.next_allowed = 0.0
+        self.latency = None       # EWMA времени ответа
+        self.best_latency = None  # лучшее наблюдаемое время ответа
+        self.error_rate = 0.0     # EWMA доли ошибок
+        self.requests = 0
+        self.backoffs = 0
+        self.changed = None       # threading.Condition: освободился слот или сменилась пауза
+
+
+class AdaptiveThrottle:
+    """Адаптивное ограничение нагрузки на хосты вместо фиксированных пауз.
+
+    Пока хост отвечает быстро и без ошибок, пауза между запросами сокращается,
+    а лимит параллельных запросов растёт на единицу (аддитивное увеличение).
+    При 429/503 и ошибках лимит делится пополам, пауза удваивается со случайным
+    разбросом, а Retry-After соблюдается всегда. Если время ответа выросло,
+    темп перестаёт расти, пока сервер не восстановится."""
+
+    def __init__(self, initial_interval=1.0, min_interval=0.05, max_interval=60.0,
+                 initial_concurrency=1, max_concurrency=8, smoothing=0.2, max_retries=3, metrics=None):
+        self.initial_interval = initial_interval
+        self.min_interval = min(min_interval, initial_interval)
+        self.max_interval = max_interval
+        self.initial_concurrency = initial_concurrency
+        self.max_concurrency = max_concurrency
+        self.smoothing = smoothing
+        # Сколько раз повторять запрос после 429/503, прежде чем вернуть ответ как есть
+        self.max_retries = max_retries
+        # Необязательный Metrics: время ожидания разрешения и число торможений
+        self.metrics = metrics
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    def state(self, host):
+        if host not in self.hosts:
+            self.hosts[host] = HostState(self.initial_interval, self.initial_concurrency)
+            self.hosts[host].changed = threading.Condition(self.lock)
+        return self.hosts[host]
+
+    def _reserve(self, host):
+        """Занимает слот для запроса и возвращает 0 или сколько секунд подождать до следующей попытки
+        (вызывается под self.lock; None - все слоты заняты, ждать до release)"""
+        state = self.state(host)
+        now = time.monotonic()
+        if state.in_flight >= int(state.limit):
+            return None
+        if now < state.next_allowed:
+            return state.next_allowed - now
+        state.in_flight += 1
+        state.requests += 1
+        state.next_allowed = now + state.interval
+        return 0.0
+
+    def acquire(self, host):
+        """Блокирующее ожидание разрешения на запрос (для потоков).
+        Пока слоты хоста заняты, поток спит на условии, которое будит release"""
+        start = time.monotonic()
+        with self.lock:
+            while True:
+                wait = self._reserve(host)
+                if wait == 0.0:
+                    break
+                self.state(host).changed.wait(wait)
+        if self.metrics:
+            self.metrics.observe('throttle.wait', time.monotonic() - start)
+
+    async def acquire_async(self, host):
+        """Ожидание разрешения на запрос без блокировки цикла событий"""
+        start = time.monotonic()
+        while True:
+            with self.lock:
+                wait = self._reserve(host)
+                if wait is None:
+                    # Цикл событий нельзя блокировать на условии - опрашиваем с паузой
+                    wait = max(0.05, self.state(host).interval / 2)
+            if wait == 0.0:
+                break
+            await asyncio.sleep(wait)
+        if self.metrics:
+            self.metrics.observe('throttle.wait', time.monotonic() - start)
+
+    def release(self, host, status=None, latency=None, headers=None, error=False):
+        """Сообщает результат запроса и подстраивает темп для хоста"""
+        with self.lock:
+            state = self.state(host)
+            state.in_flight = max(0, state.in_flight - 1)
+            # Ожидающие потоки проснутся, когда release отпустит блокировку, и увидят новый темп
+            state.changed.notify_all()
+            failed = error or status in THROTTLE_STATUSES or (status is not None and status >= 500)
+            state.error_rate += self.smoothing * ((1.0 if failed else 0.0) - state.error_rate)
+
+            slow = False
+            if latency is not None:
+                state.latency = latency if state.latency is None else \
+                    state.latency + self.smoothing * (latency - state.latency)
+                state.best_latency = latency if state.best_latency is None else min(state.best_latency, latency)
+                # Сервер заметно замедлился - признак перегрузки
+                slow = state.latency > 3 * state.best_latency + 0.05
+
+            if failed:
+                # Мультипликативное уменьшение с разбросом, чтобы клиенты не синхронизировались
+                state.backoffs += 1
+                if self.metrics:
+                    self.metrics.count('throttle.backoffs')
+                state.limit = max(1.0, state.limit / 2)
+                state.interval = min(self.max_interval, max(state.interval, self.min_interval, 0.05) * 2)
+                state.interval = max(state.interval, state.min_interval)
+                pause = state.interval * random.uniform(1.0, 1.5)
+                retry_after = parse_retry_after(headers)
+                if retry_after is not None:
+                    pause = max(pause, retry_after)
+                state.next_allowed = max(state.next_allowed, time.monotonic() + pause)
+            elif not slow:
+                # Аддитивное увеличение: +1 к лимиту примерно за каждые limit успешных ответов
+                state.limit = min(float(self.max_concurrency), state.limit + 1.0 / state.limit)
+                state.interval = max(self.min_interval, state.min_interval, state.interval * 0.9)
+
+    def set_min_interval(self, host, seconds):
+        """Запрещает ускоряться для хоста чаще, чем раз в seconds секунд"""
+        with self.lock:
+            state = self.state(host)
+            state.min_interval = seconds
+            state.interval = max(state.interval, seconds)
+
+    def call(self, host, request):
+        """Выполняет request() с учётом темпа хоста и возвращает ответ.
+        При 429/503 запрос повторяется после паузы (Retry-After или торможение хоста),
+        но не больше max_retries раз - затем возвращается последний ответ"""
+        attempt = 0
+        while True:
+            self.acquire(host)
+            start = time.monotonic()
+            try:
+                response = request()
+            except Exception:
+                self.release(host, latency=time.monotonic() - start, error=True)
+                raise
+            self.release(host, response.status_code, time.monotonic() - start, response.headers)
+            retry_after = parse_retry_after(response.headers)
+            if response.status_code not in THROTTLE_STATUSES or attempt >= self.max_retries or \
+                    (retry_after is not None and retry_after > self.max_interval):
+                return response
+            # Пауза перед повтором уже назначена в release: acquire дождётся её
+            attempt += 1
+            if self.metrics:
+                self.metrics.count('retries')
+            response.close()
+
+    def snapshot(self):
+        """Темп хостов для сохранения между запусками"""
+        with self.lock:
+            return {host: {'interval': state.interval, 'min_interval': state.min_interval,
+                           'limit': state.limit, 'latency': state.latency,
+                           'best_latency': state.best_latency, 'error_rate': state.error_rate}
+                    for host, state in self.hosts.items()}
+
+    def restore(self, snapshot):
+        """Продолжает с сохранённого темпа, а не разгоняется заново"""
+        with self.lock:
+            for host, values in (snapshot or {}).items():
+                state = self.state(host)
+                for name, value in values.items():
+                    setattr(state, name, value)
+                state.changed.notify_all()
+
+    def report(self):
+        """Итоговый темп по каждому хосту"""
+        lines = []
+        with self.lock:
+            for host, state in sorted(self.hosts.items()):
+                latency = f"{state.latency * 1000:.0f} мс" if state.latency is not None else "-"
+                lines.append(f"{host}: запросов {state.requests}, пауза {state.interval:.2f} с, "
+                             f"параллельно до {int(state.limit)}, ответ ~{latency}, "
+                             f"ошибки {state.error_rate:.0%}, торможений {state.backoffs}")
+        return '\n'.join(lines)
@@ -0,0 +1,337 @@
+import ipaddress
+import os
+import socket
+import threading
+import time
+from urllib.parse import urlparse
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NameResolutionError, NewConnectionError
+from urllib3.util.request import ACCEPT_ENCODING
+
+USER_AGENT = 'Mozilla/5.0'
+# Верхняя граница жизни адреса в кэше (настоящий TTL записи getaddrinfo не сообщает)
+DNS_TTL = 60
+DNS_NEGATIVE_TTL = 10
+# Заголовки соединения HTTP/1.1, запрещённые в HTTP/2
+HOP_BY_HOP_HEADERS = ('connection', 'keep-alive', 'proxy-connection', 'transfer-encoding', 'upgrade')
+
+
+class DNSCache:
+    """Кэш разрешения имён для соединений TransportAdapter.
+
+    Новые соединения с уже известным хостом не ждут DNS; адреса перебираются
+    по очереди, как в обычном create_connection. getaddrinfo не сообщает TTL записи,
+    поэтому ttl - верхняя граница: адрес живёт не дольше ttl секунд. Ошибки разрешения
+    запоминаются на короткий negative_ttl, чтобы мёртвый хост не опрашивался на каждой ссылке"""
+
+    def __init__(self, ttl=DNS_TTL, negative_ttl=DNS_NEGATIVE_TTL):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.lock = threading.Lock()
+        self.entries = {}  # (хост, порт) -> (срок годности, [адреса] или ошибка)
+        self.hits = 0
+        self.misses = 0
+
+    def resolve(self, host, port):
+        host = host.strip('[]')
+        try:
+            ipaddress.ip_address(host)
+            return [host]  # IP-адрес разрешать не нужно
+        except ValueError:
+            pass
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get((host, port))
+            if entry and entry[0] > now:
+                self.hits += 1
+                if isinstance(entry[1], Exception):
+                    raise entry[1]
+                return entry[1]
+        try:
+            addresses = list(dict.fromkeys(info[4][0] for info in
+                                           socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)))
+        except socket.gaierror as e:
+            with self.lock:
+                self.entries[(host, port)] = (now + self.negative_ttl, e)
+                self.misses += 1
+            raise
+        with self.lock:
+            self.entries[(host, port)] = (now + self.ttl, addresses)
+            self.misses += 1
+        return addresses
+
+    def report(self):
+        return f"DNS-кэш: {len(self.entries)} хостов, попаданий {self.hits}, запросов к DNS {self.misses}"
+
+
+class CachedDNSMixin:
+    """Соединение urllib3, которое берёт адреса хоста из DNSCache.
+    Подключается только к пулам TransportAdapter - остальной urllib3 в процессе его не видит"""
+
+    dns_cache = None
+
+    def _new_conn(self):
+        host = self._dns_host
+        try:
+            addresses = self.dns_cache.resolve(host, self.port)
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+        error = None
+        try:
+            for address in addresses:
+                # _dns_host - адрес для сокета; SNI и проверка сертификата идут по исходному хосту,
+                # который возвращается сразу после подключения
+                self._dns_host = address
+                try:
+                    return super()._new_conn()
+                except NewConnectionError as e:
+                    error = e
+        finally:
+            self._dns_host = host
+        raise error
+
+
+def cached_dns_pool_classes(cache):
+    """Классы пулов для PoolManager с соединениями через cache"""
+    http_connection = type('CachedDNSHTTPConnection', (CachedDNSMixin, HTTPConnection), {'dns_cache': cache})
+    https_connection = type('CachedDNSHTTPSConnection', (CachedDNSMixin, HTTPSConnection), {'dns_cache': cache})
+    return {
+        'http': type('CachedDNSHTTPConnectionPool', (HTTPConnectionPool,), {'ConnectionCls': http_connection}),
+        'https': type('CachedDNSHTTPSConnectionPool', (HTTPSConnectionPool,), {'ConnectionCls': https_connection}),
+    }
+
+
+class TransportStats:
+    """Байты по хостам: сколько пришло по сети и сколько получилось после распаковки"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hosts = {}
+
+    def add(self, host, wire, decoded, version):
+        with self.lock:
+            stats = self.hosts.setdefault(host, {'requests': 0, 'http2': 0, 'wire': 0, 'decoded': 0})
+            stats['requests'] += 1
+            stats['http2'] += version == 20
+            stats['wire'] += wire
+            stats['decoded'] += decoded
+
+    def to_dict(self):
+        with self.lock:
+            return {host: dict(stats) for host, stats in self.hosts.items()}
+
+    def report(self, limit=10):
+        hosts = sorted(self.to_dict().items(), key=lambda item: item[1]['wire'], reverse=True)
+        if not hosts:
+            return "Транспорт: запросов не было"
+        wire = sum(stats['wire'] for _, stats in hosts)
+        decoded = sum(stats['decoded'] for _, stats in hosts)
+        lines = [f"Транспорт: по сети {wire / 1024 / 1024:.2f} MB, после распаковки {decoded / 1024 / 1024:.2f} MB"]
+        for host, stats in hosts[:limit]:
+            saved = (1 - stats['wire'] / stats['decoded']) * 100 if stats['decoded'] else 0.0
+            lines.append(f"  {host}: запросов {stats['requests']} (HTTP/2: {stats['http2']}), "
+                         f"по сети {stats['wire'] / 1024:.1f} KB, распаковано {stats['decoded'] / 1024:.1f} KB "
+                         f"(сжатие сэкономило {saved:.0f}%)")
+        return '\n'.join(lines)
+
+
+class CountingBody:
+    """Обёртка над телом ответа (response.raw): считает байты из сети и после распаковки
+    и передаёт итог в TransportStats, когда тело дочитано или закрыто"""
+
+    def __init__(self, raw, host, stats):
+        # Атрибуты обёртки пишутся в __dict__: остальные присваивания уходят в raw (decode_content)
+        self.__dict__.update(raw=raw, host=host, stats=stats, decoded=0, finished=False)
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+    def __setattr__(self, name, value):
+        setattr(self.raw, name, value)
+
+    def read(self, amt=None, *args, **kwargs):
+        data = self.raw.read(amt, *args, **kwargs)
+        self.__dict__['decoded'] += len(data)
+        if not data or amt is None:
+            self.finish()
+        return data
+
+    def stream(self, amt=2 ** 16, decode_content=None):
+        for chunk in self.raw.stream(amt, decode_content=decode_content):
+            self.__dict__['decoded'] += len(chunk)
+            yield chunk
+        self.finish()
+
+    def close(self):
+        self.finish()
+        self.raw.close()
+
+    def finish(self):
+        if not self.finished:
+            self.__dict__['finished'] = True
+            self.stats.add(self.host, self.raw.tell(), self.decoded, getattr(self.raw, 'version', 11))
+
+
+class TransportAdapter(HTTPAdapter):
+    """HTTPAdapter с учётом байтов по хостам и (если задан dns_cache) кэшем DNS"""
+
+    def __init__(self, stats, dns_cache=None, **kwargs):
+        self.stats = stats
+        self.dns_cache = dns_cache
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        if self.dns_cache is not None:
+            # Новый словарь, а не правка общего urllib3.poolmanager.pool_classes_by_scheme
+            self.poolmanager.pool_classes_by_scheme = cached_dns_pool_classes(self.dns_cache)
+
+    def build_response(self, req, resp):
+        response = super().build_response(req, resp)
+        response.raw = CountingBody(response.raw, urlparse(req.url).netloc, self.stats)
+        return response
+
+
+class HTTPXBody:
+    """Тело ответа httpx с той частью интерфейса urllib3.HTTPResponse, которой пользуется requests"""
+
+    def __init__(self, response):
+        self.response = response
+        self.version = 20 if response.http_version == 'HTTP/2' else 11
+        self.decode_content = True
+        self.chunks = None
+        self.buffer = b''
+
+    def read(self, amt=None, decode_content=None):
+        import httpx
+        if self.chunks is None:
+            decode = self.decode_content if decode_content is None else decode_content
+            self.chunks = self.response.iter_bytes() if decode else self.response.iter_raw()
+        try:
+            while amt is None or len(self.buffer) < amt:
+                chunk = next(self.chunks, None)
+                if chunk is None:
+                    break
+                self.buffer += chunk
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.ReadTimeout(e)
+        except httpx.HTTPError as e:
+            raise requests.exceptions.ChunkedEncodingError(e)
+        size = len(self.buffer) if amt is None else amt
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    def stream(self, amt=2 ** 16, decode_content=None):
+        while True:
+            data = self.read(amt, decode_content)
+            if not data:
+                break
+            yield data
+
+    def tell(self):
+        return self.response.num_bytes_downloaded
+
+    def close(self):
+        self.response.close()
+
+    def release_conn(self):
+        self.response.close()
+
+
+class HTTP2Adapter(BaseAdapter):
+    """Адаптер requests поверх httpx: запросы к одному origin мультиплексируются
+    в одном соединении HTTP/2. Остальной код по-прежнему работает с requests.Session"""
+
+    def __init__(self, stats, pool_size=10, keepalive=60):
+        import httpx  # необязательная зависимость: pip install httpx[http2]
+        super().__init__()
+        limits = httpx.Limits(max_connections=pool_size * 4, max_keepalive_connections=pool_size,
+                              keepalive_expiry=keepalive)
+        # Без пакета h2 httpx выбрасывает ImportError - тогда остаётся HTTP/1.1
+        self.client = httpx.Client(http2=True, limits=limits, follow_redirects=False)
+        self.stats = stats
+        self.encodings = http2_encodings()
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        import httpx
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            timeout = httpx.Timeout(read, connect=connect)
+        headers = [(name, value) for name, value in request.headers.items()
+                   if name.lower() not in HOP_BY_HOP_HEADERS]
+        if request.headers.get('Accept-Encoding') == ACCEPT_ENCODING:
+            # Для http:// остаётся набор urllib3, здесь можно объявить всё, что распаковывает httpx
+            headers = [(name, self.encodings if name.lower() == 'accept-encoding' else value)
+                       for name, value in headers]
+        try:
+            outgoing = self.client.build_request(request.method, request.url, headers=headers,
+                                                 content=request.body, timeout=timeout)
+            incoming = self.client.send(outgoing, stream=True)
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(e, request=request)
+        except httpx.HTTPError as e:
+            raise requests.exceptions.ConnectionError(e, request=request)
+
+        response = requests.Response()
+        response.status_code = incoming.status_code
+        response.headers = CaseInsensitiveDict(incoming.headers)
+        response.reason = incoming.reason_phrase
+        response.url = request.url
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.request = request
+        response.connection = self
+        response.raw = CountingBody(HTTPXBody(incoming), urlparse(request.url).netloc, self.stats)
+        if not stream:
+            response.content
+        return response
+
+    def close(self):
+        self.client.close()
+
+
+def http2_from_env():
+    """SEO_HTTP2=1 включает HTTP/2 (нужен httpx[http2])"""
+    return os.environ.get('SEO_HTTP2', '').lower() in ('1', 'true', 'yes')
+
+
+def http2_encodings():
+    """Кодировки, которые умеет распаковывать httpx (br и zstd - если установлены brotli и zstandard)"""
+    from httpx._decoders import SUPPORTED_DECODERS
+    return ','.join(name for name in SUPPORTED_DECODERS if name != 'identity')
+
+
+dns_cache = DNSCache()
+default_stats = TransportStats()
+
+
+def create_session(pool_size=10, pool_hosts=32, user_agent=USER_AGENT, http2=None, keepalive=60,
+                   stats=None, use_dns_cache=True):
+    """Сессия requests с общим транспортом для всех инструментов.
+
+    pool_size - соединений на один хост, pool_hosts - сколько хостов держать в пуле
+    открытыми. Accept-Encoding объявляет только то, что можно распаковать (gzip, deflate,
+    br и zstd при установленных пакетах). С http2=True (или SEO_HTTP2=1) https-запросы
+    идут через httpx по HTTP/2. Байты по хостам копятся в stats (по умолчанию default_stats)."""
+    stats = stats or default_stats
+    http2 = http2_from_env() if http2 is None else http2
+    adapter = TransportAdapter(stats, dns_cache if use_dns_cache else None,
+                               pool_connections=pool_hosts, pool_maxsize=pool_size)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    if http2:
+        try:
+            session.mount('https://', HTTP2Adapter(stats, pool_size, keepalive))
+        except ImportError:
+            print("httpx[http2] не установлен - запросы идут по HTTP/1.1")
+    session.headers.update({'User-Agent': user_agent, 'Accept-Encoding': ACCEPT_ENCODING})
+    return session
+
+
+def report():
+    """Байты по хостам и статистика DNS-кэша для вывода в конце работы"""
+    return f"{default_stats.report()}\n{dns_cache.report()}"